@@ -3,13 +3,24 @@ Flask API with Database Optimization
 Demonstrates connection pooling, caching, and query optimization
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 import os
+import json
 import logging
+from functools import wraps
 
 from connection.connection_pool import ConnectionPool
+from connection.pool_maintainer import PoolMaintainer
 from query.query_analyzer import QueryAnalyzer
-from caching.query_cache import QueryCache
+from caching.cache_manager import CacheManager
+from caching.query_cache import is_empty_result
+from caching.shared_cache import SharedMemoryCache
+from caching.disk_cache import DiskCache, schema_fingerprint
+from caching.columnar import ColumnarResult
+from caching.response_cache import ResponseCache
+from caching.cache_warmer import CacheWarmer
+from caching.validation import TableVersionValidator
+from caching.table_dependencies import extract_tables
 from indexing.index_analyzer import IndexAnalyzer
 from examples.database_setup import create_sample_database, populate_sample_data, get_table_stats
 
@@ -26,12 +37,179 @@ if not os.path.exists(db_path):
     conn.close()
 
 # Initialize components
-pool = ConnectionPool(db_path, min_connections=2, max_connections=10)
+# Trigger-maintained per-table counters; cached results are served only
+# while their tables are unchanged (read at most every 50ms). Installed
+# before the pool opens connections so none start with a stale schema.
+validator = TableVersionValidator(db_path, check_interval=0.05)
+
+# Connections are checked on borrow and return; the maintainer checks idle
+# ones, reaps them after 60s idle, replaces them before max_age and keeps
+# min_connections open, so requests never pay for a reconnect. The API
+# mostly reads, so connections use WAL with a large page cache and mmap.
+# Queries hint the tables they read (table_hint), so each idle connection
+# keeps serving the same statements with its caches already warm.
+pool = ConnectionPool(db_path, min_connections=2, max_connections=10, profile='read_heavy',
+                      affinity=True)
+pool_maintainer = PoolMaintainer(pool, interval=5, idle_timeout=60, refresh_before=30)
+pool_maintainer.start()
 analyzer = QueryAnalyzer(slow_query_threshold=1.0)
-cache = QueryCache(ttl=300, max_size=1000)
+
+# Workers on this host share a second cache tier and its invalidations
+shared_cache = SharedMemoryCache(os.getenv('SHARED_CACHE_PATH'), num_slots=2048,
+                                 slot_size=64 * 1024, ttl=300)
+
+# Persisted entries are rejected once the schema changes. Each entry also
+# carries the validator's per-table stamp; the counters live in the
+# database, so a restart keeps every entry whose tables were not written.
+conn = pool.get_connection()
+try:
+    schema_version = schema_fingerprint(conn.connection)
+finally:
+    pool.release_connection(conn)
+disk_cache = DiskCache(os.getenv('DISK_CACHE_PATH', 'query_cache.db'), ttl=3600,
+                       schema_version=schema_version)
+
+# One lock outperforms shards at the API's thread counts
+# (benchmarks/cache_concurrency_benchmark.py) and keeps max_bytes whole
+cache_manager = CacheManager(shared_cache, disk_cache)
+cache = cache_manager.create_cache('queries', ttl=300, max_size=1000, stale_ttl=60,
+                                   max_bytes=64 * 1024 * 1024, storage='columnar',
+                                   negative_ttl=30, negative_max_size=10000,
+                                   adaptive_ttl=True, min_ttl=30, max_ttl=3600, admission='tinylfu',
+                                   validator=validator)
+cache_manager.warm_from_disk('queries')
+# Responses live as long as the query-cache entry they were built from
+# (response_ttl); ttl only covers results the query cache did not keep
+response_cache = ResponseCache(ttl=300, max_size=1000, validator=validator)
+response_cache.attach(cache)
 index_analyzer = IndexAnalyzer()
 
 
+def table_hint(query):
+    """Connection-affinity hint for a query: the tables it reads"""
+    return ','.join(sorted(extract_tables(query))) or None
+
+
+def run_query(query, params=None):
+    """Run a query on a pooled connection (not recorded by the analyzer)"""
+    conn = pool.get_connection(hint=table_hint(query))
+    
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        pool.release_connection(conn)
+
+
+# Hot queries from the analyzer history are reloaded every 5 minutes;
+# a restarted worker warms from the plan saved by the last run
+warmer = CacheWarmer(cache, analyzer, run_query, top_k=50, window=3600,
+                     plan_path=os.getenv('WARM_PLAN_PATH', 'cache_warm_plan.json'))
+warmer.warm()
+warmer.start(interval=300)
+
+
+def response_ttl(query, params, rows):
+    """
+    Seconds a response built from a query result may be cached
+    
+    As long as the result's query-cache entry, so empty results keep the
+    short negative TTL; results the query cache did not keep (e.g.
+    refused admission) fall back to the response cache's own TTL.
+    """
+    ttl = cache.ttl_remaining(query, params)
+    if ttl is not None:
+        return ttl
+    if is_empty_result(rows) and cache.negative_ttl is not None:
+        return cache.negative_ttl
+    return response_cache.ttl
+
+
+def rows_response(payload, rows_field, rows, request_fields=None, ttl=None):
+    """
+    Build a JSON response embedding query rows
+    
+    Columnar results encode straight to JSON; other results are
+    converted to one dict per row first. The encoded rows are embedded
+    as the last member of the object. The body kept by the response
+    cache (g.cacheable_body) reports "cached": true and leaves out the
+    fields describing this request only.
+    
+    Args:
+        payload: Response fields other than the rows
+        rows_field: Name of the rows field
+        rows: ColumnarResult or list of sqlite3.Row
+        request_fields: Fields for this request only ('cached', timings)
+        ttl: Seconds the response cache may keep the body (see response_ttl)
+        
+    Returns:
+        Flask response
+    """
+    if isinstance(rows, ColumnarResult):
+        rows_json = rows.to_json()
+    else:
+        rows_json = json.dumps([dict(row) for row in rows])
+    
+    def encode(fields):
+        members = [f"{json.dumps(name)}: {json.dumps(value)}" for name, value in fields.items()]
+        members.append(f"{json.dumps(rows_field)}: {rows_json}")
+        return '{' + ', '.join(members) + '}'
+    
+    g.cacheable_body = encode(dict(payload, cached=True))
+    g.cacheable_ttl = ttl
+    body = encode(dict(payload, **(request_fields or {})))
+    return app.response_class(body, mimetype='application/json')
+
+
+def cached_response(*tables):
+    """
+    Serve an endpoint from the response cache
+    
+    Successful responses are stored as encoded bytes keyed by path and
+    query args, with ETag/Last-Modified for conditional requests. They
+    are dropped whenever the query cache invalidates one of the tables.
+    A miss is served as the view built it; the stored body is the view's
+    g.cacheable_body when set, so hits carry no per-request fields, and
+    both carry the ETag of the stored body. Responses are kept for the
+    view's g.cacheable_ttl when set.
+    
+    Args:
+        tables: Tables the endpoint reads
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cached = response_cache.get(request.path, request.args)
+            
+            if cached is None:
+                stamp = response_cache.stamp(tables)
+                response = view(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                body = g.pop('cacheable_body', None) or response.get_data()
+                cached = response_cache.set(request.path, request.args, body, tables, stamp,
+                                            g.pop('cacheable_ttl', None))
+                response.set_etag(cached.etag)
+                response.last_modified = cached.last_modified
+                response.headers['X-Cache'] = 'MISS'
+                return response.make_conditional(request)
+            
+            response = app.response_class(cached.body, mimetype='application/json')
+            response.set_etag(cached.etag)
+            response.last_modified = cached.last_modified
+            response.headers['X-Cache'] = 'HIT'
+            return response.make_conditional(request)
+        
+        return wrapper
+    
+    return decorator
+
+
+@app.before_request
+def sync_shared_cache():
+    """Apply cache invalidations broadcast by other workers"""
+    cache_manager.sync_invalidations()
+
+
 @app.route('/')
 def index():
     """Root endpoint"""
@@ -49,6 +227,7 @@ def index():
             'orders': '/api/orders',
             'stats': '/api/stats',
             'pool_stats': '/api/pool/stats',
+            'statement_stats': '/api/pool/statements',
             'cache_stats': '/api/cache/stats'
         }
     })
@@ -61,6 +240,7 @@ def health():
 
 
 @app.route('/api/users', methods=['GET'])
+@cached_response('users')
 def get_users():
     """Get users with caching"""
     city = request.args.get('city')
@@ -73,63 +253,75 @@ def get_users():
         query = "SELECT id, username, email, city FROM users LIMIT 100"
         params = None
     
-    # Check cache
-    cached_result = cache.get(query, params)
+    analysis = {}
     
-    if cached_result is not None:
-        return jsonify({
-            'status': 'success',
-            'users': [dict(row) for row in cached_result],
-            'count': len(cached_result),
-            'cached': True
-        })
+    def load_users():
+        # Only one concurrent request per key reaches the pool
+        conn = pool.get_connection(hint=table_hint(query))
+        
+        try:
+            result = analyzer.analyze_query(conn, query, params)
+            analysis.update(result['analysis'])
+            return result['results']
+        finally:
+            pool.release_connection(conn)
     
-    # Cache miss - execute query
-    conn = pool.get_connection()
+    users = cache_manager.get_or_compute('queries', query, params, load_users)
     
-    try:
-        result = analyzer.analyze_query(conn.connection, query, params)
-        users = result['results']
-        
-        # Cache result
-        cache.set(query, params, users)
-        
-        return jsonify({
-            'status': 'success',
-            'users': [dict(row) for row in users],
-            'count': len(users),
-            'cached': False,
-            'execution_time': f"{result['analysis']['execution_time']:.4f}s"
-        })
-    finally:
-        pool.release_connection(conn)
+    response = {
+        'status': 'success',
+        'count': len(users)
+    }
+    
+    # Only this request's view of caching and timing; hits of the response cache omit them
+    request_fields = {'cached': not analysis}
+    if analysis:
+        request_fields['execution_time'] = f"{analysis['execution_time']:.4f}s"
+    
+    return rows_response(response, 'users', users, request_fields,
+                         response_ttl(query, params, users))
 
 
 @app.route('/api/orders', methods=['GET'])
+@cached_response('orders')
 def get_orders():
-    """Get orders with query optimization"""
+    """Get orders with query optimization and caching"""
     user_id = request.args.get('user_id', type=int)
     
-    conn = pool.get_connection()
+    if user_id:
+        query = "SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?"
+        params = (user_id,)
+    else:
+        query = "SELECT id, user_id, product, quantity, price, status FROM orders LIMIT 100"
+        params = None
     
-    try:
-        if user_id:
-            query = "SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?"
-            params = (user_id,)
-        else:
-            query = "SELECT id, user_id, product, quantity, price, status FROM orders LIMIT 100"
-            params = None
-        
-        result = analyzer.analyze_query(conn.connection, query, params)
+    analysis = {}
+    
+    def load_orders():
+        # Unknown user ids are cached as empty results and stop here
+        conn = pool.get_connection(hint=table_hint(query))
         
-        return jsonify({
-            'status': 'success',
-            'orders': [dict(row) for row in result['results']],
-            'count': len(result['results']),
-            'execution_time': f"{result['analysis']['execution_time']:.4f}s"
-        })
-    finally:
-        pool.release_connection(conn)
+        try:
+            result = analyzer.analyze_query(conn, query, params)
+            analysis.update(result['analysis'])
+            return result['results']
+        finally:
+            pool.release_connection(conn)
+    
+    orders = cache_manager.get_or_compute('queries', query, params, load_orders)
+    
+    response = {
+        'status': 'success',
+        'count': len(orders)
+    }
+    
+    # Only this request's view of caching and timing; hits of the response cache omit them
+    request_fields = {'cached': not analysis}
+    if analysis:
+        request_fields['execution_time'] = f"{analysis['execution_time']:.4f}s"
+    
+    return rows_response(response, 'orders', orders, request_fields,
+                         response_ttl(query, params, orders))
 
 
 @app.route('/api/stats', methods=['GET'])
@@ -161,7 +353,17 @@ def get_pool_stats():
     
     return jsonify({
         'status': 'success',
-        'pool_stats': stats
+        'pool_stats': stats,
+        'maintainer_stats': pool_maintainer.get_stats()
+    })
+
+
+@app.route('/api/pool/statements', methods=['GET'])
+def get_statement_stats():
+    """Get prepared-statement cache statistics per pooled connection"""
+    return jsonify({
+        'status': 'success',
+        'statement_stats': pool.get_statement_stats(top=request.args.get('top', 10, type=int))
     })
 
 
@@ -172,7 +374,13 @@ def get_cache_stats():
     
     return jsonify({
         'status': 'success',
-        'cache_stats': stats
+        'cache_stats': stats,
+        'shared_cache_stats': cache_manager.get_shared_stats(),
+        'disk_cache_stats': cache_manager.get_disk_stats(),
+        'warm_stats': cache_manager.get_warm_stats(),
+        'warmer_stats': warmer.get_stats(),
+        'validator_stats': validator.get_stats(),
+        'response_cache_stats': response_cache.get_stats()
     })
 
 
@@ -226,12 +434,14 @@ def get_table_indexes(table_name):
 
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
-    """Clear query cache"""
-    cache.clear()
+    """Clear query cache in every worker, then re-warm hot queries"""
+    cache_manager.clear_all()
+    warmed = warmer.warm()
     
     return jsonify({
         'status': 'success',
-        'message': 'Cache cleared'
+        'message': 'Cache cleared',
+        'warmed': warmed
     })
 
 
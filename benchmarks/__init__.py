@@ -0,0 +1,2 @@
+# Benchmarks package
+# Contains micro-benchmarks for the optimization features
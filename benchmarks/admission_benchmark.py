@@ -0,0 +1,107 @@
+"""
+Admission Benchmark
+Replays a query trace against QueryCache with and without TinyLFU admission
+
+Run from the repository root:
+    python -m benchmarks.admission_benchmark [trace.jsonl]
+
+A trace file holds one JSON array [query, params] per line. Without one,
+a synthetic trace mixes Zipf-distributed hot lookups with one-off
+/api/users?city=<random> style queries.
+"""
+
+import sys
+import json
+import random
+import logging
+
+from caching.query_cache import QueryCache
+
+USERS_QUERY = "SELECT id, username, email, city FROM users WHERE city = ?"
+ORDERS_QUERY = "SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?"
+
+
+def synthetic_trace(length=100000, hot_keys=2000, one_off_fraction=0.5, seed=42):
+    """
+    Generate a trace of hot lookups mixed with one-hit wonders
+    
+    Args:
+        length: Number of lookups
+        hot_keys: Distinct reusable keys (Zipf-distributed popularity)
+        one_off_fraction: Fraction of lookups with never-repeated params
+        seed: Random seed
+        
+    Returns:
+        List of (query, params) tuples
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, hot_keys + 1)]
+    hot = rng.choices(range(hot_keys), weights=weights, k=length)
+    
+    trace = []
+    for i, user_id in enumerate(hot):
+        if rng.random() < one_off_fraction:
+            trace.append((USERS_QUERY, (f"city-{i}",)))
+        else:
+            trace.append((ORDERS_QUERY, (user_id,)))
+    return trace
+
+
+def load_trace(path):
+    """
+    Load a trace file
+    
+    Args:
+        path: Path to a JSON-lines trace
+        
+    Returns:
+        List of (query, params) tuples
+    """
+    with open(path) as f:
+        return [(query, tuple(params) if params else None)
+                for query, params in map(json.loads, filter(str.strip, f))]
+
+
+def replay(trace, admission, max_size=500):
+    """
+    Replay a trace as get-then-set on miss
+    
+    Args:
+        trace: List of (query, params) tuples
+        admission: Admission policy (None or 'tinylfu')
+        max_size: Cache capacity
+        
+    Returns:
+        Cache statistics after the replay
+    """
+    cache = QueryCache(ttl=3600, max_size=max_size, admission=admission)
+    
+    for query, params in trace:
+        if cache.get(query, params) is None:
+            cache.set(query, params, [(1, 'row')])
+    
+    return cache.get_stats()
+
+
+def run_benchmark(trace=None, max_size=500):
+    """Run the benchmark and print results"""
+    logging.getLogger('caching').setLevel(logging.WARNING)
+    if trace is None:
+        trace = synthetic_trace()
+    
+    print("=" * 60)
+    print(f"QueryCache Hit Rate - {len(trace)} lookups, capacity {max_size}")
+    print("=" * 60)
+    
+    results = {}
+    for label, admission in (('Admit all (before)', None), ('TinyLFU (after)', 'tinylfu')):
+        stats = replay(trace, admission, max_size)
+        results[admission or 'none'] = stats
+        print(f"   {label:<20} hit rate {stats['hit_rate']:>7}  "
+              f"evictions {stats['evictions']:>7}  rejected {stats['admission_rejections']:>7}")
+    
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark(load_trace(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,120 @@
+"""
+Async Benchmark
+Compares AsyncConnectionPool with a thread per in-flight request
+
+Run from the repository root:
+    python -m benchmarks.async_benchmark
+
+Both models serve the same burst of concurrent /api/orders-style
+queries through a pool of max_connections. The threaded model starts
+one thread per request that blocks in the pool; the async model runs
+every request as a coroutine and only max_connections executor threads.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import threading
+
+from connection.connection_pool import ConnectionPool
+from connection.async_pool import AsyncConnectionPool
+from examples.database_setup import create_sample_database, populate_sample_data
+
+ORDERS_QUERY = "SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?"
+CONCURRENCY = (50, 200, 1000)
+
+
+def threaded(db_path, num_requests, max_connections):
+    """
+    Serve requests with one thread each
+    
+    Returns:
+        (requests per second, peak thread count)
+    """
+    pool = ConnectionPool(db_path, min_connections=max_connections, max_connections=max_connections)
+    rng = random.Random(42)
+    user_ids = [rng.randint(1, 1000) for _ in range(num_requests)]
+    in_flight = threading.Event()
+    
+    def handle(user_id):
+        in_flight.wait()
+        conn = pool.get_connection()
+        try:
+            conn.execute(ORDERS_QUERY, (user_id,)).fetchall()
+        finally:
+            pool.release_connection(conn)
+    
+    # Every request is in flight at once, each holding a thread
+    start = time.perf_counter()
+    threads = [threading.Thread(target=handle, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    peak_threads = threading.active_count()
+    in_flight.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    pool.close_all()
+    return num_requests / elapsed, peak_threads
+
+
+def asynchronous(db_path, num_requests, max_connections):
+    """
+    Serve requests as coroutines on AsyncConnectionPool
+    
+    Returns:
+        (requests per second, peak thread count)
+    """
+    rng = random.Random(42)
+    user_ids = [rng.randint(1, 1000) for _ in range(num_requests)]
+    
+    async def serve():
+        pool = AsyncConnectionPool(db_path, min_connections=max_connections,
+                                   max_connections=max_connections)
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(pool.fetchall(ORDERS_QUERY, (user_id,)) for user_id in user_ids))
+            elapsed = time.perf_counter() - start
+            return num_requests / elapsed, threading.active_count()
+        finally:
+            await pool.close()
+    
+    return asyncio.run(serve())
+
+
+def run_benchmark(max_connections=10):
+    """Run the benchmark and print results"""
+    logging.getLogger('connection').setLevel(logging.WARNING)
+    logging.getLogger('examples').setLevel(logging.WARNING)
+    db_path = os.path.join(tempfile.mkdtemp(), 'async_benchmark.db')
+    conn = create_sample_database(db_path)
+    populate_sample_data(conn, num_users=1000, num_orders=5000, num_products=100)
+    conn.close()
+    
+    print("=" * 60)
+    print(f"Concurrent Requests - pool of {max_connections} connections")
+    print("=" * 60)
+    print(f"   {'requests':>8}  {'thread/request':>22}  {'asyncio':>22}")
+    
+    results = []
+    try:
+        for num_requests in CONCURRENCY:
+            thread_rate, thread_peak = threaded(db_path, num_requests, max_connections)
+            async_rate, async_peak = asynchronous(db_path, num_requests, max_connections)
+            results.append({'requests': num_requests,
+                            'threaded': thread_rate, 'threaded_threads': thread_peak,
+                            'async': async_rate, 'async_threads': async_peak})
+            print(f"   {num_requests:>8}  {thread_rate:>7.0f} r/s {thread_peak:>5} thr  "
+                  f"{async_rate:>7.0f} r/s {async_peak:>5} thr")
+    finally:
+        os.remove(db_path)
+    
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,78 @@
+"""
+Cache Concurrency Benchmark
+Compares a single-lock QueryCache with ShardedQueryCache under thread load
+
+Run from the repository root:
+    python -m benchmarks.cache_concurrency_benchmark
+"""
+
+import time
+import random
+import threading
+
+from caching.query_cache import QueryCache
+from caching.sharded_cache import ShardedQueryCache
+
+QUERY = "SELECT id, username, email, city FROM users WHERE id = ?"
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def hammer(cache, num_threads, total_ops=200000, num_keys=1000, write_ratio=0.1):
+    """
+    Run get/set operations against a cache from several threads
+    
+    Args:
+        cache: QueryCache or ShardedQueryCache
+        num_threads: Number of worker threads
+        total_ops: Operations split across all threads
+        num_keys: Size of the key space
+        write_ratio: Fraction of operations that are sets
+        
+    Returns:
+        Operations per second
+    """
+    ops_per_thread = total_ops // num_threads
+    start_barrier = threading.Barrier(num_threads + 1)
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        keys = [(rng.randrange(num_keys),) for _ in range(ops_per_thread)]
+        writes = [rng.random() < write_ratio for _ in range(ops_per_thread)]
+        start_barrier.wait()
+        
+        for params, is_write in zip(keys, writes):
+            if is_write or cache.get(QUERY, params) is None:
+                cache.set(QUERY, params, [params])
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    return ops_per_thread * num_threads / elapsed
+
+
+def run_benchmark(num_shards=16):
+    """Run the benchmark and print results"""
+    print("=" * 60)
+    print(f"Cache Throughput - single lock vs {num_shards} shards")
+    print("=" * 60)
+    print(f"   {'threads':>7}  {'single lock':>14}  {'sharded':>14}")
+    
+    results = []
+    for num_threads in THREAD_COUNTS:
+        single = hammer(QueryCache(ttl=300, max_size=1000), num_threads)
+        sharded = hammer(ShardedQueryCache(num_shards, ttl=300, max_size=1000), num_threads)
+        results.append({'threads': num_threads, 'single_lock': single, 'sharded': sharded})
+        print(f"   {num_threads:>7}  {single:>10.0f} op/s  {sharded:>10.0f} op/s")
+    
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,69 @@
+"""
+Cache Key Benchmark
+Compares QueryCache hit latency with MD5 keys and interned fast keys
+
+Run from the repository root:
+    python -m benchmarks.cache_key_benchmark
+"""
+
+import time
+
+from caching.query_cache import QueryCache
+
+QUERIES = [
+    ("SELECT id, username, email, city FROM users WHERE city = ?", ('Chicago',)),
+    ("SELECT id, username, email, city FROM users LIMIT 100", None),
+    ("SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?", (42,)),
+    ("SELECT * FROM products WHERE category = ? AND price < ?", ('Books', 100.0)),
+]
+
+
+def measure_hit_latency(fast_keys, iterations=200000):
+    """
+    Measure average latency of a cache hit
+    
+    Args:
+        fast_keys: Whether the cache uses interned fast keys
+        iterations: Number of hits to time
+        
+    Returns:
+        Average seconds per hit
+    """
+    cache = QueryCache(ttl=300, max_size=1000, fast_keys=fast_keys)
+    
+    for query, params in QUERIES:
+        cache.set(query, params, [(1, 'row')])
+    
+    rounds = iterations // len(QUERIES)
+    start = time.perf_counter()
+    
+    for _ in range(rounds):
+        for query, params in QUERIES:
+            cache.get(query, params)
+    
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(QUERIES))
+
+
+def run_benchmark(iterations=200000):
+    """Run the benchmark and print results"""
+    print("=" * 60)
+    print("QueryCache Hit Latency - MD5 keys vs fast keys")
+    print("=" * 60)
+    
+    md5_latency = measure_hit_latency(False, iterations)
+    fast_latency = measure_hit_latency(True, iterations)
+    
+    print(f"   MD5 keys (before):  {md5_latency * 1e6:.3f} us/hit")
+    print(f"   Fast keys (after):  {fast_latency * 1e6:.3f} us/hit")
+    print(f"   Speedup:            {md5_latency / fast_latency:.2f}x")
+    
+    return {
+        'md5_latency': md5_latency,
+        'fast_latency': fast_latency,
+        'speedup': md5_latency / fast_latency
+    }
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,114 @@
+"""
+Columnar Storage Benchmark
+Compares cached sqlite3.Row lists with ColumnarResult for memory and hit latency
+
+Run from the repository root:
+    python -m benchmarks.columnar_benchmark
+"""
+
+import json
+import time
+import sqlite3
+import random
+import tracemalloc
+
+from caching.columnar import ColumnarResult
+
+STATUSES = ['pending', 'confirmed', 'shipped', 'delivered']
+
+
+def build_rows(num_rows=10000):
+    """
+    Fetch an orders-shaped result set from an in-memory database
+    
+    Args:
+        num_rows: Number of rows to generate
+        
+    Returns:
+        List of sqlite3.Row
+    """
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY, user_id INTEGER, product TEXT,
+            quantity INTEGER, price REAL, status TEXT
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO orders (user_id, product, quantity, price, status) VALUES (?, ?, ?, ?, ?)",
+        [
+            (random.randint(1, 1000), f'Product {random.randint(1, 100)}', random.randint(1, 5),
+             round(random.uniform(10, 500), 2), random.choice(STATUSES))
+            for _ in range(num_rows)
+        ]
+    )
+    rows = conn.execute(
+        "SELECT id, user_id, product, quantity, price, status FROM orders"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def measure_memory(factory):
+    """
+    Measure bytes allocated while building a cached result
+    
+    Args:
+        factory: Callable building the result
+        
+    Returns:
+        Tuple of (result, bytes allocated)
+    """
+    tracemalloc.start()
+    result = factory()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated
+
+
+def measure_serve_latency(serialize, iterations=20):
+    """
+    Measure average time to serialize a cached result for a response
+    
+    Args:
+        serialize: Callable producing the JSON body
+        iterations: Number of repetitions
+        
+    Returns:
+        Average seconds per serialization
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serialize()
+    return (time.perf_counter() - start) / iterations
+
+
+def run_benchmark(num_rows=10000):
+    """Run the benchmark and print results"""
+    print("=" * 60)
+    print(f"Cached Result Storage - {num_rows} rows")
+    print("=" * 60)
+    
+    # Rows are fetched again inside the measurement so both formats pay for their own objects
+    rows, rows_bytes = measure_memory(lambda: build_rows(num_rows))
+    columnar, columnar_bytes = measure_memory(lambda: ColumnarResult.from_rows(build_rows(num_rows)))
+    
+    rows_latency = measure_serve_latency(lambda: json.dumps([dict(row) for row in rows]))
+    columnar_latency = measure_serve_latency(columnar.to_json)
+    
+    print(f"   sqlite3.Row list:  {rows_bytes / 1024:.1f} KB, {rows_latency * 1000:.2f} ms/hit")
+    print(f"   ColumnarResult:    {columnar_bytes / 1024:.1f} KB, {columnar_latency * 1000:.2f} ms/hit")
+    print(f"   Memory saved:      {(1 - columnar_bytes / rows_bytes) * 100:.1f}%")
+    print(f"   Hit speedup:       {rows_latency / columnar_latency:.2f}x")
+    
+    return {
+        'rows_bytes': rows_bytes,
+        'columnar_bytes': columnar_bytes,
+        'rows_latency': rows_latency,
+        'columnar_latency': columnar_latency
+    }
+
+
+if __name__ == '__main__':
+    run_benchmark()
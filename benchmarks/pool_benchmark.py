@@ -0,0 +1,129 @@
+"""
+Pool Benchmark
+Measures in-use connection tracking as the pool grows, list against set
+
+Run from the repository root:
+    python -m benchmarks.pool_benchmark
+
+Every connection but one is held while the benchmark tracks and untracks
+the last one, the way get_connection and release_connection do. The list
+baseline is the tracking the pool used before (append, `in`, remove); the
+set is what it uses now (add, `in`, discard). Constant cost across sizes
+means membership checks do not scan the pool.
+
+Full acquire/release pairs are timed with validate-on-borrow and
+validate-on-return off, so health-check PRAGMAs do not hide the tracking
+cost.
+"""
+
+import os
+import time
+import logging
+import tempfile
+
+from connection.connection_pool import ConnectionPool
+
+POOL_SIZES = (10, 50, 200, 1000)
+
+
+def track_list(held, conn, iterations):
+    """
+    Time list-based in-use tracking of one connection
+    
+    Args:
+        held: Connections already in use
+        conn: Connection acquired and released
+        iterations: Number of acquire/release pairs
+        
+    Returns:
+        Microseconds per pair
+    """
+    in_use = list(held)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        in_use.append(conn)
+        if conn in in_use:
+            in_use.remove(conn)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def track_set(held, conn, iterations):
+    """
+    Time set-based in-use tracking of one connection
+    
+    Args:
+        held: Connections already in use
+        conn: Connection acquired and released
+        iterations: Number of acquire/release pairs
+        
+    Returns:
+        Microseconds per pair
+    """
+    in_use = set(held)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        in_use.add(conn)
+        if conn in in_use:
+            in_use.discard(conn)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def acquire_release(pool, iterations):
+    """
+    Time acquire/release pairs on a pool
+    
+    Args:
+        pool: ConnectionPool with one idle connection
+        iterations: Number of acquire/release pairs
+        
+    Returns:
+        Microseconds per pair
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pool.release_connection(pool.get_connection())
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run_benchmark(iterations=50000):
+    """Run the benchmark and print results"""
+    logging.getLogger('connection').setLevel(logging.WARNING)
+    db_path = os.path.join(tempfile.mkdtemp(), 'pool_benchmark.db')
+    
+    print("=" * 60)
+    print(f"In-Use Tracking - {iterations} pairs, all but one connection in use")
+    print("=" * 60)
+    print(f"   {'size':>5}  {'list':>9}  {'set':>9}  {'speedup':>8}  {'pool pair':>10}")
+    
+    results = []
+    try:
+        for pool_size in POOL_SIZES:
+            pool = ConnectionPool(db_path, min_connections=pool_size, max_connections=pool_size,
+                                  validate_on_borrow=False, validate_on_return=False)
+            held = [pool.get_connection() for _ in range(pool_size - 1)]
+            conn = pool.idle_connections()[0]
+            
+            list_time = track_list(held, conn, iterations)
+            set_time = track_set(held, conn, iterations)
+            pair_time = acquire_release(pool, iterations)
+            results.append({
+                'pool_size': pool_size,
+                'list_microseconds': list_time,
+                'set_microseconds': set_time,
+                'pool_microseconds': pair_time
+            })
+            print(f"   {pool_size:>5}  {list_time:>6.3f} us  {set_time:>6.3f} us  "
+                  f"{list_time / set_time:>7.1f}x  {pair_time:>7.2f} us")
+            
+            for held_conn in held:
+                pool.release_connection(held_conn)
+            pool.close_all()
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+    
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
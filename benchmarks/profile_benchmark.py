@@ -0,0 +1,121 @@
+"""
+Profile Benchmark
+Compares ConnectionPool tuning profiles on the API endpoint queries
+
+Run from the repository root:
+    python -m benchmarks.profile_benchmark
+
+Each profile gets a fresh sample database (journal_mode persists in the
+file) and a pool shared by several threads. The read workload runs the
+uncached /api/users and /api/orders queries; the mixed workload turns
+one request in ten into an order insert and commit.
+"""
+
+import os
+import time
+import random
+import logging
+import tempfile
+import threading
+
+from connection.connection_pool import ConnectionPool
+from connection.tuning import PROFILES
+from examples.database_setup import create_sample_database, populate_sample_data
+
+USERS_QUERY = "SELECT id, username, email, city FROM users WHERE city = ?"
+ORDERS_QUERY = "SELECT id, user_id, product, quantity, price, status FROM orders WHERE user_id = ?"
+INSERT_ORDER = "INSERT INTO orders (user_id, product, quantity, price, status) VALUES (?, ?, ?, ?, ?)"
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
+NUM_USERS = 1000
+
+
+def request(conn, rng, write_ratio):
+    """Run one endpoint's query (or an order insert) on a pooled connection"""
+    if rng.random() < write_ratio:
+        conn.execute(INSERT_ORDER, (rng.randint(1, NUM_USERS), 'Product 1', 1, 9.99, 'pending'))
+        conn.commit()
+    elif rng.random() < 0.5:
+        conn.execute(USERS_QUERY, (rng.choice(CITIES),)).fetchall()
+    else:
+        conn.execute(ORDERS_QUERY, (rng.randint(1, NUM_USERS),)).fetchall()
+
+
+def run_workload(pool, num_threads, requests_per_thread, write_ratio):
+    """
+    Run requests from several threads against a pool
+    
+    Args:
+        pool: ConnectionPool
+        num_threads: Number of request threads
+        requests_per_thread: Requests per thread
+        write_ratio: Fraction of requests that insert an order
+        
+    Returns:
+        Requests per second
+    """
+    start_barrier = threading.Barrier(num_threads + 1)
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        start_barrier.wait()
+        for _ in range(requests_per_thread):
+            conn = pool.get_connection()
+            try:
+                request(conn, rng, write_ratio)
+            finally:
+                pool.release_connection(conn)
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    return num_threads * requests_per_thread / elapsed
+
+
+def run_benchmark(num_threads=8, requests_per_thread=1000, repeat=3):
+    """Run the benchmark and print results"""
+    logging.getLogger('connection').setLevel(logging.WARNING)
+    logging.getLogger('examples').setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp()
+    
+    print("=" * 60)
+    print(f"Tuning Profiles - {num_threads} threads x {requests_per_thread} requests, best of {repeat}")
+    print("=" * 60)
+    print(f"   {'profile':<12}  {'reads':>12}  {'10% writes':>12}")
+    
+    results = []
+    for profile in PROFILES:
+        db_path = os.path.join(workdir, f"{profile}.db")
+        conn = create_sample_database(db_path)
+        random.seed(42)
+        populate_sample_data(conn, num_users=NUM_USERS, num_orders=5000, num_products=100)
+        conn.close()
+        
+        pool = ConnectionPool(db_path, min_connections=num_threads, max_connections=num_threads,
+                              profile=profile)
+        try:
+            # Best of several runs, to filter scheduler noise
+            reads = max(run_workload(pool, num_threads, requests_per_thread, write_ratio=0)
+                        for _ in range(repeat))
+            mixed = max(run_workload(pool, num_threads, requests_per_thread, write_ratio=0.1)
+                        for _ in range(repeat))
+        finally:
+            pool.close_all()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+        
+        results.append({'profile': profile, 'reads': reads, 'mixed': mixed})
+        print(f"   {profile:<12}  {reads:>8.0f} r/s  {mixed:>8.0f} r/s")
+    
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,86 @@
+"""
+Statement Cache Benchmark
+Measures what re-preparing statements costs on the API endpoint queries
+
+Run from the repository root:
+    python -m benchmarks.statement_cache_benchmark
+
+The same queries run on pooled connections with the prepared-statement
+cache disabled (every execute parses and plans again) and enabled. The
+difference per query is the parse/plan cost the cache saves.
+"""
+
+import os
+import time
+import random
+import logging
+import tempfile
+
+from connection.connection_pool import ConnectionPool
+from examples.database_setup import create_sample_database, populate_sample_data
+
+QUERIES = (
+    ("SELECT id, username, email, city FROM users WHERE id = ?", lambda rng: (rng.randint(1, 1000),)),
+    ("SELECT id, user_id, product, quantity, price, status FROM orders WHERE id = ?",
+     lambda rng: (rng.randint(1, 5000),)),
+)
+CACHE_SIZES = (0, 128)
+
+
+def run_queries(pool, iterations):
+    """
+    Run the queries on one pooled connection
+    
+    Returns:
+        (microseconds per query, statement cache statistics)
+    """
+    rng = random.Random(42)
+    workload = [QUERIES[i % len(QUERIES)] for i in range(iterations)]
+    params = [make_params(rng) for _, make_params in workload]
+    
+    conn = pool.get_connection()
+    try:
+        start = time.perf_counter()
+        for (query, _), query_params in zip(workload, params):
+            conn.execute(query, query_params).fetchall()
+        elapsed = time.perf_counter() - start
+        return elapsed / iterations * 1e6, conn.get_statement_stats()
+    finally:
+        pool.release_connection(conn)
+
+
+def run_benchmark(iterations=100000):
+    """Run the benchmark and print results"""
+    logging.getLogger('connection').setLevel(logging.WARNING)
+    logging.getLogger('examples').setLevel(logging.WARNING)
+    db_path = os.path.join(tempfile.mkdtemp(), 'statement_benchmark.db')
+    conn = create_sample_database(db_path)
+    populate_sample_data(conn, num_users=1000, num_orders=5000, num_products=100)
+    conn.close()
+    
+    print("=" * 60)
+    print(f"Prepared Statement Cache - {iterations} primary-key lookups")
+    print("=" * 60)
+    
+    results = {}
+    try:
+        for cache_size in CACHE_SIZES:
+            pool = ConnectionPool(db_path, min_connections=1, max_connections=1,
+                                  statement_cache_size=cache_size)
+            per_query, stats = run_queries(pool, iterations)
+            pool.close_all()
+            
+            results[cache_size] = per_query
+            print(f"   cache size {cache_size:>4}  {per_query:>7.2f} us/query  "
+                  f"prepares {stats['prepares']:>7}  hit rate {stats['hit_rate']:>7}")
+    finally:
+        os.remove(db_path)
+    
+    parse_cost = results[CACHE_SIZES[0]] - results[CACHE_SIZES[-1]]
+    print(f"   Parse/plan cost saved: {parse_cost:.2f} us per query "
+          f"({parse_cost / results[CACHE_SIZES[0]] * 100:.0f}% of uncached time)")
+    return results
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,191 @@
+"""
+Cache Admission
+TinyLFU admission filter keeping one-hit wonders out of full caches
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-row seeds mixed into the key hash (odd 64-bit constants)
+SKETCH_SEEDS = (0x97CB3127, 0xB2E1A2F1, 0xC2B2AE3D, 0x27D4EB2F)
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+HASH_MASK = (1 << 64) - 1
+
+# Counters saturate at 15, like 4-bit counters
+MAX_COUNT = 15
+
+# byte -> byte // 2, used to age every counter in one C-level pass
+_HALVE = bytes(value >> 1 for value in range(256))
+
+
+def _power_of_two(value):
+    """Smallest power of two >= value"""
+    return 1 << max(value - 1, 1).bit_length()
+
+
+class CountMinSketch:
+    """
+    Approximate access counts in a few rows of small counters
+    
+    Each key maps to one counter per row; its count is the minimum of
+    those counters, which can only overestimate.
+    """
+    
+    def __init__(self, width, depth=4):
+        """
+        Initialize sketch
+        
+        Args:
+            width: Counters per row (rounded up to a power of two)
+            depth: Number of rows
+        """
+        self.width = _power_of_two(width)
+        self.mask = self.width - 1
+        self.rows = [bytearray(self.width) for _ in range(depth)]
+        self.seeds = SKETCH_SEEDS[:depth]
+    
+    def _indexes(self, key_hash):
+        """Counter index of a key hash in each row"""
+        return [(((key_hash ^ seed) * HASH_MULTIPLIER & HASH_MASK) >> 32) & self.mask
+                for seed in self.seeds]
+    
+    def increment(self, key_hash):
+        """Count one access"""
+        for row, index in zip(self.rows, self._indexes(key_hash)):
+            if row[index] < MAX_COUNT:
+                row[index] += 1
+    
+    def estimate(self, key_hash):
+        """Estimated access count"""
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key_hash)))
+    
+    def halve(self):
+        """Age all counts so the sketch follows recent popularity"""
+        self.rows = [row.translate(_HALVE) for row in self.rows]
+
+
+class Doorkeeper:
+    """
+    Bloom filter absorbing the first access of each key
+    
+    Keys seen once only set two bits here, so one-hit wonders never
+    reach the sketch counters.
+    """
+    
+    def __init__(self, num_bits):
+        """
+        Initialize doorkeeper
+        
+        Args:
+            num_bits: Filter size in bits (rounded up to a power of two)
+        """
+        self.num_bits = _power_of_two(num_bits)
+        self.mask = self.num_bits - 1
+        self.bits = bytearray(self.num_bits // 8 or 1)
+    
+    def _positions(self, key_hash):
+        """Bit positions of a key hash"""
+        mixed = key_hash * HASH_MULTIPLIER & HASH_MASK
+        return (mixed & self.mask, (mixed >> 32) & self.mask)
+    
+    def __contains__(self, key_hash):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key_hash))
+    
+    def add(self, key_hash):
+        """
+        Add a key hash
+        
+        Returns:
+            True if it was (probably) already present
+        """
+        present = True
+        for pos in self._positions(key_hash):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                present = False
+        return present
+    
+    def clear(self):
+        """Forget all keys"""
+        self.bits = bytearray(len(self.bits))
+
+
+class TinyLFU:
+    """
+    Frequency-based admission filter (TinyLFU)
+    
+    Every cache access is recorded. When a full cache would evict a victim
+    to make room for a new entry, the entry is admitted only if it has
+    been requested more often than the victim. After sample_factor times
+    the capacity of accesses, all counts are halved and the doorkeeper is
+    cleared, so old popularity fades.
+    """
+    
+    def __init__(self, capacity, sample_factor=10):
+        """
+        Initialize admission filter
+        
+        Args:
+            capacity: Cache capacity in entries
+            sample_factor: Accesses per reset, as a multiple of capacity
+        """
+        self.capacity = capacity
+        self.sketch = CountMinSketch(max(capacity, 16))
+        self.doorkeeper = Doorkeeper(max(capacity, 16) * 8)
+        self.sample_size = max(capacity * sample_factor, 1)
+        self.accesses = 0
+        self.resets = 0
+    
+    def record(self, key):
+        """
+        Record an access to a cache key
+        
+        Args:
+            key: Hashable cache key
+        """
+        key_hash = hash(key)
+        if self.doorkeeper.add(key_hash):
+            self.sketch.increment(key_hash)
+        
+        self.accesses += 1
+        if self.accesses >= self.sample_size:
+            self._reset()
+    
+    def frequency(self, key):
+        """
+        Estimated recent access count of a key
+        
+        Args:
+            key: Hashable cache key
+            
+        Returns:
+            Estimated count
+        """
+        key_hash = hash(key)
+        count = self.sketch.estimate(key_hash)
+        if key_hash in self.doorkeeper:
+            count += 1
+        return count
+    
+    def admit(self, candidate, victim):
+        """
+        Decide whether a new entry may replace an eviction victim
+        
+        Args:
+            candidate: Key of the entry to be cached
+            victim: Key the eviction policy would remove
+            
+        Returns:
+            True if the candidate is more likely to be reused
+        """
+        return self.frequency(candidate) > self.frequency(victim)
+    
+    def _reset(self):
+        """Halve all counts"""
+        self.sketch.halve()
+        self.doorkeeper.clear()
+        self.accesses //= 2
+        self.resets += 1
+        logger.debug(f"Admission sketch aged (reset {self.resets})")
@@ -3,8 +3,13 @@ Cache Manager
 Manages multiple caches and cache strategies
 """
 
+import time
 import logging
-from caching.query_cache import QueryCache
+from contextlib import contextmanager
+from threading import local
+from caching.query_cache import QueryCache, is_empty_result
+from caching.sharded_cache import ShardedQueryCache
+from caching.table_dependencies import extract_tables, extract_written_tables
 
 logger = logging.getLogger(__name__)
 
@@ -12,13 +17,39 @@ logger = logging.getLogger(__name__)
 class CacheManager:
     """
     Manages multiple query caches
+    
+    With a shared_cache (e.g. SharedMemoryCache) the manager reads through
+    two tiers: the in-process cache first, then the tier shared by every
+    worker on the host. Invalidations go to both tiers and are broadcast
+    to the other workers, which apply them in sync_invalidations(). Caches
+    created here forward their own invalidations (including those made
+    through CacheStrategy) to the lower tiers.
+    
+    A disk_cache (DiskCache) adds a last tier that survives restarts;
+    warm_from_disk() reloads its hottest entries into a cache at startup.
+    
+    For caches with a validator, lower-tier entries carry the stamp taken
+    before their result was loaded and are only used while it is current.
+    Validators whose stamps other processes cannot check bypass the lower
+    tiers.
     """
     
-    def __init__(self):
+    def __init__(self, shared_cache=None, disk_cache=None):
+        """
+        Initialize cache manager
+        
+        Args:
+            shared_cache: Optional cross-process cache tier
+            disk_cache: Optional persistent cache tier
+        """
         self.caches = {}
+        self.shared_cache = shared_cache
+        self.disk_cache = disk_cache
+        self.warm_stats = {}
+        self._local = local()
         logger.info("Cache Manager initialized")
     
-    def create_cache(self, name, ttl=300, max_size=1000):
+    def create_cache(self, name, ttl=300, max_size=1000, policy='lru', num_shards=1, **options):
         """
         Create a named cache
         
@@ -26,32 +57,363 @@ class CacheManager:
             name: Cache name
             ttl: Time to live
             max_size: Maximum cache size
+            policy: Eviction policy ('lru', 'lfu' or 'fifo')
+            num_shards: Lock-striped shards (1 for a single QueryCache)
+            options: Other QueryCache options
+        """
+        if num_shards > 1:
+            self.caches[name] = ShardedQueryCache(num_shards, ttl, max_size, policy=policy, **options)
+        else:
+            self.caches[name] = QueryCache(ttl, max_size, policy, **options)
+        if self.shared_cache is not None or self.disk_cache is not None:
+            self.caches[name].add_invalidation_listener(self._invalidate_lower)
+        logger.info(f"Cache created: {name} (TTL={ttl}s, max_size={max_size}, policy={policy})")
+        return self.caches[name]
+    
+    def _invalidate_lower(self, tables):
+        """
+        Invalidation listener forwarding a cache's invalidations to the lower tiers
+        
+        Args:
+            tables: Invalidated table names, or None for everything
         """
-        self.caches[name] = QueryCache(ttl, max_size)
-        logger.info(f"Cache created: {name} (TTL={ttl}s, max_size={max_size})")
+        if getattr(self._local, 'local_only', False):
+            return
+        if tables is None:
+            tables = ()
+        elif not tables:
+            # Only entries with unknown tables were dropped; the lower
+            # tiers treat an empty table list as everything
+            return
+        if self.shared_cache is not None:
+            self.shared_cache.invalidate_tables(*tables)
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate_tables(*tables)
+    
+    @contextmanager
+    def _local_only(self):
+        """Stop cache invalidations in this thread from reaching the lower tiers"""
+        self._local.local_only = True
+        try:
+            yield
+        finally:
+            self._local.local_only = False
     
     def get_cache(self, name):
         """Get cache by name"""
         return self.caches.get(name)
     
     def clear_cache(self, name):
-        """Clear specific cache"""
+        """Clear specific cache (and the lower tiers it forwards to)"""
         if name in self.caches:
             self.caches[name].clear()
             logger.info(f"Cache cleared: {name}")
     
     def clear_all(self):
         """Clear all caches"""
-        for cache in self.caches.values():
-            cache.clear()
+        with self._local_only():
+            for cache in self.caches.values():
+                cache.clear()
+        if self.shared_cache is not None:
+            self.shared_cache.clear()
+        if self.disk_cache is not None:
+            self.disk_cache.clear()
         logger.info("All caches cleared")
     
+    def get(self, name, query, params=None):
+        """
+        Get a cached result from the named cache, then the lower tiers
+        
+        Args:
+            name: Cache name
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Cached result or None
+        """
+        self.sync_invalidations()
+        cache = self.caches[name]
+        
+        result = cache.get(query, params)
+        if result is None:
+            if not self._uses_tiers(cache):
+                return None
+            entry = self._get_lower(query, params, cache.validator)
+            if entry is not None:
+                result, stamp = entry
+                cache.set(query, params, result, stamp=stamp, learn=False)
+        elif self.disk_cache is not None:
+            self.disk_cache.touch(query, params)
+        return result
+    
+    def _uses_tiers(self, cache):
+        """Check if a cache can read through the shared and disk tiers"""
+        if self.shared_cache is None and self.disk_cache is None:
+            return False
+        validator = getattr(cache, 'validator', None)
+        return validator is None or validator.shareable
+    
+    def _tables(self, query, tables=None):
+        """Normalized tables a query reads (parsed from the SQL if None)"""
+        if tables is None:
+            tables = extract_tables(query)
+        return frozenset(table.lower() for table in tables)
+    
+    def _stamp(self, validator, query, tables=None):
+        """Validator stamp for a result about to be loaded (None without a validator)"""
+        if validator is None:
+            return None
+        return validator.stamp(self._tables(query, tables))
+    
+    def _get_lower(self, query, params, validator=None, tables=None):
+        """
+        Look a query up in the shared tier, then on disk
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            validator: Validator the entry's stamp must satisfy (None to skip)
+            tables: Tables the query reads (parsed from the SQL if None)
+            
+        Returns:
+            (result, stamp) tuple, or None
+        """
+        def is_current(entry):
+            if entry is None or validator is None:
+                return entry is not None
+            if validator.is_current(entry[1], self._tables(query, tables)):
+                return True
+            logger.debug(f"Lower-tier result outdated by a write: {query[:50]}")
+            return False
+        
+        if self.shared_cache is not None:
+            entry = self.shared_cache.get_stamped(query, params)
+            if is_current(entry):
+                return entry
+        
+        if self.disk_cache is not None:
+            entry = self.disk_cache.get_stamped(query, params)
+            if is_current(entry):
+                if self.shared_cache is not None:
+                    self.shared_cache.set(query, params, entry[0], tables, entry[1])
+                return entry
+        
+        return None
+    
+    def set(self, name, query, params, result, tables=None):
+        """
+        Cache a result in the named cache and the lower tiers
+        
+        Args:
+            name: Cache name
+            query: SQL query string
+            params: Query parameters
+            result: Query result to cache
+            tables: Tables the query reads (parsed from the SQL if None)
+        """
+        cache = self.caches[name]
+        stamp = self._stamp(getattr(cache, 'validator', None), query, tables)
+        cache.set(query, params, result, tables, stamp)
+        if self._uses_tiers(cache):
+            self._set_lower(query, params, result, tables, stamp)
+    
+    def _set_lower(self, query, params, result, tables=None, stamp=None):
+        """Store a result and its validator stamp in the shared and disk tiers"""
+        if is_empty_result(result):
+            # Empty sets stay in the in-process negative store and its budget
+            return
+        if self.shared_cache is not None:
+            self.shared_cache.set(query, params, result, tables, stamp)
+        if self.disk_cache is not None:
+            self.disk_cache.set(query, params, result, tables, stamp)
+    
+    def get_or_compute(self, name, query, params, loader, timeout=30, tables=None):
+        """
+        Get a result from either tier or compute it once
+        
+        Concurrent misses in this process are coalesced by the named cache;
+        the winner checks the shared and disk tiers before running the loader.
+        Background refreshes of the named cache always run the loader and
+        write its result through to the lower tiers.
+        
+        Args:
+            name: Cache name
+            query: SQL query string
+            params: Query parameters
+            loader: Zero-argument callable that runs the query
+            timeout: Seconds to wait for another caller's load
+            tables: Tables the query reads (parsed from the SQL if None)
+            
+        Returns:
+            Query result
+        """
+        self.sync_invalidations()
+        cache = self.caches[name]
+        
+        if not self._uses_tiers(cache):
+            return cache.get_or_compute(query, params, loader, timeout, tables)
+        
+        validator = cache.validator
+        loaded = []
+        
+        def lower():
+            loaded.append(True)
+            entry = self._get_lower(query, params, validator, tables)
+            return entry[0] if entry is not None else None
+        
+        def load():
+            loaded.append(True)
+            stamp = self._stamp(validator, query, tables)
+            result = loader()
+            self._set_lower(query, params, result, tables, stamp)
+            return result
+        
+        result = cache.get_or_compute(query, params, load, timeout, tables, fallback=lower)
+        if not loaded and self.disk_cache is not None:
+            # Hits count towards the entries reloaded after a restart
+            self.disk_cache.touch(query, params)
+        return result
+    
+    def invalidate_tables(self, *tables):
+        """
+        Invalidate entries reading any of the tables in every tier and worker
+        
+        Args:
+            tables: Table names that were modified
+            
+        Returns:
+            Number of entries invalidated
+        """
+        with self._local_only():
+            removed = sum(cache.invalidate_tables(*tables) for cache in self.caches.values())
+        if self.shared_cache is not None:
+            removed += self.shared_cache.invalidate_tables(*tables)
+        if self.disk_cache is not None:
+            removed += self.disk_cache.invalidate_tables(*tables)
+        return removed
+    
+    def warm_from_disk(self, name, limit=None):
+        """
+        Reload the hottest persisted entries into a cache
+        
+        Entries whose schema or data version no longer matches, or whose
+        validator stamp is outdated, are rejected. Hit rate since warming
+        is reported by get_warm_stats().
+        
+        Args:
+            name: Cache name
+            limit: Maximum entries to load (default: the cache's max_size)
+            
+        Returns:
+            Number of entries loaded
+        """
+        cache = self.caches[name]
+        if self.disk_cache is None or not self._uses_tiers(cache):
+            return 0
+        
+        validator = cache.validator
+        start_time = time.time()
+        rejected_before = self.disk_cache.stale_rejections
+        loaded = 0
+        outdated = 0
+        
+        for query, params, tables, result, stamp in self.disk_cache.hottest(limit or cache.max_size):
+            if validator is not None and not validator.is_current(stamp, self._tables(query, tables)):
+                outdated += 1
+                continue
+            cache.set(query, params, result, tables, stamp, learn=False)
+            loaded += 1
+        
+        warm_time = time.time() - start_time
+        self.warm_stats[name] = {
+            'entries_loaded': loaded,
+            'stale_rejected': self.disk_cache.stale_rejections - rejected_before + outdated,
+            'warm_time_seconds': round(warm_time, 4),
+            'hits_at_warm': cache.hits,
+            'misses_at_warm': cache.misses
+        }
+        
+        logger.info(f"Cache warmed from disk: {name} ({loaded} entries in {warm_time:.3f}s)")
+        return loaded
+    
+    def get_warm_stats(self):
+        """Get warm-up results and hit rate since warming per cache"""
+        stats = {}
+        for name, warm in self.warm_stats.items():
+            cache = self.caches[name]
+            hits = cache.hits - warm['hits_at_warm']
+            misses = cache.misses - warm['misses_at_warm']
+            requests = hits + misses
+            hit_rate = (hits / requests * 100) if requests > 0 else 0
+            
+            stats[name] = {
+                'entries_loaded': warm['entries_loaded'],
+                'stale_rejected': warm['stale_rejected'],
+                'warm_time_seconds': warm['warm_time_seconds'],
+                'requests_since_warm': requests,
+                'hit_rate_since_warm': f"{hit_rate:.2f}%"
+            }
+        return stats
+    
+    def sync_invalidations(self):
+        """
+        Apply invalidations broadcast by other workers to local caches
+        
+        Returns:
+            Number of broadcasts applied
+        """
+        if self.shared_cache is None:
+            return 0
+        
+        invalidations = self.shared_cache.poll_invalidations()
+        # The sending worker already cleared the lower tiers
+        with self._local_only():
+            for tables in invalidations:
+                for cache in self.caches.values():
+                    if tables is None:
+                        cache.invalidate()
+                    else:
+                        cache.invalidate_tables(*tables)
+        
+        if invalidations:
+            logger.debug(f"Applied {len(invalidations)} invalidations from other workers")
+        return len(invalidations)
+    
     def get_all_stats(self):
         """Get statistics for all caches"""
         stats = {}
         for name, cache in self.caches.items():
             stats[name] = cache.get_stats()
         return stats
+    
+    def get_shared_stats(self):
+        """Get statistics of the shared tier (None without one)"""
+        if self.shared_cache is None:
+            return None
+        return self.shared_cache.get_stats()
+    
+    def get_disk_stats(self):
+        """Get statistics of the disk tier (None without one)"""
+        if self.disk_cache is None:
+            return None
+        return self.disk_cache.get_stats()
+    
+    def get_policy_stats(self):
+        """Get hit rates aggregated per eviction policy"""
+        totals = {}
+        for cache in self.caches.values():
+            policy_totals = totals.setdefault(cache.policy, {'caches': 0, 'hits': 0, 'misses': 0})
+            policy_totals['caches'] += 1
+            policy_totals['hits'] += cache.hits
+            policy_totals['misses'] += cache.misses
+        
+        for policy_totals in totals.values():
+            requests = policy_totals['hits'] + policy_totals['misses']
+            hit_rate = (policy_totals['hits'] / requests * 100) if requests > 0 else 0
+            policy_totals['hit_rate'] = f"{hit_rate:.2f}%"
+        
+        return totals
 
 
 class CacheStrategy:
@@ -67,10 +429,34 @@ class CacheStrategy:
         Args:
             cache: QueryCache instance
             table_name: Table that was modified
+            
+        Returns:
+            Number of entries invalidated
+        """
+        # Only entries that read the table are dropped
+        removed = cache.invalidate_tables(table_name)
+        logger.info(f"Cache invalidated for table: {table_name} ({removed} entries)")
+        return removed
+    
+    @staticmethod
+    def invalidate_for_statement(cache, statement):
         """
-        # In simple implementation, clear entire cache
-        cache.clear()
-        logger.info(f"Cache invalidated for table: {table_name}")
+        Invalidate cache entries affected by a write statement
+        
+        Args:
+            cache: QueryCache instance
+            statement: INSERT, UPDATE, REPLACE or DELETE statement
+            
+        Returns:
+            Number of entries invalidated
+        """
+        tables = extract_written_tables(statement)
+        if not tables:
+            return 0
+        
+        removed = cache.invalidate_tables(*tables)
+        logger.info(f"Cache invalidated for tables: {', '.join(sorted(tables))} ({removed} entries)")
+        return removed
     
     @staticmethod
     def invalidate_pattern(cache, pattern):
@@ -79,8 +465,11 @@ class CacheStrategy:
         
         Args:
             cache: QueryCache instance
-            pattern: Pattern to match
+            pattern: Glob pattern or compiled regex matched against the query
+            
+        Returns:
+            Number of entries invalidated
         """
-        # Simple implementation - would need more sophisticated matching
-        cache.clear()
-        logger.info(f"Cache invalidated for pattern: {pattern}")
+        removed = cache.invalidate_matching(pattern)
+        logger.info(f"Cache invalidated for pattern: {pattern} ({removed} entries)")
+        return removed
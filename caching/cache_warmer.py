@@ -0,0 +1,209 @@
+"""
+Cache Warmer
+Prefills query caches with the hottest queries from QueryAnalyzer history
+"""
+
+import os
+import json
+import time
+import logging
+from threading import Thread, Event
+
+logger = logging.getLogger(__name__)
+
+
+def _params_key(params):
+    """Hashable form of query parameters"""
+    if not params:
+        return ()
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params)
+
+
+class CacheWarmer:
+    """
+    Cache warming job driven by query history
+    
+    Query and params pairs from QueryAnalyzer.query_history are ranked by
+    total execution time (how often they ran times how long they took),
+    and the top K are loaded into the cache. Results are stamped before
+    loading, so a write during the load is caught by the cache's
+    validator, and bypass the admission filter. The selected plan can be
+    saved to a file so a restarted process, whose history is empty, warms
+    the same queries.
+    """
+    
+    def __init__(self, cache, analyzer, loader, top_k=50, window=None, plan_path=None):
+        """
+        Initialize cache warmer
+        
+        Args:
+            cache: QueryCache (or ShardedQueryCache) to fill
+            analyzer: QueryAnalyzer whose history is ranked
+            loader: Callable(query, params) running a query
+            top_k: Number of query and params pairs to warm
+            window: Only rank history from the last window seconds (None for all)
+            plan_path: JSON file the plan is saved to and loaded from
+        """
+        self.cache = cache
+        self.analyzer = analyzer
+        self.loader = loader
+        self.top_k = top_k
+        self.window = window
+        self.plan_path = plan_path
+        
+        self._stop = Event()
+        self._thread = None
+        
+        self.runs = 0
+        self.warmed = 0
+        self.errors = 0
+        self.last_warm_time = 0
+        self.last_warmed_at = None
+        
+        logger.info(f"Cache Warmer initialized (top_k={top_k})")
+    
+    def select(self, top_k=None):
+        """
+        Rank query and params pairs from the analyzer history
+        
+        Args:
+            top_k: Number of pairs to return (default: self.top_k)
+            
+        Returns:
+            List of dicts with query, params, count, total_time
+        """
+        since = time.time() - self.window if self.window else 0
+        ranked = {}
+        
+        for analysis in list(self.analyzer.query_history):
+            if analysis['timestamp'] < since:
+                continue
+            
+            key = (analysis['query'], _params_key(analysis['params']))
+            candidate = ranked.get(key)
+            if candidate is None:
+                candidate = ranked[key] = {
+                    'query': analysis['query'],
+                    'params': analysis['params'],
+                    'count': 0,
+                    'total_time': 0.0
+                }
+            candidate['count'] += 1
+            candidate['total_time'] += analysis['execution_time']
+        
+        plan = sorted(ranked.values(), key=lambda c: (c['total_time'], c['count']), reverse=True)
+        return plan[:top_k or self.top_k]
+    
+    def save_plan(self, plan):
+        """
+        Save a warm plan to plan_path
+        
+        Args:
+            plan: List from select()
+        """
+        if not self.plan_path:
+            return
+        
+        entries = [{'query': c['query'], 'params': c['params']} for c in plan]
+        with open(self.plan_path, 'w') as f:
+            json.dump(entries, f)
+    
+    def load_plan(self):
+        """
+        Load the plan saved by a previous process
+        
+        Returns:
+            List of dicts with query and params
+        """
+        if not self.plan_path or not os.path.exists(self.plan_path):
+            return []
+        
+        try:
+            with open(self.plan_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read warm plan {self.plan_path}: {e}")
+            return []
+    
+    def warm(self):
+        """
+        Load the top queries into the cache
+        
+        Uses the current history, or the saved plan when the history is
+        empty (e.g. right after startup).
+        
+        Returns:
+            Number of entries warmed
+        """
+        start_time = time.time()
+        
+        plan = self.select()
+        if plan:
+            self.save_plan(plan)
+        else:
+            plan = self.load_plan()
+        
+        warmed = 0
+        for candidate in plan:
+            query, params = candidate['query'], candidate['params']
+            if isinstance(params, list):
+                params = tuple(params)
+            try:
+                stamp = self.cache.stamp(query)
+                result = self.loader(query, params)
+                self.cache.set(query, params, result, stamp=stamp, bypass_admission=True)
+                warmed += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Cache warming failed for query: {query[:50]} - {e}")
+        
+        self.runs += 1
+        self.warmed += warmed
+        self.last_warm_time = time.time() - start_time
+        self.last_warmed_at = time.time()
+        
+        logger.info(f"Cache warmed: {warmed} entries in {self.last_warm_time:.3f}s")
+        return warmed
+    
+    def start(self, interval=300):
+        """
+        Re-warm on a schedule in a background thread
+        
+        Args:
+            interval: Seconds between runs
+        """
+        if self._thread is not None:
+            return
+        
+        self._stop.clear()
+        self._thread = Thread(target=self._run, args=(interval,), name='cache-warmer', daemon=True)
+        self._thread.start()
+    
+    def _run(self, interval):
+        """Scheduled warming loop"""
+        while not self._stop.wait(interval):
+            try:
+                self.warm()
+            except Exception as e:
+                logger.error(f"Scheduled cache warming failed: {e}")
+    
+    def stop(self):
+        """Stop scheduled warming"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def get_stats(self):
+        """Get warmer statistics"""
+        return {
+            'top_k': self.top_k,
+            'runs': self.runs,
+            'entries_warmed': self.warmed,
+            'errors': self.errors,
+            'last_warm_time': f"{self.last_warm_time:.4f}s",
+            'last_warmed_at': self.last_warmed_at,
+            'scheduled': self._thread is not None
+        }
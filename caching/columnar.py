@@ -0,0 +1,133 @@
+"""
+Columnar Result
+Compact column-oriented storage for cached query results
+"""
+
+import sys
+import json
+import math
+from array import array
+from json.encoder import encode_basestring_ascii
+
+_encode_value = json.JSONEncoder().encode
+
+
+class ColumnarResult:
+    """
+    Query result stored as column names plus one array per column
+    
+    Integer and float columns are packed into array('q') / array('d');
+    other columns are kept as tuples. Iterating yields one dict per row,
+    so code written for lists of sqlite3.Row keeps working, while to_json()
+    encodes the rows without building those dicts.
+    """
+    
+    __slots__ = ('columns', 'data', 'row_count')
+    
+    def __init__(self, columns, data, row_count):
+        """
+        Initialize columnar result
+        
+        Args:
+            columns: Tuple of column names
+            data: One array or tuple of values per column
+            row_count: Number of rows
+        """
+        self.columns = columns
+        self.data = data
+        self.row_count = row_count
+    
+    @classmethod
+    def from_rows(cls, rows, columns=None):
+        """
+        Build a columnar result from row objects
+        
+        Args:
+            rows: List of sqlite3.Row objects (or tuples with columns given)
+            columns: Column names (read from the first row if None)
+            
+        Returns:
+            ColumnarResult instance
+        """
+        rows = list(rows)
+        if columns is None:
+            columns = tuple(rows[0].keys()) if rows else ()
+        
+        data = tuple(_pack([row[i] for row in rows]) for i in range(len(columns)))
+        return cls(tuple(columns), data, len(rows))
+    
+    def __len__(self):
+        return self.row_count
+    
+    def __iter__(self):
+        for values in zip(*self.data):
+            yield dict(zip(self.columns, values))
+    
+    def __getitem__(self, index):
+        return dict(zip(self.columns, (column[index] for column in self.data)))
+    
+    def __eq__(self, other):
+        if not isinstance(other, ColumnarResult):
+            return NotImplemented
+        return (self.columns == other.columns and
+                [list(column) for column in self.data] == [list(column) for column in other.data])
+    
+    def rows(self):
+        """Iterate rows as tuples"""
+        return zip(*self.data)
+    
+    def to_json(self):
+        """
+        Encode rows as a JSON array of objects
+        
+        Each column is encoded in one pass and the row objects are joined
+        from the encoded pieces, so no per-row dict is ever created.
+        
+        Returns:
+            JSON string
+        """
+        if not self.row_count:
+            return '[]'
+        
+        # '{"id":%s,"name":%s}' - one C-level format per row
+        template = '{' + ','.join(
+            _encode_value(name).replace('%', '%%') + ':%s' for name in self.columns
+        ) + '}'
+        encoded = [_encode_column(column) for column in self.data]
+        
+        return '[' + ','.join(map(template.__mod__, zip(*encoded))) + ']'
+    
+    def estimated_size(self):
+        """Estimate memory used by the result in bytes"""
+        total = sys.getsizeof(self) + sys.getsizeof(self.columns) + sys.getsizeof(self.data)
+        for column in self.data:
+            total += sys.getsizeof(column)
+            if isinstance(column, tuple):
+                # Values repeated across rows (e.g. status strings) are shared
+                distinct = {id(value): value for value in column}
+                total += sum(sys.getsizeof(value) for value in distinct.values())
+        return total
+
+
+def _pack(values):
+    """Pack a column into the most compact container for its values"""
+    if values and all(type(value) is int for value in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            return tuple(values)
+    if values and all(type(value) is float for value in values):
+        return array('d', values)
+    return tuple(values)
+
+
+def _encode_column(column):
+    """JSON-encode every value of a column"""
+    if isinstance(column, array):
+        if column.typecode == 'q':
+            return list(map(str, column))
+        if all(map(math.isfinite, column)):
+            return list(map(float.__repr__, column))
+    elif all(type(value) is str for value in column):
+        return list(map(encode_basestring_ascii, column))
+    return list(map(_encode_value, column))
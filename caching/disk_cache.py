@@ -0,0 +1,418 @@
+"""
+Disk Cache
+Persistent cache tier that survives restarts and warms caches at startup
+"""
+
+import time
+import pickle
+import marshal
+import sqlite3
+import hashlib
+import logging
+from array import array
+from threading import Lock
+
+from caching.columnar import ColumnarResult
+from caching.shared_cache import key_digest
+from caching.table_dependencies import extract_tables
+
+logger = logging.getLogger(__name__)
+
+# Payload format markers
+COLUMNAR_FORMAT = b'C'
+PICKLE_FORMAT = b'P'
+
+# Touches buffered in memory before hit counts are written
+HIT_FLUSH_INTERVAL = 256
+
+
+def schema_fingerprint(connection):
+    """
+    Fingerprint the schema of a database
+    
+    Args:
+        connection: SQLite connection
+        
+    Returns:
+        Hex digest of every CREATE statement
+    """
+    cursor = connection.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
+    )
+    schema = '\n'.join(f"{kind} {name} {sql}" for kind, name, sql in cursor.fetchall())
+    return hashlib.md5(schema.encode()).hexdigest()
+
+
+def encode_result(result):
+    """
+    Encode a query result for storage
+    
+    Rows and columnar results are stored as marshalled columns (numeric
+    columns as raw array bytes); anything else is pickled.
+    
+    Args:
+        result: Query result
+        
+    Returns:
+        Encoded bytes
+    """
+    if isinstance(result, list) and result and isinstance(result[0], sqlite3.Row):
+        result = ColumnarResult.from_rows(result)
+    
+    if isinstance(result, ColumnarResult):
+        columns = tuple(
+            (column.typecode, column.tobytes()) if isinstance(column, array) else ('', column)
+            for column in result.data
+        )
+        try:
+            return COLUMNAR_FORMAT + marshal.dumps((result.columns, columns, result.row_count))
+        except ValueError:
+            # Column values marshal cannot encode
+            pass
+    
+    return PICKLE_FORMAT + pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+
+def decode_result(payload):
+    """
+    Decode a stored query result
+    
+    Args:
+        payload: Bytes from encode_result
+        
+    Returns:
+        Query result
+    """
+    if payload[:1] == COLUMNAR_FORMAT:
+        names, columns, row_count = marshal.loads(payload[1:])
+        data = tuple(
+            array(typecode, values) if typecode else values
+            for typecode, values in columns
+        )
+        return ColumnarResult(names, data, row_count)
+    return pickle.loads(payload[1:])
+
+
+def encode_stamp(stamp):
+    """Encode a validator stamp for storage (None stays NULL)"""
+    return None if stamp is None else pickle.dumps(stamp, pickle.HIGHEST_PROTOCOL)
+
+
+def decode_stamp(stored):
+    """Decode a stored validator stamp"""
+    return None if stored is None else pickle.loads(stored)
+
+
+class DiskCache:
+    """
+    Cache tier persisted in its own SQLite file
+    
+    Entries are tagged with a schema version and a data version. An entry
+    whose tags no longer match the database is rejected when read, so a
+    restart after a migration starts from fresh data. Both tags must be
+    persisted in the database (e.g. PRAGMA user_version), not read from
+    the file: WAL checkpoints and restarts change the file without a write.
+    Writes to single tables are better caught by the per-table stamps of
+    a TableVersionValidator stored with each entry.
+    Hit counts are kept so the hottest entries can warm memory at startup.
+    """
+    
+    def __init__(self, path, ttl=3600, max_entries=10000, schema_version='', data_version=None):
+        """
+        Open or create the disk cache
+        
+        Args:
+            path: Cache file path
+            ttl: Time to live in seconds
+            max_entries: Maximum stored entries (least hit are pruned)
+            schema_version: Schema tag (e.g. schema_fingerprint(conn))
+            data_version: Callable returning the current data tag (None to skip)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.schema_version = schema_version
+        self.data_version = data_version
+        self.lock = Lock()
+        self._pending_hits = {}
+        self._pending_count = 0
+        self._sets_since_prune = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.stale_rejections = 0
+        self.invalidations = 0
+        
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                digest BLOB PRIMARY KEY,
+                query TEXT NOT NULL,
+                params BLOB NOT NULL,
+                tables TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                schema_version TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                stamp BLOB
+            )
+        """)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(entries)")}
+        if 'stamp' not in columns:
+            # Cache files written before validator stamps were stored
+            self.connection.execute("ALTER TABLE entries ADD COLUMN stamp BLOB")
+        self.connection.commit()
+        
+        logger.info(f"Disk Cache initialized: {path} (TTL={ttl}s, max_entries={max_entries})")
+    
+    def _current_data_version(self):
+        """Current data tag"""
+        return self.data_version() if self.data_version is not None else ''
+    
+    def _is_valid(self, schema_version, data_version, expires_at, now, current_data_version):
+        """Check an entry's tags and expiry against the database"""
+        return (expires_at > now and schema_version == self.schema_version and
+                data_version == current_data_version)
+    
+    def get(self, query, params=None):
+        """
+        Get cached query result
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Cached result or None if not found, expired or stale
+        """
+        entry = self.get_stamped(query, params)
+        return entry[0] if entry is not None else None
+    
+    def get_stamped(self, query, params=None):
+        """
+        Get cached query result with the validator stamp it was stored with
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            (result, stamp) tuple, or None if not found, expired or stale
+        """
+        digest = key_digest(query, params)
+        
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT payload, stamp, schema_version, data_version, expires_at FROM entries "
+                "WHERE digest = ?",
+                (digest,)
+            ).fetchone()
+            
+            if row is not None and not self._is_valid(*row[2:], time.time(), self._current_data_version()):
+                self.connection.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+                self.connection.commit()
+                self.stale_rejections += 1
+                row = None
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self._touch(digest)
+        
+        return decode_result(row[0]), decode_stamp(row[1])
+    
+    def touch(self, query, params=None):
+        """
+        Count a hit served by a faster tier
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+        """
+        digest = key_digest(query, params)
+        with self.lock:
+            self._touch(digest)
+    
+    def _touch(self, digest):
+        """Buffer a hit, writing counts in batches (caller holds the lock)"""
+        self._pending_hits[digest] = self._pending_hits.get(digest, 0) + 1
+        self._pending_count += 1
+        if self._pending_count >= HIT_FLUSH_INTERVAL:
+            self._flush_hits()
+    
+    def _flush_hits(self):
+        """Write buffered hit counts (caller holds the lock)"""
+        if not self._pending_hits:
+            return
+        self.connection.executemany(
+            "UPDATE entries SET hits = hits + ? WHERE digest = ?",
+            [(count, digest) for digest, count in self._pending_hits.items()]
+        )
+        self.connection.commit()
+        self._pending_hits.clear()
+        self._pending_count = 0
+    
+    def set(self, query, params, result, tables=None, stamp=None):
+        """
+        Persist query result
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            result: Query result to cache
+            tables: Tables the query reads (parsed from the SQL if None)
+            stamp: Validator stamp taken before the result was loaded
+            
+        Returns:
+            True if the result was stored
+        """
+        try:
+            encoded_params = marshal.dumps(params)
+            payload = encode_result(result)
+        except (ValueError, TypeError, pickle.PicklingError, AttributeError) as e:
+            logger.debug(f"Result not persistable ({e}): {query[:50]}")
+            return False
+        
+        if tables is None:
+            tables = extract_tables(query)
+        # ',users,orders,' so one table matches with LIKE; '' means unknown
+        tables = ',' + ','.join(sorted(table.lower() for table in tables)) + ',' if tables else ''
+        
+        digest = key_digest(query, params)
+        
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(digest, query, params, tables, payload, schema_version, data_version, expires_at, hits, "
+                "stamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, "
+                "COALESCE((SELECT hits FROM entries WHERE digest = ?), 0), ?)",
+                (digest, query, encoded_params, tables, payload, self.schema_version,
+                 self._current_data_version(), time.time() + self.ttl, digest, encode_stamp(stamp))
+            )
+            self.connection.commit()
+            self.sets += 1
+            
+            self._sets_since_prune += 1
+            if self._sets_since_prune >= 100:
+                self._prune()
+        
+        return True
+    
+    def _prune(self):
+        """Drop expired entries and the least hit beyond max_entries (caller holds the lock)"""
+        self._sets_since_prune = 0
+        self._flush_hits()
+        self.connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        self.connection.execute("""
+            DELETE FROM entries WHERE digest IN (
+                SELECT digest FROM entries ORDER BY hits DESC, expires_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        self.connection.commit()
+    
+    def hottest(self, limit):
+        """
+        Load the most hit valid entries
+        
+        Stale and expired entries found on the way are deleted.
+        
+        Args:
+            limit: Maximum entries to return
+            
+        Returns:
+            List of (query, params, tables, result, stamp) tuples
+        """
+        now = time.time()
+        current_data_version = self._current_data_version()
+        entries = []
+        stale = []
+        
+        with self.lock:
+            self._flush_hits()
+            cursor = self.connection.execute(
+                "SELECT digest, query, params, tables, payload, stamp, schema_version, data_version, "
+                "expires_at FROM entries ORDER BY hits DESC"
+            )
+            for (digest, query, params, tables, payload, stamp,
+                 schema_version, data_version, expires_at) in cursor:
+                if not self._is_valid(schema_version, data_version, expires_at, now, current_data_version):
+                    stale.append((digest,))
+                    continue
+                
+                tables = tuple(table for table in tables.split(',') if table) or None
+                entries.append((query, marshal.loads(params), tables, decode_result(payload),
+                                decode_stamp(stamp)))
+                if len(entries) >= limit:
+                    break
+            
+            if stale:
+                self.connection.executemany("DELETE FROM entries WHERE digest = ?", stale)
+                self.connection.commit()
+                self.stale_rejections += len(stale)
+        
+        return entries
+    
+    def invalidate_tables(self, *tables):
+        """
+        Invalidate entries that read any of the given tables
+        
+        Args:
+            tables: Table names that were modified (none for everything)
+            
+        Returns:
+            Number of entries invalidated
+        """
+        with self.lock:
+            if tables:
+                conditions = ' OR '.join(['tables LIKE ?'] * len(tables))
+                cursor = self.connection.execute(
+                    f"DELETE FROM entries WHERE tables = '' OR {conditions}",
+                    [f"%,{table.lower()},%" for table in tables]
+                )
+            else:
+                cursor = self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+            removed = cursor.rowcount
+            self.invalidations += removed
+        
+        return removed
+    
+    def clear(self):
+        """Delete all persisted entries"""
+        self.invalidate_tables()
+        logger.info("Disk cache cleared")
+    
+    def get_stats(self):
+        """Get disk cache statistics"""
+        with self.lock:
+            stored = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'path': self.path,
+            'stored_entries': stored,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'schema_version': self.schema_version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'stale_rejections': self.stale_rejections,
+            'invalidations': self.invalidations,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'total_requests': total_requests
+        }
+    
+    def close(self):
+        """Write buffered hit counts and close the cache file"""
+        with self.lock:
+            self._flush_hits()
+            self.connection.close()
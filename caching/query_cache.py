@@ -4,41 +4,352 @@ Caches query results to reduce database load
 """
 
 import time
+import asyncio
 import logging
 import hashlib
 import json
+import fnmatch
+import heapq
+import sqlite3
+import itertools
+from array import array
+from collections import OrderedDict
+from threading import RLock, Event, Thread
+from queue import Queue
+
+from caching.table_dependencies import extract_tables
+from caching.size_estimator import estimate_size, format_size
+from caching.columnar import ColumnarResult
+from caching.admission import TinyLFU
 
 logger = logging.getLogger(__name__)
 
+EVICTION_POLICIES = ('lru', 'lfu', 'fifo')
+STORAGE_FORMATS = ('rows', 'columnar')
+ADMISSION_POLICIES = ('tinylfu',)
+
+# Index bucket for entries whose tables could not be determined
+UNKNOWN_TABLES = '*'
+
+# Upper bounds (bytes) of the entry size histogram buckets
+SIZE_BUCKETS = (
+    ('<1KB', 1024),
+    ('1-4KB', 4 * 1024),
+    ('4-16KB', 16 * 1024),
+    ('16-64KB', 64 * 1024),
+    ('64-256KB', 256 * 1024),
+    ('256KB-1MB', 1024 * 1024),
+    ('>=1MB', float('inf')),
+)
+
+
+# Adaptive TTL: factor applied per unchanged/changed reload, smoothing of per-table TTLs
+TTL_GROWTH = 2.0
+TABLE_TTL_SMOOTHING = 0.2
+
+
+def result_fingerprint(result):
+    """
+    Hash the content of a query result
+    
+    Args:
+        result: Query result (rows, ColumnarResult or other value)
+        
+    Returns:
+        Integer fingerprint, equal for equal results
+    """
+    if isinstance(result, ColumnarResult):
+        content = (result.columns, tuple(
+            column.tobytes() if isinstance(column, array) else column for column in result.data
+        ))
+    elif isinstance(result, (list, tuple)):
+        content = tuple(tuple(row) if isinstance(row, (sqlite3.Row, list)) else row for row in result)
+    else:
+        content = result
+    
+    try:
+        return hash(content)
+    except TypeError:
+        return hash(repr(content))
+
+
+def is_empty_result(result):
+    """
+    Check if a query result is an empty result set
+    
+    Args:
+        result: Query result
+        
+    Returns:
+        True for empty lists, tuples and columnar results
+    """
+    return isinstance(result, (list, tuple, ColumnarResult)) and len(result) == 0
+
+
+class CacheEntry:
+    """
+    Single cached query result with its bookkeeping
+    """
+    
+    __slots__ = ('key', 'result', 'created_at', 'expires_at', 'frequency', 'query', 'tables',
+                 'accesses', 'refreshing', 'size', 'stamp')
+    
+    def __init__(self, key, result, created_at, expires_at, query='', tables=frozenset(), size=0):
+        self.key = key
+        self.result = result
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.frequency = 1
+        self.query = query
+        self.tables = tables
+        self.accesses = 0
+        self.refreshing = False
+        self.size = size
+        self.stamp = None
+
+
+class InFlightLoad:
+    """
+    A loader call that concurrent callers for the same key wait on
+    """
+    
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
 
 class QueryCache:
     """
     Query result caching system
     Caches query results with TTL (Time To Live)
+    
+    Entries live in an OrderedDict so eviction and expiry never scan the
+    whole cache:
+        lru  - evict the least recently used entry
+        lfu  - evict the least frequently used entry (LRU among ties)
+        fifo - evict the oldest inserted entry
+    
+    Each entry also records the tables it reads, so a write to one table
+    only invalidates the entries that depend on it.
+    
+    With fast_keys, each distinct SQL string is normalized once and mapped
+    to a statement id; keys are (statement id, params) tuples, avoiding
+    JSON serialization and hashing on every lookup.
+    
+    get_or_compute() coalesces concurrent misses: one caller runs the
+    loader per key while the others wait for its result.
+    
+    Soft-TTL mode (stale_ttl > 0): for stale_ttl seconds after an entry
+    expires, get() still returns it and a background worker reloads it
+    through its registered loader. With refresh_ahead_rate set, entries
+    read at least that many times per second are reloaded once they reach
+    refresh_ahead_fraction of their TTL, before they ever go stale.
+    
+    With max_bytes set, the estimated size of cached results is bounded
+    too: entries are evicted until a new result fits, and results larger
+    than max_bytes are not cached at all.
+    
+    With storage='columnar', lists of sqlite3.Row are stored as a
+    ColumnarResult (column names plus packed per-column arrays), which
+    is smaller and can be encoded to JSON without per-row dicts.
+    
+    With negative_ttl set, empty result sets (missing ids, probing
+    scanners) go to a separate store with its own TTL and size budget,
+    so they neither evict real results nor reach the database again.
+    
+    With adaptive_ttl, each key's TTL is learned between min_ttl and
+    max_ttl: a reload returning the same result (by fingerprint) doubles
+    it, a changed result halves it. New keys start from the smoothed TTL
+    learned for their tables, so slow-changing tables keep results longer.
+    
+    With admission='tinylfu', a frequency sketch records every lookup and
+    a new result only displaces the eviction victim of a full cache when
+    its key has been requested more often, so one-off queries cannot
+    flush hot entries.
+    
+    With a validator (see caching.validation), each entry is stamped with
+    the data version of its tables before it is loaded, and a hit is only
+    served while the stamp is unchanged, so TTLs can be long without
+    serving data older than the last write.
     """
     
-    def __init__(self, ttl=300, max_size=1000):
+    def __init__(self, ttl=300, max_size=1000, policy='lru', fast_keys=True,
+                 max_statements=10000, stale_ttl=0, refresh_ahead_rate=None,
+                 refresh_ahead_fraction=0.75, max_bytes=None, storage='rows',
+                 negative_ttl=None, negative_max_size=1000, adaptive_ttl=False,
+                 min_ttl=None, max_ttl=None, admission=None, validator=None):
         """
         Initialize query cache
         
         Args:
             ttl: Time to live in seconds
             max_size: Maximum cache entries
+            policy: Eviction policy ('lru', 'lfu' or 'fifo')
+            fast_keys: Use interned statement ids instead of MD5 keys
+            max_statements: Maximum distinct statements to intern
+            stale_ttl: Grace window in seconds for serving stale entries
+            refresh_ahead_rate: Accesses per second that trigger early refresh
+            refresh_ahead_fraction: Fraction of TTL after which hot entries refresh
+            max_bytes: Maximum estimated bytes of cached results (None for no limit)
+            storage: Result storage format ('rows' or 'columnar')
+            negative_ttl: Time to live of empty results (None stores them as normal entries)
+            negative_max_size: Maximum cached empty results
+            adaptive_ttl: Learn per-key TTLs from how often results change
+            min_ttl: Lower TTL bound in adaptive mode (default: ttl / 10)
+            max_ttl: Upper TTL bound in adaptive mode (default: ttl * 10)
+            admission: Admission filter for full caches ('tinylfu' or None)
+            validator: DataVersionValidator/TableVersionValidator checked on every hit
         """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        if admission is not None and admission not in ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy: {admission}")
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown storage format: {storage}")
+        
         self.ttl = ttl
         self.max_size = max_size
-        self.cache = {}
+        self.policy = policy
+        self.fast_keys = fast_keys
+        self.max_statements = max_statements
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead_rate = refresh_ahead_rate
+        self.refresh_ahead_fraction = refresh_ahead_fraction
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.storage = storage
+        self.negative_ttl = negative_ttl
+        self.negative_max_size = negative_max_size
+        self.adaptive_ttl = adaptive_ttl
+        self.min_ttl = min_ttl if min_ttl is not None else ttl / 10
+        self.max_ttl = max_ttl if max_ttl is not None else ttl * 10
+        self.admission = admission
+        self._admission = TinyLFU(max_size) if admission == 'tinylfu' else None
+        self.validator = validator
+        self.cache = OrderedDict()
+        
+        # Empty results in insertion (and so expiry) order, with their table index
+        self._negative = OrderedDict()
+        self._negative_index = {}
+        
+        # Raw SQL -> statement id, normalized SQL -> statement id
+        self._statement_ids = {}
+        self._normalized_ids = {}
+        
+        # Keys in hard expiry order (TTL is uniform, so insertion order)
+        self._expiry = OrderedDict()
+        
+        # Adaptive TTLs differ per key: (expires at, sequence, key) heap instead,
+        # key -> (ttl, fingerprint, tables) of the last load, table -> smoothed TTL
+        self._expiry_heap = []
+        self._expiry_sequence = itertools.count()
+        self._ttl_history = OrderedDict()
+        self._table_ttls = {}
+        
+        # LFU bookkeeping: frequency -> keys in recency order
+        self._freq_buckets = {}
+        self._min_freq = 0
+        
+        # Table name -> keys of entries reading that table
+        self._table_index = {}
+        
+        # Key -> InFlightLoad for loaders currently running
+        self._in_flight = {}
+        # Key -> asyncio.Future for coroutine loaders currently running
+        self._async_in_flight = {}
+        self.lock = RLock()
+        
+        # Key -> (query, params, loader, tables) for background refresh
+        self._loaders = {}
+        
+        # Callbacks told which tables were invalidated (None for everything)
+        self._invalidation_listeners = []
+        self._refresh_queue = Queue()
+        self._refresh_thread = None
         
         self.hits = 0
         self.misses = 0
         self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.refresh_ahead = 0
+        self.oversize_rejections = 0
+        self.negative_hits = 0
+        self.negative_evictions = 0
+        self.unchanged_reloads = 0
+        self.changed_reloads = 0
+        self.admission_rejections = 0
+        self.validation_failures = 0
         
-        logger.info(f"Query Cache initialized: TTL={ttl}s, max_size={max_size}")
+        logger.info(f"Query Cache initialized: TTL={ttl}s, max_size={max_size}, policy={policy}")
+    
+    def _intern_statement(self, query):
+        """
+        Map a SQL string to the id of its normalized statement
+        
+        Args:
+            query: SQL query string
+            
+        Returns:
+            Statement id, or the normalized SQL once max_statements is reached
+        """
+        normalized = query.strip().lower()
+        statement_id = self._normalized_ids.get(normalized)
+        
+        if statement_id is None:
+            if len(self._normalized_ids) >= self.max_statements:
+                # Ad-hoc SQL with inlined literals must not grow the table forever
+                return normalized
+            statement_id = len(self._normalized_ids)
+            self._normalized_ids[normalized] = statement_id
+        
+        if len(self._statement_ids) < self.max_statements:
+            self._statement_ids[query] = statement_id
+        
+        return statement_id
     
     def _generate_key(self, query, params=None):
         """
         Generate cache key from query and params
         
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Cache key tuple (fast keys) or string
+        """
+        if self.fast_keys:
+            statement_id = self._statement_ids.get(query)
+            if statement_id is None:
+                statement_id = self._intern_statement(query)
+            
+            if not params:
+                return (statement_id, ())
+            
+            if isinstance(params, dict):
+                key = (statement_id, ('named',) + tuple(sorted(params.items())))
+            else:
+                key = (statement_id, tuple(params))
+            
+            try:
+                hash(key)
+                return key
+            except TypeError:
+                # Unhashable params (e.g. nested lists) use the hashed key
+                pass
+        
+        return self._hash_key(query, params)
+    
+    def _hash_key(self, query, params=None):
+        """
+        Generate MD5 cache key from query and params
+        
         Args:
             query: SQL query string
             params: Query parameters
@@ -58,6 +369,165 @@ class QueryCache:
         
         return cache_key
     
+    def _link(self, entry):
+        """Add entry to the store and the policy bookkeeping"""
+        self.cache[entry.key] = entry
+        if self.adaptive_ttl:
+            heapq.heappush(self._expiry_heap,
+                           (entry.expires_at + self.stale_ttl, next(self._expiry_sequence), entry.key))
+        else:
+            self._expiry[entry.key] = entry.expires_at + self.stale_ttl
+        self.bytes_used += entry.size
+        
+        for table in entry.tables or (UNKNOWN_TABLES,):
+            self._table_index.setdefault(table, set()).add(entry.key)
+        
+        if self.policy == 'lfu':
+            self._freq_buckets.setdefault(entry.frequency, OrderedDict())[entry.key] = None
+            if entry.frequency < self._min_freq or self._min_freq == 0:
+                self._min_freq = entry.frequency
+    
+    def _unlink(self, key):
+        """
+        Remove entry from the store and the policy bookkeeping
+        
+        Returns:
+            Removed CacheEntry or None
+        """
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return None
+        
+        self._expiry.pop(key, None)
+        self._loaders.pop(key, None)
+        self.bytes_used -= entry.size
+        
+        for table in entry.tables or (UNKNOWN_TABLES,):
+            keys = self._table_index.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._table_index[table]
+        
+        if self.policy == 'lfu':
+            bucket = self._freq_buckets[entry.frequency]
+            del bucket[key]
+            if not bucket:
+                del self._freq_buckets[entry.frequency]
+        
+        return entry
+    
+    def _link_negative(self, entry):
+        """Add an empty result to the negative store"""
+        self._negative[entry.key] = entry
+        for table in entry.tables or (UNKNOWN_TABLES,):
+            self._negative_index.setdefault(table, set()).add(entry.key)
+    
+    def _unlink_negative(self, key):
+        """
+        Remove an empty result from the negative store
+        
+        Returns:
+            Removed CacheEntry or None
+        """
+        entry = self._negative.pop(key, None)
+        if entry is None:
+            return None
+        
+        for table in entry.tables or (UNKNOWN_TABLES,):
+            keys = self._negative_index.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._negative_index[table]
+        
+        return entry
+    
+    def _touch(self, entry):
+        """Record an access to an entry"""
+        if self.policy == 'lru':
+            self.cache.move_to_end(entry.key)
+        elif self.policy == 'lfu':
+            freq = entry.frequency
+            bucket = self._freq_buckets[freq]
+            del bucket[entry.key]
+            if not bucket:
+                del self._freq_buckets[freq]
+                if self._min_freq == freq:
+                    self._min_freq = freq + 1
+            
+            entry.frequency = freq + 1
+            self._freq_buckets.setdefault(freq + 1, OrderedDict())[entry.key] = None
+    
+    def _select_victim(self):
+        """Get the key the eviction policy would remove next"""
+        if self.policy == 'lfu':
+            if self._min_freq not in self._freq_buckets:
+                # Removals can leave min_freq stale; only distinct counts are scanned
+                self._min_freq = min(self._freq_buckets)
+            return next(iter(self._freq_buckets[self._min_freq]))
+        
+        # LRU keeps recency order in the store, FIFO keeps insertion order
+        return next(iter(self.cache))
+    
+    def _evict(self):
+        """Evict one entry according to the eviction policy"""
+        victim = self._select_victim()
+        self._unlink(victim)
+        self.evictions += 1
+        logger.debug(f"Cache eviction (max size reached, policy={self.policy})")
+    
+    def _needs_room(self, size):
+        """Check if storing an entry of the given size requires an eviction"""
+        return (len(self.cache) >= self.max_size or
+                (self.max_bytes is not None and self.bytes_used + size > self.max_bytes))
+    
+    def _make_room(self, size):
+        """Evict entries until one more entry of the given size fits"""
+        while self.cache and len(self.cache) >= self.max_size:
+            self._evict()
+        
+        if self.max_bytes is not None:
+            while self.cache and self.bytes_used + size > self.max_bytes:
+                self._evict()
+    
+    def _purge_expired(self, now):
+        """Drop expired entries from the head of the expiry queue"""
+        if self.adaptive_ttl:
+            self._purge_expired_heap(now)
+        
+        while self._expiry:
+            key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._unlink(key)
+            self.expirations += 1
+        
+        while self._negative:
+            entry = next(iter(self._negative.values()))
+            if entry.expires_at > now:
+                break
+            self._unlink_negative(entry.key)
+            self.expirations += 1
+    
+    def _purge_expired_heap(self, now):
+        """Drop expired entries in adaptive mode, skipping outdated heap records"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            if entry is not None and entry.expires_at + self.stale_ttl == expires_at:
+                self._unlink(key)
+                self.expirations += 1
+        
+        if len(heap) > 2 * len(self.cache) + 64:
+            # Records of refreshed or removed entries piled up
+            self._expiry_heap = [
+                (entry.expires_at + self.stale_ttl, next(self._expiry_sequence), key)
+                for key, entry in self.cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+    
     def get(self, query, params=None):
         """
         Get cached query result
@@ -69,26 +539,114 @@ class QueryCache:
         Returns:
             Cached result or None if not found/expired
         """
-        cache_key = self._generate_key(query, params)
+        with self.lock:
+            return self._lookup(self._generate_key(query, params), query)
+    
+    def ttl_remaining(self, query, params=None):
+        """
+        Seconds until a cached result expires, without counting a hit
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Remaining time to live (0 once expired), or None if not cached
+        """
+        with self.lock:
+            cache_key = self._generate_key(query, params)
+            entry = self.cache.get(cache_key) or self._negative.get(cache_key)
+            if entry is None:
+                return None
+            return max(entry.expires_at - time.time(), 0)
+    
+    def _lookup(self, cache_key, query):
+        """
+        Look up a key and record the hit or miss
         
-        if cache_key in self.cache:
-            cached_time, result = self.cache[cache_key]
+        Args:
+            cache_key: Generated cache key
+            query: SQL query string (for logging)
+            
+        Returns:
+            Cached result or None if not found/expired
+        """
+        if self._admission is not None:
+            self._admission.record(cache_key)
+        
+        entry = self.cache.get(cache_key)
+        if entry is not None and self.validator is not None and not self._validate(entry):
+            self._unlink(cache_key)
+            entry = None
+        
+        if entry is not None:
+            now = time.time()
             
             # Check if expired
-            if time.time() - cached_time < self.ttl:
+            if now < entry.expires_at:
                 self.hits += 1
+                entry.accesses += 1
+                self._touch(entry)
+                if self.refresh_ahead_rate and self._is_hot(entry, now):
+                    if self._schedule_refresh(entry):
+                        self.refresh_ahead += 1
                 logger.debug(f"Cache hit for query: {query[:50]}")
-                return result
+                return entry.result
+            elif now < entry.expires_at + self.stale_ttl and cache_key in self._loaders:
+                # Stale but within the grace window - serve and revalidate
+                self.hits += 1
+                self.stale_hits += 1
+                entry.accesses += 1
+                self._touch(entry)
+                self._schedule_refresh(entry)
+                logger.debug(f"Stale cache hit for query: {query[:50]}")
+                return entry.result
             else:
                 # Expired, remove from cache
-                del self.cache[cache_key]
+                self._unlink(cache_key)
+                self.expirations += 1
                 logger.debug(f"Cache expired for query: {query[:50]}")
+        elif self._negative:
+            entry = self._negative.get(cache_key)
+            if entry is not None:
+                if time.time() < entry.expires_at and (self.validator is None or self._validate(entry)):
+                    self.hits += 1
+                    self.negative_hits += 1
+                    logger.debug(f"Negative cache hit for query: {query[:50]}")
+                    return entry.result
+                self._unlink_negative(cache_key)
+                self.expirations += 1
         
         self.misses += 1
         logger.debug(f"Cache miss for query: {query[:50]}")
         return None
     
-    def set(self, query, params, result):
+    def _validate(self, entry):
+        """Check an entry's stamp against the current data version"""
+        if self.validator.is_current(entry.stamp, entry.tables):
+            return True
+        self.validation_failures += 1
+        logger.debug(f"Cached result outdated by a write: {entry.query[:50]}")
+        return False
+    
+    def stamp(self, query, tables=None):
+        """
+        Take the validator stamp for a result about to be loaded
+        
+        Args:
+            query: SQL query string
+            tables: Tables the query reads (parsed from the SQL if None)
+            
+        Returns:
+            Stamp, or None without a validator
+        """
+        if self.validator is None:
+            return None
+        if tables is None:
+            tables = extract_tables(query)
+        return self.validator.stamp(frozenset(table.lower() for table in tables))
+    
+    def set(self, query, params, result, tables=None, stamp=None, learn=True, bypass_admission=False):
         """
         Cache query result
         
@@ -96,21 +654,422 @@ class QueryCache:
             query: SQL query string
             params: Query parameters
             result: Query result to cache
+            tables: Tables the query reads (parsed from the SQL if None)
+            stamp: Validator stamp taken before the result was loaded (taken now if None)
+            learn: Adapt the key's TTL to this result (False for copies from another tier)
+            bypass_admission: Store even if the admission filter would reject it (for warming)
+        """
+        # Without a stamp taken before loading, a write between the load and
+        # this call goes unnoticed; get_or_compute() always stamps first
+        if stamp is None:
+            stamp = self.stamp(query, tables)
+        
+        # Convert and measure outside the lock; large results take a while
+        result = self._prepare(result)
+        size = estimate_size(result)
+        fingerprint = self._fingerprint(result) if learn else None
+        
+        with self.lock:
+            self._store(self._generate_key(query, params), query, result, tables, size, fingerprint,
+                        stamp, learn, bypass_admission)
+    
+    def _prepare(self, result):
+        """Convert a result to the configured storage format"""
+        if (self.storage == 'columnar' and isinstance(result, list) and result
+                and isinstance(result[0], sqlite3.Row)):
+            return ColumnarResult.from_rows(result)
+        return result
+    
+    def _fingerprint(self, result):
+        """Fingerprint a result when adaptive TTL needs it"""
+        return result_fingerprint(result) if self.adaptive_ttl else None
+    
+    def _store(self, cache_key, query, result, tables=None, size=None, fingerprint=None, stamp=None,
+               learn=True, bypass_admission=False):
+        """
+        Store a result under a key, evicting if the cache is full
+        
+        Args:
+            cache_key: Generated cache key
+            query: SQL query string
+            result: Query result to cache
+            tables: Tables the query reads (parsed from the SQL if None)
+            size: Estimated result size in bytes (measured if None)
+            fingerprint: Result fingerprint for adaptive TTL (computed if None)
+            stamp: Validator stamp taken before the result was loaded
+            learn: Adapt the key's TTL to this result (False for copies from another tier)
+            bypass_admission: Skip the admission filter
         """
-        cache_key = self._generate_key(query, params)
+        now = time.time()
         
-        # Check cache size
-        if len(self.cache) >= self.max_size:
-            # Evict oldest entry
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][0])
-            del self.cache[oldest_key]
-            self.evictions += 1
-            logger.debug("Cache eviction (max size reached)")
+        if tables is None:
+            tables = extract_tables(query)
+        tables = frozenset(table.lower() for table in tables)
+        if size is None:
+            size = estimate_size(result)
+        
+        self._purge_expired(now)
+        
+        if self.negative_ttl is not None:
+            self._unlink_negative(cache_key)
+            if is_empty_result(result):
+                self._store_negative(cache_key, query, result, tables, now, stamp)
+                return
+        
+        if (self._admission is not None and not bypass_admission
+                and cache_key not in self.cache and self.cache
+                and self._needs_room(size)
+                and not self._admission.admit(cache_key, self._select_victim())):
+            self.admission_rejections += 1
+            logger.debug(f"Result not admitted (less frequent than victim): {query[:50]}")
+            return
+        
+        registration = self._loaders.get(cache_key)
+        entry = self._unlink(cache_key)
+        
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.oversize_rejections += 1
+            logger.debug(f"Result too large to cache ({format_size(size)}): {query[:50]}")
+            return
+        
+        # Check cache size and memory budget
+        self._make_room(size)
+        
+        ttl = self.ttl
+        if self.adaptive_ttl and not learn:
+            # A copy says nothing about how often the data changes
+            ttl = self._known_ttl(cache_key, tables)
+        elif self.adaptive_ttl:
+            if fingerprint is None:
+                fingerprint = result_fingerprint(result)
+            ttl = self._learn_ttl(cache_key, tables, fingerprint)
+        
+        if entry is not None:
+            # Refresh existing entry in place, keeping its frequency and loader
+            entry.result = result
+            entry.created_at = now
+            entry.expires_at = now + ttl
+            entry.tables = tables
+            entry.accesses = 0
+            entry.refreshing = False
+            entry.size = size
+        else:
+            entry = CacheEntry(cache_key, result, now, now + ttl,
+                               query.strip().lower(), tables, size)
+        entry.stamp = stamp
         
         # Store in cache
-        self.cache[cache_key] = (time.time(), result)
+        self._link(entry)
+        if registration is not None:
+            self._loaders[cache_key] = registration
         logger.debug(f"Cached query result: {query[:50]}")
     
+    def _known_ttl(self, cache_key, tables):
+        """
+        TTL learned so far for a key, without adjusting it
+        
+        Args:
+            cache_key: Generated cache key
+            tables: Tables the query reads
+            
+        Returns:
+            TTL in seconds
+        """
+        history = self._ttl_history.get(cache_key)
+        if history is not None:
+            return history[0]
+        
+        # Start from the most volatile table the query reads
+        learned = [self._table_ttls[table] for table in tables if table in self._table_ttls]
+        return min(max(min(learned) if learned else self.ttl, self.min_ttl), self.max_ttl)
+    
+    def _learn_ttl(self, cache_key, tables, fingerprint):
+        """
+        Adjust a key's TTL from whether its result changed since the last load
+        
+        Args:
+            cache_key: Generated cache key
+            tables: Tables the query reads
+            fingerprint: Fingerprint of the new result
+            
+        Returns:
+            TTL in seconds for the new entry
+        """
+        history = self._ttl_history.pop(cache_key, None)
+        
+        if history is None:
+            ttl = self._known_ttl(cache_key, tables)
+        elif history[1] == fingerprint:
+            ttl = history[0] * TTL_GROWTH
+            self.unchanged_reloads += 1
+        else:
+            ttl = history[0] / TTL_GROWTH
+            self.changed_reloads += 1
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        
+        self._ttl_history[cache_key] = (ttl, fingerprint, tables)
+        if len(self._ttl_history) > 4 * self.max_size:
+            # Forget the keys reloaded longest ago
+            self._ttl_history.popitem(last=False)
+        
+        if history is not None:
+            for table in tables:
+                learned = self._table_ttls.get(table, ttl)
+                self._table_ttls[table] = learned + TABLE_TTL_SMOOTHING * (ttl - learned)
+        
+        return ttl
+    
+    def _store_negative(self, cache_key, query, result, tables, now, stamp=None):
+        """Store an empty result in the negative store (caller holds the lock)"""
+        # A key that used to have rows now has none
+        self._unlink(cache_key)
+        
+        while self._negative and len(self._negative) >= self.negative_max_size:
+            self._unlink_negative(next(iter(self._negative)))
+            self.negative_evictions += 1
+        
+        entry = CacheEntry(cache_key, result, now, now + self.negative_ttl,
+                           query.strip().lower(), tables)
+        entry.stamp = stamp
+        self._link_negative(entry)
+        logger.debug(f"Cached empty result: {query[:50]}")
+    
+    def get_or_compute(self, query, params, loader, timeout=30, tables=None, fallback=None):
+        """
+        Get cached result or compute it once for all concurrent callers
+        
+        The first caller to miss runs the loader and caches its result.
+        Callers missing on the same key meanwhile wait for that result
+        instead of running the query themselves.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            loader: Callable returning the query result
+            timeout: Seconds to wait for another caller's loader
+            tables: Tables the query reads (parsed from the SQL if None)
+            fallback: Callable returning a result cached elsewhere (e.g. a
+                lower cache tier) or None, tried before loader on a miss.
+                Background refreshes always run loader.
+                
+        Returns:
+            Cached or freshly loaded result
+            
+        Raises:
+            TimeoutError: If another caller's loader does not finish in time
+            Exception: Whatever the loader raised, re-raised in every waiter
+        """
+        with self.lock:
+            cache_key = self._generate_key(query, params)
+            result = self._lookup(cache_key, query)
+            if result is not None:
+                return result
+            
+            flight = self._in_flight.get(cache_key)
+            is_loader = flight is None
+            if is_loader:
+                flight = InFlightLoad()
+                self._in_flight[cache_key] = flight
+            else:
+                self.coalesced += 1
+        
+        if not is_loader:
+            logger.debug(f"Waiting for in-flight load: {query[:50]}")
+            if not flight.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight load: {query[:50]}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            stamp = self.stamp(query, tables)
+            result = fallback() if fallback is not None else None
+            learn = result is None
+            if learn:
+                result = loader()
+            result = self._prepare(result)
+            flight.result = result
+            size = estimate_size(result)
+            fingerprint = self._fingerprint(result) if learn else None
+            with self.lock:
+                self._store(cache_key, query, result, tables, size, fingerprint, stamp, learn)
+                if (self.stale_ttl or self.refresh_ahead_rate) and cache_key in self.cache:
+                    self._loaders[cache_key] = (query, params, loader, tables)
+            return result
+        except Exception as e:
+            flight.error = e
+            logger.error(f"Loader failed for query: {query[:50]} - {e}")
+            raise
+        finally:
+            with self.lock:
+                del self._in_flight[cache_key]
+            flight.done.set()
+    
+    async def aget_or_compute(self, query, params, loader, timeout=30, tables=None, fallback=None):
+        """
+        Async get_or_compute for asyncio callers
+        
+        loader is a coroutine function. Coroutines missing on the same key
+        meanwhile await the first one's load instead of starting their own.
+        The load runs as its own task, so cancelling the coroutine that
+        started it does not cancel it for the others. Waiting never blocks
+        the event loop; validator stamps are taken on the executor and
+        only the brief cache lock is taken on the loop thread. Coroutine
+        loaders are not registered for background refresh (the refresh
+        worker is a plain thread).
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            loader: Coroutine function returning the query result
+            timeout: Seconds to wait for another coroutine's loader
+            tables: Tables the query reads (parsed from the SQL if None)
+            fallback: Coroutine function returning a result cached elsewhere
+                or None, tried before loader on a miss
+                
+        Returns:
+            Cached or freshly loaded result
+            
+        Raises:
+            TimeoutError: If another coroutine's loader does not finish in time
+            Exception: Whatever the loader raised, re-raised in every waiter
+        """
+        with self.lock:
+            cache_key = self._generate_key(query, params)
+            result = self._lookup(cache_key, query)
+            if result is not None:
+                return result
+            
+            flight = self._async_in_flight.get(cache_key)
+            is_loader = flight is None
+            if is_loader:
+                flight = asyncio.ensure_future(self._aload(cache_key, query, loader, tables, fallback))
+                # Retrieve the outcome even if every caller was cancelled
+                flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+                self._async_in_flight[cache_key] = flight
+            else:
+                self.coalesced += 1
+        
+        if is_loader:
+            return await asyncio.shield(flight)
+        
+        logger.debug(f"Awaiting in-flight load: {query[:50]}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for in-flight load: {query[:50]}") from None
+    
+    async def _aload(self, cache_key, query, loader, tables, fallback):
+        """Run the load shared by every coroutine missing on a key"""
+        try:
+            stamp = None
+            if self.validator is not None:
+                # Validators may query the database, which would block the loop
+                stamp = await asyncio.get_running_loop().run_in_executor(None, self.stamp, query, tables)
+            result = await fallback() if fallback is not None else None
+            learn = result is None
+            if learn:
+                result = await loader()
+            result = self._prepare(result)
+            size = estimate_size(result)
+            fingerprint = self._fingerprint(result) if learn else None
+            with self.lock:
+                self._store(cache_key, query, result, tables, size, fingerprint, stamp, learn)
+            return result
+        except Exception as e:
+            logger.error(f"Loader failed for query: {query[:50]} - {e}")
+            raise
+        finally:
+            with self.lock:
+                del self._async_in_flight[cache_key]
+    
+    def register_loader(self, query, params, loader, tables=None):
+        """
+        Register the loader used to refresh an entry in the background
+        
+        The loader is kept while the entry stays cached; get_or_compute()
+        registers its loader automatically in soft-TTL/refresh-ahead mode.
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            loader: Callable returning the query result
+            tables: Tables the query reads (parsed from the SQL if None)
+        """
+        with self.lock:
+            cache_key = self._generate_key(query, params)
+            self._loaders[cache_key] = (query, params, loader, tables)
+    
+    def _is_hot(self, entry, now):
+        """Check if an entry is due for refresh-ahead"""
+        age = now - entry.created_at
+        ttl = entry.expires_at - entry.created_at
+        if entry.refreshing or age < ttl * self.refresh_ahead_fraction:
+            return False
+        return entry.accesses / max(age, 1e-6) >= self.refresh_ahead_rate
+    
+    def _schedule_refresh(self, entry):
+        """
+        Queue an entry for background reload (once at a time)
+        
+        Returns:
+            True if a refresh was queued
+        """
+        if entry.refreshing or entry.key not in self._loaders:
+            return False
+        
+        entry.refreshing = True
+        self._refresh_queue.put(entry.key)
+        
+        if self._refresh_thread is None:
+            self._refresh_thread = Thread(target=self._refresh_worker, name='query-cache-refresh',
+                                          daemon=True)
+            self._refresh_thread.start()
+        
+        return True
+    
+    def _refresh_worker(self):
+        """Background worker reloading stale and hot entries"""
+        while True:
+            cache_key = self._refresh_queue.get()
+            if cache_key is None:
+                break
+            
+            with self.lock:
+                registration = self._loaders.get(cache_key)
+            if registration is None:
+                continue
+            
+            query, params, loader, tables = registration
+            try:
+                stamp = self.stamp(query, tables)
+                result = loader()
+            except Exception as e:
+                with self.lock:
+                    self.refresh_errors += 1
+                    entry = self.cache.get(cache_key)
+                    if entry is not None:
+                        entry.refreshing = False
+                logger.error(f"Background refresh failed for query: {query[:50]} - {e}")
+                continue
+            
+            result = self._prepare(result)
+            size = estimate_size(result)
+            fingerprint = self._fingerprint(result)
+            with self.lock:
+                # Skip entries invalidated while the loader was running
+                if cache_key in self.cache:
+                    self._store(cache_key, query, result, tables, size, fingerprint, stamp)
+                    self.refreshes += 1
+            logger.debug(f"Background refresh for query: {query[:50]}")
+    
+    def close(self):
+        """Stop the background refresh worker"""
+        if self._refresh_thread is not None:
+            self._refresh_queue.put(None)
+            self._refresh_thread.join()
+            self._refresh_thread = None
+    
     def invalidate(self, query=None, params=None):
         """
         Invalidate cache entry or entire cache
@@ -119,36 +1078,216 @@ class QueryCache:
             query: Specific query to invalidate (None for all)
             params: Query parameters
         """
-        if query:
-            cache_key = self._generate_key(query, params)
-            if cache_key in self.cache:
-                del self.cache[cache_key]
+        with self.lock:
+            if query:
+                cache_key = self._generate_key(query, params)
+                entry = self._unlink(cache_key) or self._unlink_negative(cache_key)
+                if entry is None:
+                    return
+                tables = entry.tables or None
                 logger.debug(f"Cache invalidated for query: {query[:50]}")
+            else:
+                # Clear entire cache
+                self._clear_entries()
+                tables = None
+                logger.info("Entire cache invalidated")
+        
+        self._notify_invalidation(tables)
+    
+    def add_invalidation_listener(self, callback):
+        """
+        Register a callback run after entries are invalidated
+        
+        Args:
+            callback: Called with the invalidated table names, or None
+                      when the whole cache was invalidated
+        """
+        self._invalidation_listeners.append(callback)
+    
+    def _notify_invalidation(self, tables):
+        """Tell listeners which tables were invalidated"""
+        for callback in self._invalidation_listeners:
+            try:
+                callback(tables)
+            except Exception as e:
+                logger.error(f"Invalidation listener failed: {e}")
+    
+    def invalidate_tables(self, *tables):
+        """
+        Invalidate entries that read any of the given tables
+        
+        Entries whose tables are unknown are invalidated on every write.
+        
+        Args:
+            tables: Table names that were modified
+            
+        Returns:
+            Number of entries invalidated
+        """
+        with self.lock:
+            keys = set(self._table_index.get(UNKNOWN_TABLES, ()))
+            negative_keys = set(self._negative_index.get(UNKNOWN_TABLES, ()))
+            for table in tables:
+                keys.update(self._table_index.get(table.lower(), ()))
+                negative_keys.update(self._negative_index.get(table.lower(), ()))
+            
+            for key in keys:
+                self._unlink(key)
+            for key in negative_keys:
+                # Rows may now exist for a previously empty query
+                self._unlink_negative(key)
+            
+            self.invalidations += len(keys)
+        
+        # Listeners may hold data for these tables even if this cache did not
+        self._notify_invalidation(tuple(table.lower() for table in tables))
+        logger.debug(f"Invalidated {len(keys)} entries for tables: {', '.join(tables)}")
+        return len(keys)
+    
+    def invalidate_matching(self, pattern):
+        """
+        Invalidate entries whose normalized query matches a pattern
+        
+        Args:
+            pattern: Glob pattern (e.g. '*from users*') or compiled regex
+            
+        Returns:
+            Number of entries invalidated
+        """
+        if hasattr(pattern, 'search'):
+            matches = pattern.search
         else:
-            # Clear entire cache
-            self.cache.clear()
-            logger.info("Entire cache invalidated")
+            glob = pattern.strip().lower()
+            matches = lambda query: fnmatch.fnmatchcase(query, glob)
+        
+        with self.lock:
+            keys = [key for key, entry in self.cache.items() if matches(entry.query)]
+            negative_keys = [key for key, entry in self._negative.items() if matches(entry.query)]
+            
+            tables = set()
+            removed = [self._unlink(key) for key in keys]
+            removed += [self._unlink_negative(key) for key in negative_keys]
+            for entry in removed:
+                if not entry.tables:
+                    tables = None
+                elif tables is not None:
+                    tables.update(entry.tables)
+            
+            self.invalidations += len(removed)
+        
+        if removed:
+            self._notify_invalidation(tuple(tables) if tables is not None else None)
+        logger.debug(f"Invalidated {len(removed)} entries matching: {pattern}")
+        return len(removed)
     
     def get_stats(self):
-        """Get cache statistics"""
-        total_requests = self.hits + self.misses
-        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
-        
-        return {
-            'cache_size': len(self.cache),
-            'max_size': self.max_size,
-            'ttl_seconds': self.ttl,
-            'hits': self.hits,
-            'misses': self.misses,
-            'evictions': self.evictions,
-            'hit_rate': f"{hit_rate:.2f}%",
-            'total_requests': total_requests
-        }
+        """
+        Get cache statistics
+        
+        Hit rates are for this cache's eviction_policy; compare policies
+        with CacheManager.get_policy_stats(), which aggregates them per
+        policy across the manager's caches.
+        """
+        with self.lock:
+            total_requests = self.hits + self.misses
+            hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+            
+            return {
+                'cache_size': len(self.cache),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'eviction_policy': self.policy,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'stale_ttl_seconds': self.stale_ttl,
+                'stale_hits': self.stale_hits,
+                'refreshes': self.refreshes,
+                'refresh_ahead': self.refresh_ahead,
+                'refresh_errors': self.refresh_errors,
+                'bytes_used': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'memory_used': format_size(self.bytes_used),
+                'oversize_rejections': self.oversize_rejections,
+                'negative_ttl_seconds': self.negative_ttl,
+                'negative_entries': len(self._negative),
+                'negative_max_size': self.negative_max_size,
+                'negative_hits': self.negative_hits,
+                'negative_evictions': self.negative_evictions,
+                'adaptive_ttl': self.adaptive_ttl,
+                'unchanged_reloads': self.unchanged_reloads,
+                'changed_reloads': self.changed_reloads,
+                'learned_ttls': {table: round(ttl, 1) for table, ttl in sorted(self._table_ttls.items())},
+                'admission': self.admission,
+                'admission_rejections': self.admission_rejections,
+                'validation': self.validator.mode if self.validator is not None else None,
+                'validation_failures': self.validation_failures,
+                'largest_entries': self._largest_entries(),
+                'size_histogram': self._size_histogram(),
+                'in_flight': len(self._in_flight) + len(self._async_in_flight),
+                'tracked_tables': sorted(t for t in self._table_index if t != UNKNOWN_TABLES),
+                'key_mode': 'fast' if self.fast_keys else 'md5',
+                'storage': self.storage,
+                'interned_statements': len(self._normalized_ids),
+                'hit_rate': f"{hit_rate:.2f}%",
+                'total_requests': total_requests
+            }
+    
+    def _largest_entries(self, limit=5):
+        """Get the biggest cached entries by estimated size"""
+        largest = heapq.nlargest(limit, self.cache.values(), key=lambda entry: entry.size)
+        return [
+            {'query': entry.query[:80], 'size_bytes': entry.size, 'size': format_size(entry.size)}
+            for entry in largest
+        ]
+    
+    def _size_histogram(self):
+        """Count cached entries per size bucket"""
+        histogram = {label: 0 for label, _ in SIZE_BUCKETS}
+        for entry in self.cache.values():
+            for label, upper in SIZE_BUCKETS:
+                if entry.size < upper:
+                    histogram[label] += 1
+                    break
+        return histogram
+    
+    def _clear_entries(self):
+        """Drop every entry and the policy bookkeeping"""
+        self.cache.clear()
+        self._expiry.clear()
+        self._expiry_heap.clear()
+        self._freq_buckets.clear()
+        self._min_freq = 0
+        self._table_index.clear()
+        self._loaders.clear()
+        self._negative.clear()
+        self._negative_index.clear()
+        self.bytes_used = 0
     
     def clear(self):
         """Clear all cache"""
-        self.cache.clear()
-        self.hits = 0
-        self.misses = 0
-        self.evictions = 0
+        with self.lock:
+            self._clear_entries()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+            self.coalesced = 0
+            self.stale_hits = 0
+            self.refreshes = 0
+            self.refresh_ahead = 0
+            self.refresh_errors = 0
+            self.oversize_rejections = 0
+            self.negative_hits = 0
+            self.negative_evictions = 0
+            self.unchanged_reloads = 0
+            self.changed_reloads = 0
+            self.admission_rejections = 0
+            self.validation_failures = 0
+        
+        self._notify_invalidation(None)
         logger.info("Cache cleared")
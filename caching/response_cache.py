@@ -0,0 +1,255 @@
+"""
+Response Cache
+Caches encoded API responses with ETag and Last-Modified validators
+"""
+
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Index bucket for responses whose tables are unknown
+UNKNOWN_TABLES = '*'
+
+
+class CachedResponse:
+    """
+    Encoded response body with its validators
+    """
+    
+    __slots__ = ('key', 'body', 'etag', 'last_modified', 'expires_at', 'tables', 'stamp')
+    
+    def __init__(self, key, body, last_modified, expires_at, tables, stamp=None):
+        self.key = key
+        self.body = body
+        self.etag = hashlib.md5(body).hexdigest()
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        self.tables = tables
+        self.stamp = stamp
+
+
+class ResponseCache:
+    """
+    Response-level cache keyed by endpoint and query arguments
+    
+    Stores final JSON bytes so hits skip row conversion and encoding.
+    Attached to a QueryCache, it drops responses whenever the query
+    cache invalidates the tables they were built from. With a validator,
+    responses are also dropped once their tables change.
+    """
+    
+    def __init__(self, ttl=300, max_size=1000, validator=None):
+        """
+        Initialize response cache
+        
+        Args:
+            ttl: Time to live in seconds
+            max_size: Maximum cached responses
+            validator: DataVersionValidator/TableVersionValidator checked on every hit
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.responses = OrderedDict()
+        self._table_index = {}
+        self.lock = Lock()
+        self.validator = validator
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.validation_failures = 0
+        
+        logger.info(f"Response Cache initialized: TTL={ttl}s, max_size={max_size}")
+    
+    def _make_key(self, endpoint, args=None):
+        """
+        Generate response key from endpoint and query arguments
+        
+        Args:
+            endpoint: Endpoint path
+            args: Query arguments (dict or werkzeug MultiDict)
+            
+        Returns:
+            Hashable key
+        """
+        if not args:
+            return (endpoint, ())
+        if hasattr(args, 'getlist'):
+            return (endpoint, tuple(sorted(args.items(multi=True))))
+        return (endpoint, tuple(sorted(args.items())))
+    
+    def _unlink(self, key):
+        """Remove a response and its table index entries"""
+        response = self.responses.pop(key, None)
+        if response is None:
+            return None
+        
+        for table in response.tables or (UNKNOWN_TABLES,):
+            keys = self._table_index.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._table_index[table]
+        return response
+    
+    def get(self, endpoint, args=None):
+        """
+        Get a cached response
+        
+        Args:
+            endpoint: Endpoint path
+            args: Query arguments
+            
+        Returns:
+            CachedResponse or None if not found/expired
+        """
+        key = self._make_key(endpoint, args)
+        
+        with self.lock:
+            response = self.responses.get(key)
+            if response is not None and self.validator is not None:
+                if not self.validator.is_current(response.stamp, response.tables):
+                    self._unlink(key)
+                    self.validation_failures += 1
+                    response = None
+            
+            if response is not None:
+                if time.time() < response.expires_at:
+                    self.responses.move_to_end(key)
+                    self.hits += 1
+                    return response
+                self._unlink(key)
+            
+            self.misses += 1
+            return None
+    
+    def stamp(self, tables=()):
+        """
+        Take the validator stamp before building a response
+        
+        Args:
+            tables: Tables the response is built from
+            
+        Returns:
+            Stamp, or None without a validator
+        """
+        if self.validator is None:
+            return None
+        return self.validator.stamp(frozenset(table.lower() for table in tables))
+    
+    def set(self, endpoint, args, body, tables=(), stamp=None, ttl=None):
+        """
+        Cache an encoded response
+        
+        Args:
+            endpoint: Endpoint path
+            args: Query arguments
+            body: Encoded response body (bytes or str)
+            tables: Tables the response was built from
+            stamp: Stamp taken before the response was built (taken now if None)
+            ttl: Seconds to keep the response (default: self.ttl), e.g. what
+                is left of the query-cache entry it was built from; 0 or
+                less builds the response without storing it
+                
+        Returns:
+            CachedResponse
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        if stamp is None:
+            stamp = self.stamp(tables)
+        
+        key = self._make_key(endpoint, args)
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        response = CachedResponse(key, body, now, now + ttl,
+                                  frozenset(table.lower() for table in tables), stamp)
+        
+        with self.lock:
+            self._unlink(key)
+            if ttl <= 0:
+                return response
+            while self.responses and len(self.responses) >= self.max_size:
+                self._unlink(next(iter(self.responses)))
+                self.evictions += 1
+            
+            self.responses[key] = response
+            for table in response.tables or (UNKNOWN_TABLES,):
+                self._table_index.setdefault(table, set()).add(key)
+        
+        return response
+    
+    def invalidate_tables(self, tables=None):
+        """
+        Invalidate responses built from any of the given tables
+        
+        Args:
+            tables: Modified table names (None invalidates everything)
+            
+        Returns:
+            Number of responses invalidated
+        """
+        with self.lock:
+            if tables is None:
+                removed = len(self.responses)
+                self.responses.clear()
+                self._table_index.clear()
+            else:
+                keys = set(self._table_index.get(UNKNOWN_TABLES, ()))
+                for table in tables:
+                    keys.update(self._table_index.get(table.lower(), ()))
+                for key in keys:
+                    self._unlink(key)
+                removed = len(keys)
+            
+            self.invalidations += removed
+        
+        if removed:
+            logger.debug(f"Response cache invalidated {removed} responses")
+        return removed
+    
+    def attach(self, query_cache):
+        """
+        Follow invalidations of a QueryCache
+        
+        Args:
+            query_cache: QueryCache whose invalidations evict responses
+        """
+        query_cache.add_invalidation_listener(self.invalidate_tables)
+    
+    def get_stats(self):
+        """Get response cache statistics"""
+        with self.lock:
+            total_requests = self.hits + self.misses
+            hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+            
+            return {
+                'cache_size': len(self.responses),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'validation_failures': self.validation_failures,
+                'bytes_used': sum(len(response.body) for response in self.responses.values()),
+                'hit_rate': f"{hit_rate:.2f}%",
+                'total_requests': total_requests
+            }
+    
+    def clear(self):
+        """Clear all responses"""
+        with self.lock:
+            self.responses.clear()
+            self._table_index.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+            self.validation_failures = 0
+        logger.info("Response cache cleared")
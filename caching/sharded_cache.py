@@ -0,0 +1,254 @@
+"""
+Sharded Query Cache
+Lock-striped QueryCache for multi-threaded servers
+"""
+
+import math
+import heapq
+import logging
+
+from caching.query_cache import QueryCache
+from caching.size_estimator import format_size
+from caching.table_dependencies import extract_tables
+
+logger = logging.getLogger(__name__)
+
+# Counters summed across shards in get_stats
+_SUMMED_STATS = (
+    'cache_size', 'max_size', 'hits', 'misses', 'evictions', 'expirations',
+    'invalidations', 'coalesced', 'in_flight', 'stale_hits', 'refreshes',
+    'refresh_ahead', 'refresh_errors', 'bytes_used', 'oversize_rejections',
+    'negative_entries', 'negative_hits', 'negative_evictions', 'unchanged_reloads',
+    'changed_reloads', 'admission_rejections', 'validation_failures', 'interned_statements'
+)
+
+
+class ShardedQueryCache:
+    """
+    Thread-safe query cache split into independently locked shards
+    
+    Keys are routed to one of num_shards QueryCache segments, each with
+    its own lock, so threads working on different keys rarely contend.
+    Capacity limits are divided evenly between shards, so one result must
+    fit in its shard's share of max_bytes. Sharding only pays off when
+    lock contention dominates (see benchmarks/cache_concurrency_benchmark.py).
+    """
+    
+    def __init__(self, num_shards=16, ttl=300, max_size=1000, **cache_options):
+        """
+        Initialize sharded cache
+        
+        Args:
+            num_shards: Number of independently locked segments
+            ttl: Time to live in seconds
+            max_size: Maximum cache entries across all shards
+            cache_options: Other QueryCache options (policy, max_bytes, ...)
+        """
+        self.num_shards = num_shards
+        self.ttl = ttl
+        self.max_size = max_size
+        self.policy = cache_options.get('policy', 'lru')
+        self.max_bytes = cache_options.get('max_bytes')
+        self.validator = cache_options.get('validator')
+        
+        shard_options = dict(cache_options)
+        for option in ('max_bytes', 'negative_max_size'):
+            if shard_options.get(option) is not None:
+                shard_options[option] = math.ceil(shard_options[option] / num_shards)
+        
+        shard_size = math.ceil(max_size / num_shards)
+        self.shards = [QueryCache(ttl, shard_size, **shard_options) for _ in range(num_shards)]
+        
+        self._invalidation_listeners = []
+        
+        logger.info(f"Sharded Query Cache initialized: {num_shards} shards, max_size={max_size}")
+    
+    def _shard_for(self, query, params=None):
+        """
+        Route a query and params to its shard
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            QueryCache shard
+        """
+        # The raw SQL string caches its own hash; spellings of the same
+        # statement may land on different shards, which only costs a duplicate
+        if not params:
+            frozen = ()
+        elif type(params) is tuple:
+            frozen = params
+        elif isinstance(params, dict):
+            frozen = tuple(sorted(params.items()))
+        else:
+            frozen = tuple(params)
+        
+        try:
+            route = hash((query, frozen))
+        except TypeError:
+            route = hash((query, repr(frozen)))
+        
+        return self.shards[route % self.num_shards]
+    
+    @property
+    def hits(self):
+        """Total hits across shards"""
+        return sum(shard.hits for shard in self.shards)
+    
+    @property
+    def misses(self):
+        """Total misses across shards"""
+        return sum(shard.misses for shard in self.shards)
+    
+    def get(self, query, params=None):
+        """Get cached query result (see QueryCache.get)"""
+        return self._shard_for(query, params).get(query, params)
+    
+    def stamp(self, query, tables=None):
+        """Take the validator stamp for a result about to be loaded (see QueryCache.stamp)"""
+        return self.shards[0].stamp(query, tables)
+    
+    def set(self, query, params, result, tables=None, stamp=None, learn=True, bypass_admission=False):
+        """Cache query result (see QueryCache.set)"""
+        self._shard_for(query, params).set(query, params, result, tables, stamp, learn,
+                                           bypass_admission)
+    
+    def ttl_remaining(self, query, params=None):
+        """Seconds until a cached result expires (see QueryCache.ttl_remaining)"""
+        return self._shard_for(query, params).ttl_remaining(query, params)
+    
+    def get_or_compute(self, query, params, loader, timeout=30, tables=None, fallback=None):
+        """Get cached result or compute it once (see QueryCache.get_or_compute)"""
+        return self._shard_for(query, params).get_or_compute(query, params, loader, timeout, tables,
+                                                             fallback)
+    
+    async def aget_or_compute(self, query, params, loader, timeout=30, tables=None, fallback=None):
+        """Async get_or_compute (see QueryCache.aget_or_compute)"""
+        return await self._shard_for(query, params).aget_or_compute(query, params, loader, timeout, tables,
+                                                                    fallback)
+    
+    def register_loader(self, query, params, loader, tables=None):
+        """Register a background refresh loader (see QueryCache.register_loader)"""
+        self._shard_for(query, params).register_loader(query, params, loader, tables)
+    
+    def invalidate(self, query=None, params=None):
+        """
+        Invalidate cache entry or entire cache
+        
+        Args:
+            query: Specific query to invalidate (None for all)
+            params: Query parameters
+        """
+        # Other spellings of the query may live on any shard
+        for shard in self.shards:
+            shard.invalidate(query, params)
+        self._notify_invalidation(None if not query else self._query_tables(query))
+    
+    def _query_tables(self, query):
+        """Tables read by a query, or None when unknown"""
+        return tuple(extract_tables(query)) or None
+    
+    def invalidate_tables(self, *tables):
+        """
+        Invalidate entries that read any of the given tables
+        
+        Returns:
+            Number of entries invalidated
+        """
+        removed = sum(shard.invalidate_tables(*tables) for shard in self.shards)
+        self._notify_invalidation(tuple(table.lower() for table in tables))
+        return removed
+    
+    def invalidate_matching(self, pattern):
+        """
+        Invalidate entries whose normalized query matches a pattern
+        
+        Returns:
+            Number of entries invalidated
+        """
+        removed = sum(shard.invalidate_matching(pattern) for shard in self.shards)
+        if removed:
+            self._notify_invalidation(None)
+        return removed
+    
+    def add_invalidation_listener(self, callback):
+        """
+        Register a callback run after entries are invalidated
+        
+        Args:
+            callback: Called with the invalidated table names, or None
+        """
+        self._invalidation_listeners.append(callback)
+    
+    def _notify_invalidation(self, tables):
+        """Tell listeners which tables were invalidated"""
+        for callback in self._invalidation_listeners:
+            try:
+                callback(tables)
+            except Exception as e:
+                logger.error(f"Invalidation listener failed: {e}")
+    
+    def get_stats(self):
+        """Get statistics aggregated across shards"""
+        shard_stats = [shard.get_stats() for shard in self.shards]
+        
+        stats = {name: 0 for name in _SUMMED_STATS}
+        for shard in shard_stats:
+            for name in _SUMMED_STATS:
+                stats[name] += shard[name] or 0
+        
+        total_requests = stats['hits'] + stats['misses']
+        hit_rate = (stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+        
+        # Average each table's learned TTL over the shards that learned one
+        learned = {}
+        for shard in shard_stats:
+            for table, ttl in shard['learned_ttls'].items():
+                learned.setdefault(table, []).append(ttl)
+        
+        # Size stats describe all shards together
+        largest = heapq.nlargest(5, (entry for shard in shard_stats for entry in shard['largest_entries']),
+                                 key=lambda entry: entry['size_bytes'])
+        histogram = dict(shard_stats[0]['size_histogram'])
+        for shard in shard_stats[1:]:
+            for label, count in shard['size_histogram'].items():
+                histogram[label] += count
+        
+        stats.update({
+            'max_size': self.max_size,
+            'max_bytes': self.max_bytes,
+            'memory_used': format_size(stats['bytes_used']),
+            'largest_entries': largest,
+            'size_histogram': histogram,
+            'stale_ttl_seconds': self.shards[0].stale_ttl,
+            'key_mode': shard_stats[0]['key_mode'],
+            'storage': self.shards[0].storage,
+            'ttl_seconds': self.ttl,
+            'negative_ttl_seconds': self.shards[0].negative_ttl,
+            'negative_max_size': sum(shard.negative_max_size for shard in self.shards),
+            'eviction_policy': self.policy,
+            'num_shards': self.num_shards,
+            'shard_sizes': [shard['cache_size'] for shard in shard_stats],
+            'tracked_tables': sorted({t for shard in shard_stats for t in shard['tracked_tables']}),
+            'adaptive_ttl': self.shards[0].adaptive_ttl,
+            'admission': self.shards[0].admission,
+            'validation': shard_stats[0]['validation'],
+            'learned_ttls': {table: round(sum(ttls) / len(ttls), 1) for table, ttls in sorted(learned.items())},
+            'hit_rate': f"{hit_rate:.2f}%",
+            'total_requests': total_requests
+        })
+        return stats
+    
+    def clear(self):
+        """Clear all shards"""
+        for shard in self.shards:
+            shard.clear()
+        self._notify_invalidation(None)
+        logger.info("Sharded cache cleared")
+    
+    def close(self):
+        """Stop background refresh workers of every shard"""
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,464 @@
+"""
+Shared Memory Cache
+Memory-mapped cache tier shared by worker processes on one host
+"""
+
+import os
+import json
+import mmap
+import stat
+import time
+import zlib
+import fcntl
+import pickle
+import struct
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from threading import Lock
+
+from caching.columnar import ColumnarResult
+from caching.table_dependencies import extract_tables
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'QCSHM002'
+
+# magic, num_slots, slot_size, invalidation sequence
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+SEQUENCE_OFFSET = 16
+
+# sequence, writer pid, writer tag, comma separated tables ('*' for all)
+RECORD = struct.Struct('<QII112s')
+INVALIDATION_RING = 64
+
+# key digest, expires at, table mask, payload length
+SLOT = struct.Struct('<16sdQI')
+EMPTY_DIGEST = bytes(16)
+ALL_TABLES_MASK = (1 << 64) - 1
+
+# Slots tried per key before the soonest-expiring one is overwritten
+PROBE_LENGTH = 4
+
+
+def default_path():
+    """
+    Default backing file, in a directory private to the current user
+    
+    Slots are unpickled, so the file must not be writable by anyone else;
+    the directory lives in /dev/shm when the host has it.
+    
+    Returns:
+        Path to the backing file
+        
+    Raises:
+        PermissionError: If the directory exists but is not private to the user
+    """
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    directory = os.path.join(base, f'query_cache-{os.getuid()}')
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or
+            info.st_mode & 0o077):
+        raise PermissionError(f"Shared cache directory is not private to this user: {directory}")
+    return os.path.join(directory, 'query_cache.shm')
+
+
+def open_private(path, flags=os.O_RDWR):
+    """
+    Open a backing file only if the current user alone can write it
+    
+    Symlinks are refused (O_NOFOLLOW), as are files owned by another user
+    or accessible to group or others.
+    
+    Args:
+        path: Backing file
+        flags: os.open flags (O_NOFOLLOW is added)
+        
+    Returns:
+        File descriptor
+        
+    Raises:
+        PermissionError: If the file is not private to the user
+    """
+    fd = os.open(path, flags | os.O_NOFOLLOW, 0o600)
+    info = os.fstat(fd)
+    if (not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid() or
+            info.st_mode & 0o077):
+        os.close(fd)
+        raise PermissionError(f"Shared cache file is not private to this user "
+                              f"(owner uid {info.st_uid}, mode {stat.filemode(info.st_mode)}): {path}")
+    return fd
+
+
+def key_digest(query, params=None):
+    """
+    Generate a process-independent key digest
+    
+    Args:
+        query: SQL query string
+        params: Query parameters
+        
+    Returns:
+        16-byte MD5 digest
+    """
+    cache_data = {
+        'query': query.strip().lower(),
+        'params': params or []
+    }
+    cache_str = json.dumps(cache_data, sort_keys=True, default=str)
+    return hashlib.md5(cache_str.encode()).digest()
+
+
+def table_mask(tables):
+    """
+    Map table names to a 64-bit mask
+    
+    Uses crc32 rather than hash() so every process computes the same
+    bits. Entries with unknown tables match every invalidation.
+    
+    Args:
+        tables: Table names
+        
+    Returns:
+        Integer bit mask
+    """
+    if not tables:
+        return ALL_TABLES_MASK
+    
+    mask = 0
+    for table in tables:
+        mask |= 1 << (zlib.crc32(table.lower().encode()) % 64)
+    return mask
+
+
+class SharedMemoryCache:
+    """
+    Second-level query cache shared by all worker processes on a host
+    
+    Results are pickled into fixed-size slots of a memory-mapped file and
+    located by an MD5 digest of the normalized query and params, so any
+    process computes the same slot. Writers hold an exclusive flock on the
+    file, readers a shared one. Invalidations clear matching slots and are
+    appended to a ring of records that every process polls, so in-process
+    caches can drop the same tables.
+    """
+    
+    def __init__(self, path=None, num_slots=2048, slot_size=64 * 1024, ttl=300):
+        """
+        Open or create the shared cache file
+        
+        Args:
+            path: Backing file (default: query_cache.shm in a per-user
+                directory under /dev/shm); must be owned by and private to
+                the user, as slots are unpickled
+                
+        Raises:
+            PermissionError: If the backing file is a symlink, another
+                user's, or accessible to group or others
+            num_slots: Number of result slots
+            slot_size: Bytes per slot, including the slot header
+            ttl: Time to live in seconds
+        """
+        self.path = path or default_path()
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self._tag = int.from_bytes(os.urandom(4), 'little')
+        self._lock = Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.oversize_rejections = 0
+        self.invalidations = 0
+        self.broadcasts_received = 0
+        
+        self._open()
+        self._seen_sequence = self._sequence()
+        
+        logger.info(f"Shared Memory Cache initialized: {self.path} "
+                    f"({self.num_slots} slots x {self.slot_size} bytes)")
+    
+    def _open(self):
+        """Map the backing file, initializing it if needed"""
+        self._pid = os.getpid()
+        self._fd = open_private(self.path, os.O_RDWR | os.O_CREAT)
+        
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, HEADER.size, 0)
+            if len(header) == HEADER.size and header[:8] == MAGIC:
+                _, num_slots, slot_size, _ = HEADER.unpack(header)
+                if (num_slots, slot_size) != (self.num_slots, self.slot_size):
+                    # Other workers already use this layout
+                    logger.warning(f"Shared cache layout taken from existing file: "
+                                   f"{num_slots} slots x {slot_size} bytes")
+                    self.num_slots, self.slot_size = num_slots, slot_size
+            else:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self._file_size())
+                os.pwrite(self._fd, HEADER.pack(MAGIC, self.num_slots, self.slot_size, 0), 0)
+            
+            self._map = mmap.mmap(self._fd, self._file_size())
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        
+        self._slots_offset = HEADER_SIZE + INVALIDATION_RING * RECORD.size
+    
+    def _file_size(self):
+        """Total size of the backing file"""
+        return HEADER_SIZE + INVALIDATION_RING * RECORD.size + self.num_slots * self.slot_size
+    
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """
+        Hold the cross-process file lock
+        
+        flock locks belong to the open file, which a forked worker shares
+        with its parent, so each process reopens the file on first use.
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._pid = os.getpid()
+                self._fd = open_private(self.path)
+            
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+    
+    def _probe(self, digest):
+        """Offsets of the slots a digest may occupy"""
+        start = int.from_bytes(digest[:8], 'little') % self.num_slots
+        return [self._slots_offset + ((start + i) % self.num_slots) * self.slot_size
+                for i in range(min(PROBE_LENGTH, self.num_slots))]
+    
+    def _sequence(self):
+        """Current invalidation sequence number"""
+        return struct.unpack_from('<Q', self._map, SEQUENCE_OFFSET)[0]
+    
+    def get(self, query, params=None):
+        """
+        Get cached query result
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Cached result or None if not found/expired
+        """
+        entry = self.get_stamped(query, params)
+        return entry[0] if entry is not None else None
+    
+    def get_stamped(self, query, params=None):
+        """
+        Get cached query result with the validator stamp it was stored with
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            (result, stamp) tuple, or None if not found/expired
+        """
+        digest = key_digest(query, params)
+        now = time.time()
+        payload = None
+        
+        with self._locked():
+            for offset in self._probe(digest):
+                slot_digest, expires_at, _, length = SLOT.unpack_from(self._map, offset)
+                if slot_digest == digest:
+                    if expires_at > now:
+                        start = offset + SLOT.size
+                        payload = self._map[start:start + length]
+                    break
+        
+        if payload is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        stamp, result = pickle.loads(payload)
+        return result, stamp
+    
+    def set(self, query, params, result, tables=None, stamp=None):
+        """
+        Cache query result for every worker
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            result: Query result to cache
+            tables: Tables the query reads (parsed from the SQL if None)
+            stamp: Validator stamp taken before the result was loaded
+            
+        Returns:
+            True if the result was stored
+        """
+        if isinstance(result, list) and result and isinstance(result[0], sqlite3.Row):
+            # Rows cannot be pickled; columns iterate and index like them
+            result = ColumnarResult.from_rows(result)
+        
+        try:
+            payload = pickle.dumps((stamp, result), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.debug(f"Result not shareable ({e}): {query[:50]}")
+            return False
+        
+        if len(payload) > self.slot_size - SLOT.size:
+            self.oversize_rejections += 1
+            logger.debug(f"Result too large for shared slot ({len(payload)} bytes): {query[:50]}")
+            return False
+        
+        if tables is None:
+            tables = extract_tables(query)
+        
+        digest = key_digest(query, params)
+        now = time.time()
+        
+        with self._locked(exclusive=True):
+            target = None
+            soonest = None
+            for offset in self._probe(digest):
+                slot_digest, expires_at, _, _ = SLOT.unpack_from(self._map, offset)
+                if slot_digest == digest or slot_digest == EMPTY_DIGEST or expires_at <= now:
+                    target = offset
+                    break
+                if soonest is None or expires_at < soonest[0]:
+                    soonest = (expires_at, offset)
+            
+            if target is None:
+                target = soonest[1]
+                self.evictions += 1
+            
+            start = target + SLOT.size
+            self._map[start:start + len(payload)] = payload
+            SLOT.pack_into(self._map, target, digest, now + self.ttl, table_mask(tables), len(payload))
+        
+        self.sets += 1
+        return True
+    
+    def invalidate_tables(self, *tables):
+        """
+        Invalidate entries reading any of the tables in every worker
+        
+        Args:
+            tables: Table names that were modified (none for everything)
+            
+        Returns:
+            Number of slots cleared
+        """
+        mask = table_mask(tables)
+        removed = 0
+        
+        with self._locked(exclusive=True):
+            for index in range(self.num_slots):
+                offset = self._slots_offset + index * self.slot_size
+                slot_digest, _, slot_mask, _ = SLOT.unpack_from(self._map, offset)
+                if slot_digest != EMPTY_DIGEST and slot_mask & mask:
+                    SLOT.pack_into(self._map, offset, EMPTY_DIGEST, 0.0, 0, 0)
+                    removed += 1
+            
+            self._broadcast(tables)
+        
+        self.invalidations += removed
+        logger.debug(f"Shared cache invalidated {removed} slots for tables: "
+                     f"{', '.join(tables) or 'all'}")
+        return removed
+    
+    def _broadcast(self, tables):
+        """Append an invalidation record (caller holds the exclusive lock)"""
+        names = ','.join(table.lower() for table in tables).encode()
+        if not names or len(names) > RECORD.size - 16:
+            names = b'*'
+        
+        sequence = self._sequence() + 1
+        offset = HEADER_SIZE + (sequence % INVALIDATION_RING) * RECORD.size
+        RECORD.pack_into(self._map, offset, sequence, os.getpid(), self._tag, names)
+        struct.pack_into('<Q', self._map, SEQUENCE_OFFSET, sequence)
+    
+    def poll_invalidations(self):
+        """
+        Read invalidations broadcast by other processes since the last poll
+        
+        Returns:
+            List of table name tuples (None means invalidate everything)
+        """
+        # Unlocked read of the counter keeps the common no-news case cheap
+        if self._sequence() == self._seen_sequence:
+            return []
+        
+        invalidations = []
+        with self._locked():
+            sequence = self._sequence()
+            if sequence - self._seen_sequence > INVALIDATION_RING:
+                # Fell behind the ring; records were overwritten
+                invalidations.append(None)
+            else:
+                for seen in range(self._seen_sequence + 1, sequence + 1):
+                    offset = HEADER_SIZE + (seen % INVALIDATION_RING) * RECORD.size
+                    _, pid, tag, names = RECORD.unpack_from(self._map, offset)
+                    if pid == os.getpid() and tag == self._tag:
+                        continue
+                    names = names.rstrip(b'\0').decode()
+                    invalidations.append(None if names == '*' else tuple(names.split(',')))
+            self._seen_sequence = sequence
+        
+        self.broadcasts_received += len(invalidations)
+        return invalidations
+    
+    def clear(self):
+        """Clear all slots and tell every worker to drop its entries"""
+        self.invalidate_tables()
+        logger.info("Shared cache cleared")
+    
+    def get_stats(self):
+        """Get shared cache statistics for this process"""
+        now = time.time()
+        used_slots = 0
+        
+        with self._locked():
+            for index in range(self.num_slots):
+                offset = self._slots_offset + index * self.slot_size
+                slot_digest, expires_at, _, _ = SLOT.unpack_from(self._map, offset)
+                if slot_digest != EMPTY_DIGEST and expires_at > now:
+                    used_slots += 1
+            sequence = self._sequence()
+        
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'path': self.path,
+            'num_slots': self.num_slots,
+            'slot_size': self.slot_size,
+            'used_slots': used_slots,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'evictions': self.evictions,
+            'oversize_rejections': self.oversize_rejections,
+            'invalidations': self.invalidations,
+            'invalidation_sequence': sequence,
+            'broadcasts_received': self.broadcasts_received,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'total_requests': total_requests
+        }
+    
+    def close(self):
+        """Unmap the backing file (the file itself is left for other workers)"""
+        self._map.close()
+        os.close(self._fd)
@@ -0,0 +1,65 @@
+"""
+Size Estimator
+Estimates memory used by cached query results
+"""
+
+import sys
+import sqlite3
+
+_CONTAINERS = (list, tuple, set, frozenset, sqlite3.Row)
+
+
+def estimate_size(value):
+    """
+    Estimate the memory footprint of a query result in bytes
+
+    Walks lists, tuples, sets, dicts and sqlite3.Row objects, counting each
+    distinct object once (so strings shared between rows are not counted
+    twice). Objects with an estimated_size() method report their own size.
+
+    Args:
+        value: Query result to measure
+
+    Returns:
+        Estimated size in bytes
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if hasattr(obj, 'estimated_size'):
+            total += obj.estimated_size()
+            continue
+
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, _CONTAINERS):
+            stack.extend(obj)
+
+    return total
+
+
+def format_size(num_bytes):
+    """
+    Format a byte count for display
+
+    Args:
+        num_bytes: Size in bytes
+
+    Returns:
+        Human readable size string
+    """
+    for unit in ('B', 'KB', 'MB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f}{unit}" if unit == 'B' else f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f}GB"
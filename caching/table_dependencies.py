@@ -0,0 +1,102 @@
+"""
+Table Dependencies
+Finds which tables a query reads or writes for targeted cache invalidation
+"""
+
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = r'["`\[]?([A-Za-z_][\w$]*)["`\]]?'
+_QUALIFIED = r'(?:["`\[]?\w+["`\]]?\.)?' + _IDENTIFIER
+
+_FROM_CLAUSE = re.compile(
+    r'\bfrom\s+(.*?)(?=\b(?:where|group|order|limit|having|union|except|intersect|'
+    r'join|inner|left|right|cross|natural|on|window)\b|[()]|;|$)',
+    re.IGNORECASE | re.DOTALL
+)
+_JOIN_TABLE = re.compile(r'\bjoin\s+' + _QUALIFIED, re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r'^\s*(?:insert(?:\s+or\s+\w+)?\s+into|replace\s+into|update(?:\s+or\s+\w+)?|delete\s+from)\s+'
+    + _QUALIFIED,
+    re.IGNORECASE
+)
+_TABLE_NAME = re.compile(_QUALIFIED)
+
+
+def extract_tables(query):
+    """
+    Extract tables read by a query from its SQL text
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        Set of lowercase table names
+    """
+    tables = set()
+    
+    for clause in _FROM_CLAUSE.findall(query):
+        # FROM a, b AS x - every comma separated item starts with a table
+        for item in clause.split(','):
+            item = item.strip()
+            if not item or item.startswith('('):
+                continue
+            match = _TABLE_NAME.match(item)
+            if match:
+                tables.add(match.group(1).lower())
+    
+    for table in _JOIN_TABLE.findall(query):
+        tables.add(table.lower())
+    
+    return tables
+
+
+def extract_written_tables(query):
+    """
+    Extract the table modified by an INSERT, UPDATE, REPLACE or DELETE
+    
+    Args:
+        query: SQL statement
+        
+    Returns:
+        Set of lowercase table names (empty for read-only statements)
+    """
+    match = _WRITE_TABLE.match(query)
+    return {match.group(1).lower()} if match else set()
+
+
+def capture_read_tables(connection, query, params=None):
+    """
+    Ask SQLite which tables a query reads using the authorizer callback
+    
+    The statement is only prepared (via EXPLAIN), never executed. Views
+    are reported along with the tables they read.
+    
+    Args:
+        connection: sqlite3 connection
+        query: SQL query string
+        params: Query parameters
+        
+    Returns:
+        Set of lowercase table names
+    """
+    tables = set()
+    
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and arg1 and not arg1.startswith('sqlite_'):
+            tables.add(arg1.lower())
+        return sqlite3.SQLITE_OK
+    
+    connection.set_authorizer(authorizer)
+    try:
+        connection.execute(f"EXPLAIN {query}", params or [])
+    except sqlite3.Error as e:
+        logger.debug(f"Could not capture tables, falling back to SQL parsing: {e}")
+        return extract_tables(query)
+    finally:
+        connection.set_authorizer(None)
+    
+    return tables
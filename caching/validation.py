@@ -0,0 +1,220 @@
+"""
+Cache Validation
+Data-version stamps that let cached results live until the data changes
+"""
+
+import time
+import sqlite3
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Counter table maintained by TableVersionValidator triggers
+VERSION_TABLE = '_table_versions'
+TRIGGER_EVENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def quote_identifier(name):
+    """Quote a table or trigger name for SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    """Quote a string literal for SQL (trigger bodies cannot take parameters)"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+class DataVersionValidator:
+    """
+    Database-wide validation with PRAGMA data_version
+    
+    data_version changes whenever another connection commits, so a
+    dedicated monitor connection (which never writes) sees every write.
+    Any commit invalidates every stamp; the check itself is one pragma,
+    reused for check_interval seconds.
+    """
+    
+    mode = 'data_version'
+    # data_version values are per connection, so stamps mean nothing to
+    # other processes and results from shared tiers cannot be validated
+    shareable = False
+    
+    def __init__(self, db_path, check_interval=0):
+        """
+        Open the monitor connection
+        
+        Args:
+            db_path: Path to the database
+            check_interval: Seconds a version reading is reused (bounds staleness)
+        """
+        self.check_interval = check_interval
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = Lock()
+        self._version = None
+        self._checked_at = 0
+        self.checks = 0
+        
+        logger.info(f"Data version validator initialized: {db_path}")
+    
+    def _current(self):
+        """Current data version, re-read at most once per check_interval"""
+        with self.lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked_at >= self.check_interval:
+                self._version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+                self._checked_at = now
+                self.checks += 1
+            return self._version
+    
+    def stamp(self, tables=()):
+        """
+        Stamp for a result about to be loaded
+        
+        Args:
+            tables: Tables the query reads (unused; any write counts)
+            
+        Returns:
+            Opaque stamp
+        """
+        return self._current()
+    
+    def is_current(self, stamp, tables=()):
+        """
+        Check that no write happened since a stamp was taken
+        
+        Args:
+            stamp: Value from stamp()
+            tables: Tables the query reads
+            
+        Returns:
+            True if the stamped result is still valid
+        """
+        return stamp == self._current()
+    
+    def get_stats(self):
+        """Get validator statistics"""
+        return {
+            'mode': self.mode,
+            'check_interval': self.check_interval,
+            'checks': self.checks
+        }
+    
+    def close(self):
+        """Close the monitor connection"""
+        self.connection.close()
+
+
+class TableVersionValidator(DataVersionValidator):
+    """
+    Per-table validation with trigger-maintained change counters
+    
+    Installs AFTER INSERT/UPDATE/DELETE triggers that bump a counter per
+    table, so a write to orders leaves cached users results valid.
+    Virtual tables (e.g. FTS) cannot have triggers and are not tracked;
+    results reading a table without a counter are validated by TTL only.
+    """
+    
+    mode = 'table_version'
+    # Counters live in the database, so any process can check a stamp
+    shareable = True
+    
+    def __init__(self, db_path, tables=None, check_interval=0):
+        """
+        Install counters and open the monitor connection
+        
+        Args:
+            db_path: Path to the database
+            tables: Tables to track (None for every table except virtual ones)
+            check_interval: Seconds a counter reading is reused (bounds staleness)
+        """
+        super().__init__(db_path, check_interval)
+        self.tables = self._install_triggers(tables)
+    
+    def _install_triggers(self, tables):
+        """
+        Create the counter table and triggers
+        
+        Returns:
+            Tracked table names (lower case)
+        """
+        connection = self.connection
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} "
+            f"(table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"
+        )
+        
+        if tables is None:
+            tables = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name NOT LIKE 'sqlite_%' AND name != ? "
+                "AND sql NOT LIKE 'CREATE VIRTUAL%'", (VERSION_TABLE,)
+            )]
+        
+        for table in tables:
+            name = table.lower()
+            connection.execute(
+                f"INSERT OR IGNORE INTO {VERSION_TABLE} (table_name, version) VALUES (?, 0)", (name,)
+            )
+            for event in TRIGGER_EVENTS:
+                trigger = quote_identifier(f"_version_{name}_{event.lower()}")
+                connection.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {trigger} "
+                    f"AFTER {event} ON {quote_identifier(table)} BEGIN "
+                    f"UPDATE {VERSION_TABLE} SET version = version + 1 "
+                    f"WHERE table_name = {quote_literal(name)}; "
+                    f"END"
+                )
+        connection.commit()
+        
+        logger.info(f"Table version triggers installed: {', '.join(sorted(tables))}")
+        return frozenset(table.lower() for table in tables)
+    
+    def _current(self):
+        """Current counters by table, re-read at most once per check_interval"""
+        with self.lock:
+            now = time.monotonic()
+            if self._version is None or now - self._checked_at >= self.check_interval:
+                self._version = dict(self.connection.execute(
+                    f"SELECT table_name, version FROM {VERSION_TABLE}"
+                ))
+                self._checked_at = now
+                self.checks += 1
+            return self._version
+    
+    def stamp(self, tables=()):
+        """
+        Stamp for a result about to be loaded
+        
+        Args:
+            tables: Tables the query reads (empty when unknown)
+            
+        Returns:
+            Counters of the tables, all counters when unknown,
+            or None when a table is not tracked
+        """
+        versions = self._current()
+        if not tables:
+            return tuple(sorted(versions.items()))
+        if not all(table in versions for table in tables):
+            return None
+        return tuple(versions[table] for table in sorted(tables))
+    
+    def is_current(self, stamp, tables=()):
+        """
+        Check that none of the tables changed since a stamp was taken
+        
+        Args:
+            stamp: Value from stamp()
+            tables: Tables the query reads
+            
+        Returns:
+            True if the stamped result is still valid
+        """
+        return stamp is None or stamp == self.stamp(tables)
+    
+    def get_stats(self):
+        """Get validator statistics"""
+        stats = super().get_stats()
+        stats['tracked_tables'] = sorted(self.tables)
+        return stats
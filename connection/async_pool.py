@@ -0,0 +1,251 @@
+"""
+Async Connection Pool
+asyncio front end for ConnectionPool running SQLite calls on a bounded executor
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from connection.connection_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCursor:
+    """
+    Cursor whose fetches run on the pool executor
+    
+    Supports async iteration, fetching rows in batches.
+    """
+    
+    __slots__ = ('cursor', 'pool', 'batch_size')
+    
+    def __init__(self, cursor, pool, batch_size=100):
+        self.cursor = cursor
+        self.pool = pool
+        self.batch_size = batch_size
+    
+    async def fetchone(self):
+        """Fetch the next row"""
+        return await self.pool.run(self.cursor.fetchone)
+    
+    async def fetchmany(self, size=None):
+        """Fetch the next batch of rows"""
+        return await self.pool.run(self.cursor.fetchmany, size or self.batch_size)
+    
+    async def fetchall(self):
+        """Fetch all remaining rows"""
+        return await self.pool.run(self.cursor.fetchall)
+    
+    async def __aiter__(self):
+        while True:
+            rows = await self.fetchmany()
+            if not rows:
+                return
+            for row in rows:
+                yield row
+
+
+class AsyncConnection:
+    """
+    Pooled connection for coroutines
+    
+    Every call runs on the pool executor, so the event loop never blocks
+    on SQLite. One coroutine should use a connection at a time.
+    """
+    
+    __slots__ = ('pooled', 'pool')
+    
+    def __init__(self, pooled, pool):
+        self.pooled = pooled
+        self.pool = pool
+    
+    @property
+    def connection(self):
+        """Underlying sqlite3 connection"""
+        return self.pooled.connection
+    
+    async def execute(self, query, params=None, batch_size=100):
+        """
+        Execute a query
+        
+        Args:
+            query: SQL query
+            params: Query parameters
+            batch_size: Rows per fetch when iterating the cursor
+            
+        Returns:
+            AsyncCursor
+        """
+        cursor = await self.pool.run(self.pooled.execute, query, params)
+        return AsyncCursor(cursor, self.pool, batch_size)
+    
+    async def fetchall(self, query, params=None):
+        """Execute a query and fetch all rows in one executor call"""
+        return await self.pool.run(lambda: self.pooled.execute(query, params).fetchall())
+    
+    async def fetchone(self, query, params=None):
+        """Execute a query and fetch the first row in one executor call"""
+        return await self.pool.run(lambda: self.pooled.execute(query, params).fetchone())
+    
+    async def iterate(self, query, params=None, batch_size=100):
+        """
+        Execute a query and yield its rows, fetched in batches
+        
+        Args:
+            query: SQL query
+            params: Query parameters
+            batch_size: Rows per executor call
+        """
+        cursor = await self.execute(query, params, batch_size)
+        async for row in cursor:
+            yield row
+    
+    async def commit(self):
+        """Commit transaction"""
+        await self.pool.run(self.pooled.commit)
+    
+    async def rollback(self):
+        """Rollback transaction"""
+        await self.pool.run(self.pooled.rollback)
+
+
+class AsyncConnectionPool:
+    """
+    Connection pool for asyncio applications
+    
+    Wraps a ConnectionPool (health checks, tuning profiles and stats carry
+    over). A semaphore caps connections held by coroutines at
+    max_connections, so waiting happens in the event loop rather than in
+    a blocked thread. SQLite calls run on a dedicated executor with one
+    worker per connection.
+    """
+    
+    def __init__(self, database_path, min_connections=2, max_connections=10, timeout=30,
+                 **pool_options):
+        """
+        Initialize async connection pool
+        
+        Args:
+            database_path: Path to SQLite database
+            min_connections: Minimum connections to maintain
+            max_connections: Maximum connections (and executor workers)
+            timeout: Seconds to wait for a connection
+            pool_options: Other ConnectionPool options (profile, max_age, ...)
+        """
+        self.timeout = timeout
+        self.pool = ConnectionPool(database_path, min_connections=min_connections,
+                                   max_connections=max_connections, timeout=timeout,
+                                   **pool_options)
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='sqlite')
+        self._slots = asyncio.Semaphore(max_connections)
+        
+        self.waiting = 0
+        self.timeouts = 0
+        
+        logger.info(f"Async Connection Pool initialized: max={max_connections}")
+    
+    def run(self, func, *args):
+        """
+        Run a blocking call on the pool executor
+        
+        Returns:
+            Awaitable resolving to the call's result
+        """
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        """
+        Borrow a connection
+        
+        Usage:
+            async with pool.acquire() as conn:
+                rows = await conn.fetchall("SELECT * FROM users")
+        
+        Args:
+            timeout: Seconds to wait for a connection (default: self.timeout)
+            
+        Raises:
+            TimeoutError: If no connection is free within timeout
+        """
+        async with self._slot(timeout):
+            acquiring = self.run(self.pool.get_connection)
+            try:
+                pooled = await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # The executor still finishes the checkout; hand that connection back
+                acquiring.add_done_callback(self._release_abandoned)
+                raise
+            try:
+                yield AsyncConnection(pooled, self)
+            finally:
+                await self.run(self.pool.release_connection, pooled)
+    
+    @asynccontextmanager
+    async def _slot(self, timeout=None):
+        """Hold one of the max_connections slots, waiting in the event loop"""
+        start_time = time.perf_counter()
+        queued = self._slots.locked()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError("No available connections in pool") from None
+        finally:
+            self.waiting -= 1
+        if queued:
+            self.pool.stats.record_wait(time.perf_counter() - start_time)
+        
+        try:
+            yield
+        finally:
+            self._slots.release()
+    
+    def _release_abandoned(self, future):
+        """Release a connection checked out for a cancelled acquire"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            # Done callbacks run on the loop thread; the release resets the
+            # connection, so it runs on the executor
+            self.executor.submit(self.pool.release_connection, future.result())
+        except RuntimeError:
+            # Executor already shut down by close()
+            self.pool.release_connection(future.result())
+    
+    def _checkout_fetch(self, query, params, fetch):
+        """Borrow, query and release in one executor call"""
+        conn = self.pool.get_connection()
+        try:
+            return getattr(conn.execute(query, params), fetch)()
+        finally:
+            self.pool.release_connection(conn)
+    
+    async def fetchall(self, query, params=None):
+        """Run a query on a pooled connection and fetch all rows (one executor call)"""
+        async with self._slot():
+            return await self.run(self._checkout_fetch, query, params, 'fetchall')
+    
+    async def fetchone(self, query, params=None):
+        """Run a query on a pooled connection and fetch the first row (one executor call)"""
+        async with self._slot():
+            return await self.run(self._checkout_fetch, query, params, 'fetchone')
+    
+    async def close(self):
+        """Close all connections and stop the executor"""
+        await self.run(self.pool.close_all)
+        # Waiting for the workers blocks, so it happens off the loop thread
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        logger.info("Async Connection Pool closed")
+    
+    def get_stats(self):
+        """Get pool statistics"""
+        stats = self.pool.get_stats()
+        stats['async_waiting'] = self.waiting
+        stats['async_timeouts'] = self.timeouts
+        return stats
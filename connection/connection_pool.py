@@ -6,27 +6,65 @@ Custom database connection pooling implementation
 import sqlite3
 import time
 import logging
-from threading import Lock
-from queue import Queue, Empty
+from pathlib import Path
+from collections import deque, OrderedDict
+from threading import Lock, Event, Thread, current_thread
+
+from connection.pool_stats import PoolStats
+from connection.tuning import resolve_profile, apply_profile
 
 logger = logging.getLogger(__name__)
 
+# sqlite3's default cached_statements
+DEFAULT_STATEMENT_CACHE_SIZE = 128
+
+# Distinct statements tracked per connection for top-statement stats
+STATEMENT_STATS_LIMIT = 1000
+
+# Affinity hints remembered per connection
+AFFINITY_HINTS = 8
+
 
 class PooledConnection:
     """
     Wrapper for pooled database connection
+    
+    sqlite3 keeps up to cached_statements prepared statements per
+    connection, keyed by SQL text and evicted least recently used.
+    execute() mirrors that cache to count how often a statement had to
+    be prepared (parsed and planned) versus reused.
     """
     
-    def __init__(self, connection, pool):
+    __slots__ = ('connection', 'pool', 'created_at', 'last_used', 'in_use', 'schema_version',
+                 'statement_cache_size', '_cached_statements', 'statement_stats',
+                 'prepares', 'statement_hits', 'hints')
+    
+    def __init__(self, connection, pool, statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE):
         self.connection = connection
         self.pool = pool
         self.created_at = time.time()
         self.last_used = time.time()
         self.in_use = False
+        self.schema_version = self.read_schema_version()
+        
+        self.statement_cache_size = statement_cache_size
+        self._cached_statements = OrderedDict()
+        # SQL -> [executions, prepares]
+        self.statement_stats = {}
+        self.prepares = 0
+        self.statement_hits = 0
+        
+        # Recent affinity hints, oldest first
+        self.hints = OrderedDict()
+    
+    def read_schema_version(self):
+        """Schema cookie, bumped by SQLite on every schema change"""
+        return self.connection.execute("PRAGMA schema_version").fetchone()[0]
     
     def execute(self, query, params=None):
         """Execute query on connection"""
         self.last_used = time.time()
+        self._track_statement(query)
         cursor = self.connection.cursor()
         
         if params:
@@ -36,6 +74,55 @@ class PooledConnection:
         
         return cursor
     
+    def _track_statement(self, query):
+        """Count a statement execution against the mirrored statement cache"""
+        cached = self._cached_statements
+        if query in cached:
+            cached.move_to_end(query)
+            self.statement_hits += 1
+            prepared = 0
+        else:
+            self.prepares += 1
+            prepared = 1
+            if self.statement_cache_size > 0:
+                cached[query] = None
+                if len(cached) > self.statement_cache_size:
+                    cached.popitem(last=False)
+        
+        stats = self.statement_stats.get(query)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += prepared
+        elif len(self.statement_stats) < STATEMENT_STATS_LIMIT:
+            self.statement_stats[query] = [1, prepared]
+    
+    def get_statement_stats(self, top=10):
+        """
+        Get statement cache statistics for this connection
+        
+        Args:
+            top: Number of most executed statements to list
+            
+        Returns:
+            Dict with prepare count, hit rate and top statements
+        """
+        executions = self.prepares + self.statement_hits
+        hit_rate = (self.statement_hits / executions * 100) if executions > 0 else 0
+        ranked = sorted(list(self.statement_stats.items()), key=lambda item: item[1][0], reverse=True)
+        
+        return {
+            'cache_size': self.statement_cache_size,
+            'cached': len(self._cached_statements),
+            'executions': executions,
+            'prepares': self.prepares,
+            'hits': self.statement_hits,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'top_statements': [
+                {'query': query[:100], 'executions': count, 'prepares': prepares}
+                for query, (count, prepares) in ranked[:top]
+            ]
+        }
+    
     def commit(self):
         """Commit transaction"""
         self.connection.commit()
@@ -52,16 +139,83 @@ class PooledConnection:
         """Check if connection is too old"""
         age = time.time() - self.created_at
         return age > max_age
+    
+    def reset(self):
+        """
+        Roll back a transaction left open by the last user
+        
+        Returns:
+            True if the connection is usable, False if it is broken
+        """
+        try:
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            return not self.connection.in_transaction
+        except sqlite3.Error:
+            return False
+    
+    def is_healthy(self):
+        """
+        Check the connection with one cheap round trip
+        
+        A connection is healthy when it has no open transaction, answers
+        a query, and has not seen the schema change since it was opened
+        (its cached statements would be stale).
+        
+        Returns:
+            True if the connection can be handed out
+        """
+        try:
+            if self.connection.in_transaction:
+                return False
+            return self.read_schema_version() == self.schema_version
+        except sqlite3.Error:
+            return False
+
+
+class _Waiter:
+    """
+    A caller queued for a connection
+    
+    release_connection hands a connection straight to the oldest waiter,
+    so callers are served in arrival order. When a slot frees up instead
+    (a connection could not be replaced), the waiter is woken with slot
+    set and opens its own connection.
+    """
+    
+    __slots__ = ('event', 'connection', 'slot')
+    
+    def __init__(self):
+        self.event = Event()
+        self.connection = None
+        self.slot = False
 
 
 class ConnectionPool:
     """
     Custom database connection pool
     Manages a pool of reusable database connections
+    
+    Acquisition takes an idle connection, opens a new one while below
+    max_connections, and only queues when the pool is saturated. Queued
+    callers are served first-in first-out.
+    
+    Connections are checked on borrow, on return and (optionally) by a
+    background sweep of idle connections. Broken ones are replaced, so
+    the caller still gets a working connection.
+    
+    In affinity mode, get_connection takes a hint (a table or statement)
+    and prefers an idle connection that recently served the same hint,
+    whose statement and page caches are already warm for it. Without a
+    match it takes an idle connection that serves no hint yet, and only
+    then the one idle longest, so other hints keep their warm connections.
     """
     
-    def __init__(self, database_path, min_connections=2, max_connections=10, 
-                 timeout=30, max_age=300):
+    def __init__(self, database_path, min_connections=2, max_connections=10,
+                 timeout=30, max_age=300, validate_on_borrow=True,
+                 validate_on_return=True, health_check_interval=None, profile=None,
+                 read_only=False, statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE,
+                 affinity=False):
         """
         Initialize connection pool
         
@@ -71,145 +225,622 @@ class ConnectionPool:
             max_connections: Maximum connections allowed
             timeout: Timeout for getting connection
             max_age: Maximum age of connection before recreation
+            validate_on_borrow: Health check idle connections before handing them out
+            validate_on_return: Roll back open transactions when connections come back
+            health_check_interval: Seconds between idle sweeps (None for no sweeps)
+            profile: Tuning profile name from connection.tuning.PROFILES or a
+                dict of PRAGMA settings applied to every new connection
+            read_only: Open connections with mode=ro and query_only
+            statement_cache_size: Prepared statements kept per connection
+            affinity: Route get_connection hints to connections that served them
         """
         self.database_path = database_path
         self.min_connections = min_connections
         self.max_connections = max_connections
         self.timeout = timeout
         self.max_age = max_age
+        self.validate_on_borrow = validate_on_borrow
+        self.validate_on_return = validate_on_return
+        self.health_check_interval = health_check_interval
+        self.profile = resolve_profile(profile)
+        self.profile_name = profile if isinstance(profile, str) else ('custom' if profile else 'default')
+        self.read_only = read_only
+        self.statement_cache_size = statement_cache_size
+        self.affinity = affinity
         
-        self.available = Queue(maxsize=max_connections)
-        self.in_use = []
+        # Idle connections, most recently released last
+        self.available = OrderedDict()
+        # Hint -> idle connections that recently served it, and idle
+        # connections that served no hint yet (affinity mode)
+        self._idle_by_hint = {}
+        self._idle_unhinted = OrderedDict()
+        self.in_use = set()
+        # Connections between in_use and available: being checked out or
+        # reset on release, outside the lock (close_all closes them too)
+        self._in_transit = set()
+        self.waiters = deque()
         self.lock = Lock()
         
+        # Open connections, including ones being created
+        self.total_connections = 0
+        
         self.total_created = 0
         self.total_requests = 0
         self.total_hits = 0
         self.total_misses = 0
+        self.total_timeouts = 0
+        self.total_rollbacks = 0
+        self.health_failures = {'borrow': 0, 'return': 0, 'sweep': 0}
+        self.affinity_hits = 0
+        self.affinity_misses = 0
+        self.stats = PoolStats()
         
         # Create minimum connections
         self._initialize_pool()
         
-        logger.info(f"Connection Pool initialized: min={min_connections}, max={max_connections}")
+        self._stop = Event()
+        self._health_thread = None
+        if health_check_interval:
+            self._health_thread = Thread(target=self._health_loop, name='pool-health', daemon=True)
+            self._health_thread.start()
+        
+        logger.info(f"Connection Pool initialized: min={min_connections}, max={max_connections}, "
+                    f"profile={self.profile_name}")
     
     def _initialize_pool(self):
         """Create initial connections"""
         for _ in range(self.min_connections):
             conn = self._create_connection()
-            self.available.put(conn)
+            self._check_in(conn)
+            self.total_connections += 1
     
     def _create_connection(self):
         """Create a new database connection"""
-        connection = sqlite3.connect(self.database_path, check_same_thread=False)
+        if self.read_only:
+            uri = Path(self.database_path).absolute().as_uri() + '?mode=ro'
+            connection = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                         cached_statements=self.statement_cache_size)
+        else:
+            connection = sqlite3.connect(self.database_path, check_same_thread=False,
+                                         cached_statements=self.statement_cache_size)
         connection.row_factory = sqlite3.Row
+        if self.read_only:
+            # Read-only connections cannot switch the journal mode; it is
+            # persisted by whichever connection writes
+            apply_profile(connection, {name: value for name, value in self.profile.items()
+                                       if name != 'journal_mode'})
+        else:
+            apply_profile(connection, self.profile)
+        if self.read_only:
+            connection.execute("PRAGMA query_only = ON")
         
-        pooled_conn = PooledConnection(connection, self)
-        self.total_created += 1
+        pooled_conn = PooledConnection(connection, self, self.statement_cache_size)
+        with self.lock:
+            self.total_created += 1
+        self.stats.record_connection_created()
         
         logger.debug(f"Created new connection (total: {self.total_created})")
         return pooled_conn
     
-    def get_connection(self):
+    def _close_connection(self, conn):
+        """Close a connection that is leaving the pool"""
+        conn.connection.close()
+        self.stats.record_connection_closed()
+    
+    def get_connection(self, timeout=None, hint=None):
         """
         Get a connection from the pool
         
+        Args:
+            timeout: Seconds to wait when the pool is saturated (default: self.timeout)
+            hint: Workload key (e.g. table or query) preferred in affinity mode
+            
         Returns:
             PooledConnection instance
             
         Raises:
             TimeoutError: If no connection available within timeout
         """
-        self.total_requests += 1
+        start_time = time.perf_counter()
+        waiter = None
+        conn = None
         
-        try:
-            # Try to get available connection
-            conn = self.available.get(timeout=self.timeout)
+        with self.lock:
+            self.total_requests += 1
             
-            # Check if connection is expired
-            if conn.is_expired(self.max_age):
-                logger.debug("Connection expired, creating new one")
-                conn.connection.close()
-                conn = self._create_connection()
-                self.total_misses += 1
+            if self.available and not self.waiters:
+                # Idle connection (never taken ahead of queued callers)
+                conn = self._pop_idle(hint)
+                self._in_transit.add(conn)
+            elif self.total_connections < self.max_connections:
+                # Reserve a slot, then connect outside the lock
+                self.total_connections += 1
             else:
+                waiter = _Waiter()
+                self.waiters.append(waiter)
+        
+        self.stats.record_request()
+        
+        if waiter is not None:
+            conn = self._wait(waiter, self.timeout if timeout is None else timeout)
+            self.stats.record_wait(time.perf_counter() - start_time)
+        
+        # Idle or handed-over connection, in transit until checked out
+        idle = conn
+        if conn is None:
+            conn = self._open_reserved()
+            reused = False
+        else:
+            conn, reused = self._check_out(conn)
+        
+        with self.lock:
+            if idle is not None:
+                if idle not in self._in_transit:
+                    # close_all ran mid-checkout; like in-use connections, it stays closed
+                    if conn is not idle:
+                        self._close_connection(conn)
+                    return idle
+                self._in_transit.discard(idle)
+            if reused:
                 self.total_hits += 1
+            else:
+                self.total_misses += 1
+            conn.in_use = True
+            self.in_use.add(conn)
+            if self.affinity and hint is not None:
+                self._remember_hint(conn, hint)
+        
+        self.stats.record_acquire(time.perf_counter() - start_time)
+        logger.debug(f"Connection acquired (in use: {len(self.in_use)})")
+        return conn
+    
+    def _pop_idle(self, hint):
+        """
+        Take an idle connection, preferring one that served the hint (caller holds the lock)
+        
+        Without affinity, takes the connection idle longest (FIFO), so
+        every idle connection keeps being used and checked.
+        """
+        if not self.affinity:
+            return self.available.popitem(last=False)[0]
+        
+        matching = self._idle_by_hint.get(hint) if hint is not None else None
+        if matching:
+            conn = next(reversed(matching))
+            self.affinity_hits += 1
+        else:
+            if hint is not None:
+                self.affinity_misses += 1
+            if self._idle_unhinted:
+                conn = next(reversed(self._idle_unhinted))
+            else:
+                # Every idle connection is warm for some hint; take the coldest
+                conn = next(iter(self.available))
+        
+        del self.available[conn]
+        self._unindex(conn)
+        return conn
+    
+    def _remember_hint(self, conn, hint):
+        """Record a hint on a connection, keeping the most recent few (caller holds the lock)"""
+        conn.hints[hint] = None
+        conn.hints.move_to_end(hint)
+        if len(conn.hints) > AFFINITY_HINTS:
+            conn.hints.popitem(last=False)
+    
+    def _unindex(self, conn):
+        """Drop an idle connection from the hint index (caller holds the lock)"""
+        self._idle_unhinted.pop(conn, None)
+        for hint in conn.hints:
+            matching = self._idle_by_hint.get(hint)
+            if matching is not None:
+                matching.pop(conn, None)
+                if not matching:
+                    del self._idle_by_hint[hint]
+    
+    def _wait(self, waiter, timeout):
+        """
+        Wait for a released connection (or a free slot) to be handed over
+        
+        Returns:
+            PooledConnection, or None when handed a slot to connect in
             
-            # Mark as in use
-            with self.lock:
-                conn.in_use = True
-                self.in_use.append(conn)
-            
-            logger.debug(f"Connection acquired (in use: {len(self.in_use)})")
-            return conn
-            
-        except Empty:
-            # No available connection
+        Raises:
+            TimeoutError: If nothing was handed over within timeout
+        """
+        if not waiter.event.wait(timeout):
             with self.lock:
-                total_connections = self.available.qsize() + len(self.in_use)
-                
-                if total_connections < self.max_connections:
-                    # Create new connection
-                    conn = self._create_connection()
-                    conn.in_use = True
-                    self.in_use.append(conn)
-                    self.total_misses += 1
-                    
-                    logger.debug(f"Created new connection (total: {total_connections + 1})")
-                    return conn
-                else:
-                    # Pool exhausted
+                if waiter.connection is None and not waiter.slot:
+                    self.waiters.remove(waiter)
+                    self.total_timeouts += 1
                     logger.error("Connection pool exhausted")
                     raise TimeoutError("No available connections in pool")
+        return waiter.connection
+    
+    def _open_reserved(self):
+        """Open a connection for a reserved slot, releasing the slot on failure"""
+        try:
+            return self._create_connection()
+        except Exception:
+            with self.lock:
+                self._release_slot()
+            raise
+    
+    def _release_slot(self):
+        """Free a connection slot, handing it to the oldest waiter (caller holds the lock)"""
+        if self.waiters:
+            waiter = self.waiters.popleft()
+            waiter.slot = True
+            waiter.event.set()
+            logger.debug("Free slot handed to waiting caller")
+        else:
+            self.total_connections -= 1
+    
+    def _check_out(self, conn):
+        """
+        Replace an idle connection that is too old or fails its health check
+        
+        Returns:
+            (PooledConnection, reused) tuple
+        """
+        if conn.is_expired(self.max_age):
+            logger.debug("Connection expired, creating new one")
+        elif not self.validate_on_borrow or conn.is_healthy():
+            return conn, True
+        else:
+            self._record_health_failure('borrow')
+        
+        return self._replace(conn), False
+    
+    def _replace(self, conn):
+        """Close a connection and open another in its slot"""
+        try:
+            self._close_connection(conn)
+        except sqlite3.Error:
+            pass
+        return self._open_reserved()
+    
+    def _record_health_failure(self, stage):
+        """Count a broken connection found at a stage (borrow, return, sweep)"""
+        with self.lock:
+            self.health_failures[stage] += 1
+        logger.warning(f"Replacing broken pooled connection (found on {stage})")
+    
+    def _check_in(self, conn, touch=True):
+        """Hand a connection to the oldest waiter or make it idle (caller holds the lock)"""
+        if touch:
+            conn.last_used = time.time()
+        if self.waiters:
+            waiter = self.waiters.popleft()
+            waiter.connection = conn
+            self._in_transit.add(conn)
+            waiter.event.set()
+            logger.debug("Connection handed to waiting caller")
+        else:
+            self.available[conn] = None
+            if self.affinity:
+                for hint in conn.hints:
+                    self._idle_by_hint.setdefault(hint, OrderedDict())[conn] = None
+                if not conn.hints:
+                    self._idle_unhinted[conn] = None
+            logger.debug(f"Connection released (available: {len(self.available)})")
     
     def release_connection(self, conn):
         """
         Return connection to pool
         
+        A transaction left open is rolled back, and a connection that
+        cannot be reset is replaced. The connection goes to the oldest
+        waiter if there is one, otherwise back to the idle connections.
+        
         Args:
             conn: PooledConnection to release
         """
         with self.lock:
-            if conn in self.in_use:
-                self.in_use.remove(conn)
-                conn.in_use = False
-                
-                # Return to available pool
+            # Checked and claimed together, so a second release is a no-op
+            if conn not in self.in_use:
+                return
+            self.in_use.discard(conn)
+            conn.in_use = False
+            self._in_transit.add(conn)
+        
+        returned = conn
+        if self.validate_on_return:
+            in_transaction = self._in_transaction(conn)
+            if not conn.reset():
+                self._record_health_failure('return')
                 try:
-                    self.available.put_nowait(conn)
-                    logger.debug(f"Connection released (available: {self.available.qsize()})")
-                except:
-                    # Queue full, close connection
-                    conn.connection.close()
-                    logger.debug("Connection closed (pool full)")
+                    returned = self._replace(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"Could not replace broken connection: {e}")
+                    returned = None
+            elif in_transaction:
+                with self.lock:
+                    self.total_rollbacks += 1
+        
+        with self.lock:
+            closed = conn not in self._in_transit
+            self._in_transit.discard(conn)
+            if returned is not None and not closed:
+                self._check_in(returned)
+        
+        if closed and returned is not None and returned is not conn:
+            # close_all ran mid-release; do not leak the replacement
+            self._close_connection(returned)
+    
+    def _in_transaction(self, conn):
+        """Whether a connection has an open transaction (False if unusable)"""
+        try:
+            return conn.connection.in_transaction
+        except sqlite3.Error:
+            return False
+    
+    def check_idle(self):
+        """
+        Health check every idle connection, replacing broken or expired ones
+        
+        Connections are taken out of the pool one at a time while checked,
+        so no caller can borrow one mid-check and the rest stay available.
+        Expired ones are swapped for a connection opened beforehand.
+        
+        Returns:
+            Number of connections replaced
+        """
+        replaced = 0
+        for conn in self.idle_connections():
+            if conn.is_expired(self.max_age):
+                try:
+                    if self.refresh_connection(conn):
+                        replaced += 1
+                except sqlite3.Error as e:
+                    logger.error(f"Could not replace expired connection: {e}")
+                continue
+            
+            try:
+                if self.check_idle_connection(conn):
+                    replaced += 1
+            except sqlite3.Error as e:
+                replaced += 1
+                logger.error(f"Could not replace broken connection: {e}")
+        
+        return replaced
+    
+    def check_idle_connection(self, conn):
+        """
+        Health check one idle connection, replacing it if broken
+        
+        The connection is out of the pool while checked; broken ones count
+        as sweep health failures.
+        
+        Args:
+            conn: Idle PooledConnection (from idle_connections)
+            
+        Returns:
+            True if the connection was replaced, False if healthy or
+            borrowed meanwhile (it is checked on return)
+            
+        Raises:
+            sqlite3.Error: If the replacement could not connect (its slot is freed)
+        """
+        if not self.take_idle([conn]):
+            return False
+        if conn.is_healthy():
+            self.return_idle([conn])
+            return False
+        
+        self._record_health_failure('sweep')
+        self.return_idle([self._replace(conn)])
+        return True
+    
+    def idle_connections(self):
+        """
+        Snapshot of the idle connections, least recently used first
+        
+        The connections stay in the pool; take them with take_idle before
+        using them.
+        
+        Returns:
+            List of PooledConnection
+        """
+        with self.lock:
+            return list(self.available)
+    
+    def take_idle(self, connections=None):
+        """
+        Check idle connections out of the pool for maintenance
+        
+        Args:
+            connections: Idle connections to take (None for all); ones
+                borrowed meanwhile are skipped
+                
+        Returns:
+            List of PooledConnection (hand back with return_idle)
+        """
+        with self.lock:
+            if connections is None:
+                idle = list(self.available)
+                self.available.clear()
+                self._idle_by_hint.clear()
+                self._idle_unhinted.clear()
+                return idle
+            
+            idle = [conn for conn in connections if conn in self.available]
+            for conn in idle:
+                del self.available[conn]
+                if self.affinity:
+                    self._unindex(conn)
+        return idle
+    
+    def return_idle(self, connections):
+        """
+        Put connections taken with take_idle back, serving waiters first
+        
+        Their last_used time is kept, so maintenance does not reset idle time.
+        
+        Args:
+            connections: PooledConnections to make idle again
+        """
+        with self.lock:
+            for conn in connections:
+                self._check_in(conn, touch=False)
+    
+    def discard_connection(self, conn):
+        """
+        Close a connection taken with take_idle and free its slot
+        
+        Args:
+            conn: PooledConnection to close
+        """
+        try:
+            self._close_connection(conn)
+        except sqlite3.Error:
+            pass
+        with self.lock:
+            self._release_slot()
+    
+    def refresh_connection(self, conn):
+        """
+        Swap an idle connection for a new one opened before it leaves the pool
+        
+        Callers keep finding the old connection idle while the new one
+        connects.
+        
+        Args:
+            conn: Idle PooledConnection to retire
+            
+        Returns:
+            True if swapped, False if the connection was borrowed meanwhile
+        """
+        replacement = self._create_connection()
+        
+        with self.lock:
+            swapped = conn in self.available
+            if swapped:
+                del self.available[conn]
+                if self.affinity:
+                    self._unindex(conn)
+                self._check_in(replacement)
+        
+        try:
+            self._close_connection(conn if swapped else replacement)
+        except sqlite3.Error:
+            pass
+        return swapped
+    
+    def add_connection(self):
+        """
+        Open one more idle connection if below max_connections
+        
+        Returns:
+            True if a connection was added
+        """
+        with self.lock:
+            if self.total_connections >= self.max_connections:
+                return False
+            self.total_connections += 1
+        
+        conn = self._open_reserved()
+        with self.lock:
+            self._check_in(conn)
+        return True
+    
+    def _health_loop(self):
+        """Background idle sweep"""
+        while not self._stop.wait(self.health_check_interval):
+            try:
+                self.check_idle()
+            except Exception as e:
+                logger.error(f"Idle connection sweep failed: {e}")
     
     def close_all(self):
         """Close all connections in pool"""
+        self._stop.set()
+        if self._health_thread is not None and self._health_thread is not current_thread():
+            self._health_thread.join()
+            self._health_thread = None
+        
         with self.lock:
             # Close in-use connections
             for conn in self.in_use:
-                conn.connection.close()
+                self._close_connection(conn)
             self.in_use.clear()
             
+            # Close connections being checked out or released
+            for conn in self._in_transit:
+                self._close_connection(conn)
+            self._in_transit.clear()
+            
             # Close available connections
-            while not self.available.empty():
-                try:
-                    conn = self.available.get_nowait()
-                    conn.connection.close()
-                except Empty:
-                    break
+            while self.available:
+                self._close_connection(self.available.popitem()[0])
+            self._idle_by_hint.clear()
+            self._idle_unhinted.clear()
+            
+            self.total_connections = 0
         
         logger.info("All connections closed")
     
     def get_stats(self):
         """Get pool statistics"""
         with self.lock:
-            return {
+            stats = {
                 'total_created': self.total_created,
                 'total_requests': self.total_requests,
                 'cache_hits': self.total_hits,
                 'cache_misses': self.total_misses,
                 'hit_rate': f"{(self.total_hits / self.total_requests * 100) if self.total_requests > 0 else 0:.2f}%",
-                'available': self.available.qsize(),
+                'available': len(self.available),
                 'in_use': len(self.in_use),
-                'total_connections': self.available.qsize() + len(self.in_use)
+                'waiting': len(self.waiters),
+                'timeouts': self.total_timeouts,
+                'rollbacks_on_return': self.total_rollbacks,
+                'health_failures': dict(self.health_failures),
+                'total_connections': self.total_connections,
+                'profile': self.profile_name,
+                'affinity': self.affinity,
+                'affinity_hits': self.affinity_hits,
+                'affinity_misses': self.affinity_misses
             }
+        stats.update(self.stats.get_wait_stats())
+        stats['statement_cache'] = self.get_statement_stats(top=5, per_connection=False)
+        return stats
+    
+    def get_statement_stats(self, top=10, per_connection=True):
+        """
+        Get prepared-statement cache statistics across open connections
+        
+        Args:
+            top: Number of most executed statements to list
+            per_connection: Include each connection's own statistics
+            
+        Returns:
+            Dict with prepare counts, hit rate and top statements
+        """
+        with self.lock:
+            connections = list(self.available) + list(self.in_use)
+        
+        prepares = sum(conn.prepares for conn in connections)
+        hits = sum(conn.statement_hits for conn in connections)
+        merged = {}
+        for conn in connections:
+            for query, (count, prepared) in list(conn.statement_stats.items()):
+                totals = merged.setdefault(query, [0, 0])
+                totals[0] += count
+                totals[1] += prepared
+        ranked = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)
+        executions = prepares + hits
+        
+        stats = {
+            'cache_size': self.statement_cache_size,
+            'executions': executions,
+            'prepares': prepares,
+            'hits': hits,
+            'hit_rate': f"{(hits / executions * 100) if executions > 0 else 0:.2f}%",
+            'top_statements': [
+                {'query': query[:100], 'executions': count, 'prepares': prepared}
+                for query, (count, prepared) in ranked[:top]
+            ]
+        }
+        if per_connection:
+            stats['connections'] = [conn.get_statement_stats(top) for conn in connections]
+        return stats
@@ -0,0 +1,163 @@
+"""
+Pool Maintainer
+Background thread that keeps ConnectionPool connections fresh and warm
+"""
+
+import time
+import sqlite3
+import logging
+from threading import Thread, Event
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMaintainer:
+    """
+    Background maintenance for a ConnectionPool
+    
+    Each run walks the idle connections, least recently used first, and:
+    - closes ones idle longer than idle_timeout, down to min_connections
+    - replaces ones within refresh_before seconds of max_age, opening the
+      new connection before the old one leaves the pool
+    - health checks the rest one at a time with the pool's own sweep
+      check, replacing broken ones (so a maintained pool does not need
+      health_check_interval as well)
+    - opens connections until min_connections are open
+    
+    Only the connection being acted on is out of the pool, so requests
+    keep finding idle connections during a run.
+    
+    Opening and closing connections happens here, so requests only pay
+    for a connect when the pool has to grow under load.
+    """
+    
+    def __init__(self, pool, interval=5, idle_timeout=60, refresh_before=30):
+        """
+        Initialize pool maintainer
+        
+        Args:
+            pool: ConnectionPool to maintain
+            interval: Seconds between maintenance runs
+            idle_timeout: Seconds idle before a connection above min_connections is closed
+            refresh_before: Replace connections this many seconds before max_age
+        """
+        self.pool = pool
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.refresh_before = refresh_before
+        
+        self._stop = Event()
+        self._thread = None
+        
+        self.runs = 0
+        self.reaped = 0
+        self.refreshed = 0
+        self.replaced = 0
+        self.created = 0
+        self.errors = 0
+        self.last_run_time = 0
+        
+        logger.info(f"Pool Maintainer initialized (interval={interval}s, idle_timeout={idle_timeout}s)")
+    
+    def run_once(self):
+        """
+        Run one maintenance pass
+        
+        Returns:
+            Dict with reaped, refreshed, replaced and created counts
+        """
+        start_time = time.time()
+        pool = self.pool
+        counts = {'reaped': 0, 'refreshed': 0, 'replaced': 0, 'created': 0}
+        
+        # Least recently used first, so the busiest connections are kept
+        for conn in sorted(pool.idle_connections(), key=lambda conn: conn.last_used):
+            action = self._action(conn, start_time, surplus=pool.total_connections - pool.min_connections)
+            try:
+                if action == 'reap':
+                    if pool.take_idle([conn]):
+                        pool.discard_connection(conn)
+                        counts['reaped'] += 1
+                elif action == 'refresh':
+                    if pool.refresh_connection(conn):
+                        counts['refreshed'] += 1
+                elif pool.check_idle_connection(conn):
+                    counts['replaced'] += 1
+            except sqlite3.Error as e:
+                # Keep the old connection; the pool replaces it on borrow
+                self.errors += 1
+                logger.error(f"Could not replace pooled connection: {e}")
+        
+        while pool.total_connections < pool.min_connections:
+            try:
+                if not pool.add_connection():
+                    break
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.error(f"Could not refill connection pool: {e}")
+                break
+            counts['created'] += 1
+        
+        self.runs += 1
+        self.reaped += counts['reaped']
+        self.refreshed += counts['refreshed']
+        self.replaced += counts['replaced']
+        self.created += counts['created']
+        self.last_run_time = time.time() - start_time
+        
+        if any(counts.values()):
+            logger.debug(f"Pool maintenance: {counts}")
+        return counts
+    
+    def _action(self, conn, now, surplus):
+        """
+        Decide what to do with an idle connection from its timestamps
+        
+        Returns:
+            'reap', 'refresh' or None to health check it
+        """
+        if now - conn.last_used > self.idle_timeout and surplus > 0:
+            return 'reap'
+        if now - conn.created_at > self.pool.max_age - self.refresh_before:
+            return 'refresh'
+        return None
+    
+    def start(self):
+        """Start maintenance in a background thread"""
+        if self._thread is not None:
+            return
+        
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name='pool-maintainer', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        """Maintenance loop"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Pool maintenance failed: {e}")
+    
+    def stop(self):
+        """Stop background maintenance"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def get_stats(self):
+        """Get maintainer statistics"""
+        return {
+            'interval_seconds': self.interval,
+            'idle_timeout_seconds': self.idle_timeout,
+            'runs': self.runs,
+            'reaped': self.reaped,
+            'refreshed': self.refreshed,
+            'replaced': self.replaced,
+            'created': self.created,
+            'errors': self.errors,
+            'last_run_time': f"{self.last_run_time:.4f}s",
+            'running': self._thread is not None
+        }
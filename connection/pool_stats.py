@@ -5,9 +5,13 @@ Tracks and reports connection pool statistics
 
 import time
 import logging
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Acquire latencies kept for percentiles
+WAIT_SAMPLES = 1024
+
 
 class PoolStats:
     """
@@ -21,6 +25,8 @@ class PoolStats:
         self.total_requests = 0
         self.total_waits = 0
         self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.acquire_times = deque(maxlen=WAIT_SAMPLES)
         
         logger.info("Pool Stats initialized")
     
@@ -40,6 +46,30 @@ class PoolStats:
         """Record a wait for connection"""
         self.total_waits += 1
         self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+    
+    def record_acquire(self, acquire_time):
+        """Record how long an acquire took, waiting or not"""
+        self.acquire_times.append(acquire_time)
+    
+    def _percentile(self, samples, fraction):
+        """Value at a fraction of sorted samples"""
+        if not samples:
+            return 0.0
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+    
+    def get_wait_stats(self):
+        """Get acquire latency statistics"""
+        samples = sorted(self.acquire_times)
+        
+        return {
+            'total_waits': self.total_waits,
+            'avg_wait_time': f"{(self.total_wait_time / self.total_waits) if self.total_waits > 0 else 0:.4f}s",
+            'max_wait_time': f"{self.max_wait_time:.4f}s",
+            'acquire_p50': f"{self._percentile(samples, 0.50):.4f}s",
+            'acquire_p95': f"{self._percentile(samples, 0.95):.4f}s",
+            'acquire_p99': f"{self._percentile(samples, 0.99):.4f}s"
+        }
     
     def get_stats(self):
         """Get all statistics"""
@@ -51,8 +81,7 @@ class PoolStats:
             'total_connections_closed': self.total_connections_closed,
             'active_connections': self.total_connections_created - self.total_connections_closed,
             'total_requests': self.total_requests,
-            'total_waits': self.total_waits,
-            'avg_wait_time': f"{(self.total_wait_time / self.total_waits) if self.total_waits > 0 else 0:.4f}s",
+            **self.get_wait_stats(),
             'requests_per_second': self.total_requests / uptime if uptime > 0 else 0
         }
     
@@ -64,4 +93,45 @@ class PoolStats:
         self.total_requests = 0
         self.total_waits = 0
         self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.acquire_times.clear()
         logger.info("Pool stats reset")
+
+
+class LatencyStats:
+    """
+    Latency samples for one kind of operation
+    
+    Keeps totals plus the most recent samples for percentiles.
+    """
+    
+    def __init__(self, max_samples=WAIT_SAMPLES):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = deque(maxlen=max_samples)
+    
+    def record(self, elapsed):
+        """Record one operation's latency in seconds"""
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.samples.append(elapsed)
+    
+    def get_stats(self):
+        """Get latency statistics"""
+        samples = sorted(self.samples)
+        
+        def percentile(fraction):
+            if not samples:
+                return 0.0
+            return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+        
+        return {
+            'count': self.count,
+            'avg': f"{(self.total_time / self.count) if self.count > 0 else 0:.4f}s",
+            'p50': f"{percentile(0.50):.4f}s",
+            'p95': f"{percentile(0.95):.4f}s",
+            'p99': f"{percentile(0.99):.4f}s",
+            'max': f"{self.max_time:.4f}s"
+        }
@@ -0,0 +1,291 @@
+"""
+Read/Write Split Pool
+Read-only reader connections plus one writer thread that group-commits
+"""
+
+import time
+import sqlite3
+import logging
+from collections import namedtuple
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+from connection.connection_pool import ConnectionPool
+from connection.pool_stats import LatencyStats
+from connection.tuning import apply_profile
+
+logger = logging.getLogger(__name__)
+
+# Outcome of a write: rows changed and the last inserted rowid
+WriteResult = namedtuple('WriteResult', ['rowcount', 'lastrowid'])
+
+
+class _WriteRequest:
+    """
+    Statements queued for the writer thread
+    
+    All statements of one request commit or roll back together.
+    """
+    
+    __slots__ = ('statements', 'future', 'submitted_at')
+    
+    def __init__(self, statements):
+        self.statements = statements
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+class ReadWritePool:
+    """
+    Connection pool split by access mode
+    
+    SQLite allows one writer at a time, so writes from many connections
+    collide with 'database is locked' errors while readers wait behind
+    them. Here reads use a pool of read-only connections (mode=ro URI and
+    query_only), and writes are queued to a single writer connection. The
+    writer thread runs every write queued within batch_window in one
+    transaction (a group commit), each in its own savepoint so a failing
+    write does not undo the others.
+    """
+    
+    def __init__(self, database_path, min_readers=2, max_readers=10, timeout=30,
+                 max_batch=100, batch_window=0.002, reader_profile='read_heavy',
+                 writer_profile='write_heavy'):
+        """
+        Initialize read/write pool
+        
+        Args:
+            database_path: Path to SQLite database
+            min_readers: Minimum reader connections
+            max_readers: Maximum reader connections
+            timeout: Timeout for getting a reader connection
+            max_batch: Maximum writes per commit
+            batch_window: Seconds the writer waits for more writes after the first
+            reader_profile: Tuning profile for reader connections
+            writer_profile: Tuning profile for the writer (must enable WAL,
+                so readers do not block on the writer)
+                
+        Raises:
+            ValueError: If the writer profile does not leave the database in WAL mode
+        """
+        self.database_path = database_path
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        
+        # The writer sets the journal mode before read-only connections open
+        self.writer = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        apply_profile(self.writer, writer_profile)
+        journal_mode = self.writer.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() != 'wal':
+            self.writer.close()
+            raise ValueError(f"Writer profile {writer_profile!r} leaves journal_mode={journal_mode}; "
+                             f"the read/write split needs journal_mode=WAL")
+        
+        self.readers = ConnectionPool(database_path, min_connections=min_readers,
+                                      max_connections=max_readers, timeout=timeout,
+                                      profile=reader_profile, read_only=True)
+        
+        self.write_queue = Queue()
+        self.lock = Lock()
+        self.closed = False
+        
+        self.read_latency = LatencyStats()
+        self.write_latency = LatencyStats()
+        self.batches = 0
+        self.writes = 0
+        self.write_errors = 0
+        
+        self._writer_thread = Thread(target=self._writer_loop, name='pool-writer', daemon=True)
+        self._writer_thread.start()
+        
+        logger.info(f"Read/Write Pool initialized: readers={min_readers}-{max_readers}, "
+                    f"max_batch={max_batch}")
+    
+    def get_read_connection(self, timeout=None):
+        """
+        Get a read-only connection
+        
+        Returns:
+            PooledConnection (release with release_read_connection)
+        """
+        return self.readers.get_connection(timeout)
+    
+    def release_read_connection(self, conn):
+        """Return a read-only connection"""
+        self.readers.release_connection(conn)
+    
+    def execute_read(self, query, params=None):
+        """
+        Run a read query on a reader connection
+        
+        Args:
+            query: SQL query
+            params: Query parameters
+            
+        Returns:
+            List of rows
+        """
+        start_time = time.perf_counter()
+        conn = self.readers.get_connection()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            self.readers.release_connection(conn)
+            with self.lock:
+                self.read_latency.record(time.perf_counter() - start_time)
+    
+    def submit_write(self, query, params=None):
+        """
+        Queue a write for the writer thread
+        
+        Args:
+            query: SQL statement
+            params: Statement parameters
+            
+        Returns:
+            Future resolving to a WriteResult
+        """
+        return self.submit_transaction([(query, params)])
+    
+    def submit_transaction(self, statements):
+        """
+        Queue statements that commit or roll back together
+        
+        Args:
+            statements: List of (query, params) tuples
+            
+        Returns:
+            Future resolving to the WriteResult of the last statement
+            
+        Raises:
+            RuntimeError: If the pool is closed
+        """
+        request = _WriteRequest(list(statements))
+        
+        # Under the lock, so no request is queued behind close()'s sentinel
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Read/write pool is closed")
+            self.write_queue.put(request)
+        return request.future
+    
+    def execute_write(self, query, params=None, timeout=None):
+        """
+        Run a write and wait for its group commit
+        
+        Args:
+            query: SQL statement
+            params: Statement parameters
+            timeout: Seconds to wait for the commit (None to wait forever)
+            
+        Returns:
+            WriteResult
+        """
+        return self.submit_write(query, params).result(timeout)
+    
+    def _writer_loop(self):
+        """Collect queued writes into batches and commit each batch once"""
+        stopping = False
+        while not stopping:
+            request = self.write_queue.get()
+            if request is None:
+                break
+            
+            batch = [request]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    request = self.write_queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            
+            self._commit_batch(batch)
+    
+    def _commit_batch(self, batch):
+        """
+        Run a batch of writes in one transaction
+        
+        Args:
+            batch: List of _WriteRequest
+        """
+        # Requests cancelled while queued are dropped; the rest can no
+        # longer be cancelled
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        conn = self.writer
+        outcomes = []
+        
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                conn.execute("SAVEPOINT write_request")
+                try:
+                    result = None
+                    for query, params in request.statements:
+                        cursor = conn.execute(query, params or ())
+                        result = WriteResult(cursor.rowcount, cursor.lastrowid)
+                    outcomes.append((request, result, None))
+                except Exception as e:
+                    # Bad SQL or unbindable parameters fail only this request
+                    conn.execute("ROLLBACK TO write_request")
+                    outcomes.append((request, None, e))
+                conn.execute("RELEASE write_request")
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The transaction itself failed, so no write in the batch landed
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error as rollback_error:
+                logger.error(f"Rollback of failed group commit failed: {rollback_error}")
+            outcomes = [(request, None, e) for request in batch]
+        
+        now = time.perf_counter()
+        for request, result, error in outcomes:
+            self.write_latency.record(now - request.submitted_at)
+            if error is not None:
+                self.write_errors += 1
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+        
+        self.batches += 1
+        self.writes += len(batch)
+        logger.debug(f"Group commit: {len(batch)} writes")
+    
+    def close(self):
+        """Commit queued writes, then close the writer and all readers"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.write_queue.put(None)
+        
+        self._writer_thread.join()
+        self.writer.close()
+        self.readers.close_all()
+        logger.info("Read/Write Pool closed")
+    
+    def get_stats(self):
+        """Get read/write pool statistics"""
+        with self.lock:
+            read_latency = self.read_latency.get_stats()
+        
+        return {
+            'readers': self.readers.get_stats(),
+            'writes': self.writes,
+            'write_errors': self.write_errors,
+            'batches': self.batches,
+            'avg_batch_size': f"{(self.writes / self.batches) if self.batches > 0 else 0:.2f}",
+            'write_queue_depth': self.write_queue.qsize(),
+            'read_latency': read_latency,
+            'write_latency': self.write_latency.get_stats()
+        }
@@ -0,0 +1,86 @@
+"""
+Connection Tuning
+Named SQLite PRAGMA profiles applied to every new pooled connection
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA settings per workload, applied in order. cache_size is negative
+# KiB, mmap_size and busy_timeout are bytes and milliseconds. busy_timeout
+# comes first so switching journal_mode waits out other connections;
+# journal_mode=WAL lets readers run alongside the writer and persists in
+# the database file.
+PROFILES = {
+    'default': {},
+    'read_heavy': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    },
+    'write_heavy': {
+        'busy_timeout': 10000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000
+    },
+    'bulk_load': {
+        'busy_timeout': 30000,
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -256000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 0
+    }
+}
+
+
+def resolve_profile(profile):
+    """
+    Look up a tuning profile
+    
+    Args:
+        profile: Profile name, dict of PRAGMA settings, or None
+        
+    Returns:
+        Dict of PRAGMA settings
+        
+    Raises:
+        ValueError: If the profile name is unknown
+    """
+    if profile is None:
+        return {}
+    if isinstance(profile, dict):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown tuning profile: {profile} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[profile]
+
+
+def apply_profile(connection, profile):
+    """
+    Apply a tuning profile to a connection
+    
+    Args:
+        connection: sqlite3 connection
+        profile: Profile name, dict of PRAGMA settings, or None
+        
+    Returns:
+        Dict of the values SQLite reports after applying
+    """
+    applied = {}
+    for name, value in resolve_profile(profile).items():
+        row = connection.execute(f"PRAGMA {name} = {value}").fetchone()
+        applied[name] = row[0] if row else value
+    
+    if applied:
+        logger.debug(f"Tuning applied: {applied}")
+    return applied
@@ -7,9 +7,25 @@ import unittest
 import time
 import os
 import sqlite3
-from connection.connection_pool import ConnectionPool
+import threading
+import json
+import multiprocessing
+import asyncio
+from connection.connection_pool import ConnectionPool, PooledConnection
+from connection.pool_maintainer import PoolMaintainer
+from connection.split_pool import ReadWritePool
+from connection.async_pool import AsyncConnectionPool
 from query.query_analyzer import QueryAnalyzer
 from caching.query_cache import QueryCache
+from caching.cache_manager import CacheManager, CacheStrategy
+from caching.table_dependencies import capture_read_tables
+from caching.columnar import ColumnarResult
+from caching.response_cache import ResponseCache
+from caching.sharded_cache import ShardedQueryCache
+from caching.shared_cache import SharedMemoryCache, default_path
+from caching.disk_cache import DiskCache, schema_fingerprint
+from caching.cache_warmer import CacheWarmer
+from caching.validation import DataVersionValidator, TableVersionValidator
 from indexing.index_analyzer import IndexAnalyzer
 from examples.database_setup import create_sample_database, populate_sample_data
 
@@ -281,6 +297,1442 @@ class DatabaseOptimizationTestCase(unittest.TestCase):
         result = cache.get(query)
         self.assertIsNone(result)
         print("   [EMOJI] Cache expired after TTL")
+    
+    # Test 11: Cache Eviction Policies
+    def test_11_cache_eviction_policies(self):
+        """Test LRU, LFU and FIFO eviction"""
+        print("\n11. Testing cache eviction policies...")
+        
+        victims = {}
+        for policy in ('lru', 'lfu', 'fifo'):
+            cache = QueryCache(ttl=60, max_size=3, policy=policy)
+            
+            for i in range(3):
+                cache.set(f"SELECT {i}", None, [i])
+            
+            # Touch the oldest entry twice and the second one once
+            cache.get("SELECT 0")
+            cache.get("SELECT 0")
+            cache.get("SELECT 1")
+            
+            # Inserting a fourth entry forces one eviction
+            cache.set("SELECT 3", None, [3])
+            
+            evicted = [i for i in range(3) if cache.get(f"SELECT {i}") is None]
+            victims[policy] = evicted
+            
+            stats = cache.get_stats()
+            self.assertEqual(stats['evictions'], 1)
+            self.assertEqual(stats['cache_size'], 3)
+            self.assertEqual(stats['eviction_policy'], policy)
+            print(f"   [EMOJI] {policy.upper()} evicted entry {evicted}")
+        
+        self.assertEqual(victims['lru'], [2])
+        self.assertEqual(victims['lfu'], [2])
+        self.assertEqual(victims['fifo'], [0])
+        
+        with self.assertRaises(ValueError):
+            QueryCache(policy='random')
+        
+        # Hit rates are compared per policy across a manager's caches
+        manager = CacheManager()
+        for policy in ('lru', 'lfu', 'fifo'):
+            cache = manager.create_cache(policy, ttl=60, max_size=3, policy=policy)
+            for i in (0, 1, 2, 0, 3, 0, 1):
+                if cache.get(f"SELECT {i}") is None:
+                    cache.set(f"SELECT {i}", None, [i])
+        policy_stats = manager.get_policy_stats()
+        self.assertEqual(sorted(policy_stats), ['fifo', 'lfu', 'lru'])
+        self.assertEqual(policy_stats['lru']['hits'] + policy_stats['lru']['misses'], 7)
+        self.assertGreater(policy_stats['lru']['hits'], policy_stats['fifo']['hits'])
+        print("   [EMOJI] Hit rate per policy: " +
+              ', '.join(f"{policy} {stats['hit_rate']}" for policy, stats in sorted(policy_stats.items())))
+    
+    # Test 12: Table-Aware Cache Invalidation
+    def test_12_table_aware_invalidation(self):
+        """Test invalidation drops only entries reading the written table"""
+        print("\n12. Testing table-aware cache invalidation...")
+        
+        cache = QueryCache(ttl=60)
+        
+        users_query = "SELECT id, username FROM users WHERE city = ?"
+        orders_query = "SELECT id, product FROM orders WHERE user_id = ?"
+        join_query = "SELECT users.id FROM users JOIN orders ON users.id = orders.user_id"
+        
+        cache.set(users_query, ('Chicago',), [1])
+        cache.set(orders_query, (1,), [2])
+        cache.set(join_query, None, [3])
+        
+        # A write to orders keeps the users-only entry
+        removed = CacheStrategy.invalidate_on_write(cache, 'orders')
+        self.assertEqual(removed, 2)
+        self.assertIsNotNone(cache.get(users_query, ('Chicago',)))
+        self.assertIsNone(cache.get(orders_query, (1,)))
+        self.assertIsNone(cache.get(join_query))
+        print(f"   [EMOJI] Write to orders invalidated {removed} entries")
+        
+        # Pattern matching runs against the normalized query text
+        cache.set(orders_query, (1,), [2])
+        removed = CacheStrategy.invalidate_pattern(cache, '*from users*')
+        self.assertEqual(removed, 1)
+        self.assertIsNotNone(cache.get(orders_query, (1,)))
+        print(f"   [EMOJI] Pattern invalidated {removed} entry")
+        
+        # The authorizer reports tables without running the query
+        tables = capture_read_tables(self.conn, join_query)
+        self.assertEqual(tables, {'users', 'orders'})
+        print(f"   [EMOJI] Authorizer tables: {sorted(tables)}")
+    
+    # Test 13: Fast Cache Keys
+    def test_13_fast_cache_keys(self):
+        """Test interned statement keys match the MD5 key semantics"""
+        print("\n13. Testing fast cache keys...")
+        
+        for fast_keys in (True, False):
+            cache = QueryCache(ttl=60, fast_keys=fast_keys)
+            
+            cache.set("SELECT * FROM users WHERE id = ?", [1], ['user1'])
+            cache.set("SELECT * FROM users", None, ['all'])
+            
+            # Whitespace/case normalization and list vs tuple params share a key
+            self.assertEqual(cache.get("  select * from users where id = ?", (1,)), ['user1'])
+            self.assertEqual(cache.get("SELECT * FROM users", []), ['all'])
+            self.assertIsNone(cache.get("SELECT * FROM users WHERE id = ?", (2,)))
+            
+            # Unhashable params fall back to the hashed key
+            cache.set("SELECT * FROM users WHERE id IN (?)", [[1, 2]], ['nested'])
+            self.assertEqual(cache.get("SELECT * FROM users WHERE id IN (?)", [[1, 2]]), ['nested'])
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['key_mode'], 'md5')
+        print("   [EMOJI] Fast and MD5 keys agree")
+    
+    # Test 14: Request Coalescing
+    def test_14_request_coalescing(self):
+        """Test concurrent misses run the loader only once"""
+        print("\n14. Testing request coalescing...")
+        
+        cache = QueryCache(ttl=60)
+        query = "SELECT id, username FROM users WHERE city = ?"
+        calls = []
+        results = []
+        
+        def loader():
+            calls.append(1)
+            time.sleep(0.2)
+            return [('user1',)]
+        
+        def worker():
+            results.append(cache.get_or_compute(query, ('Chicago',), loader))
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[('user1',)]] * 8)
+        self.assertEqual(cache.get_stats()['coalesced'], 7)
+        print(f"   [EMOJI] 8 concurrent misses ran the loader {len(calls)} time")
+        
+        # Loader errors propagate to the caller and nothing is cached
+        def failing_loader():
+            raise sqlite3.OperationalError("database is locked")
+        
+        with self.assertRaises(sqlite3.OperationalError):
+            cache.get_or_compute(query, ('Houston',), failing_loader)
+        self.assertIsNone(cache.get(query, ('Houston',)))
+        print("   [EMOJI] Loader error propagated")
+    
+    # Test 15: Stale-While-Revalidate
+    def test_15_stale_while_revalidate(self):
+        """Test stale entries are served while refreshed in the background"""
+        print("\n15. Testing stale-while-revalidate...")
+        
+        cache = QueryCache(ttl=0.2, stale_ttl=5)
+        query = "SELECT COUNT(*) FROM orders"
+        version = [0]
+        
+        def loader():
+            version[0] += 1
+            return [version[0]]
+        
+        self.assertEqual(cache.get_or_compute(query, None, loader), [1])
+        
+        # Past the TTL the stale value comes back immediately...
+        time.sleep(0.3)
+        self.assertEqual(cache.get(query), [1])
+        print("   [EMOJI] Stale value served")
+        
+        # ...while the background worker reloads it
+        for _ in range(50):
+            if cache.get_stats()['refreshes']:
+                break
+            time.sleep(0.02)
+        self.assertEqual(cache.get(query), [2])
+        self.assertEqual(cache.get_stats()['stale_hits'], 1)
+        print("   [EMOJI] Entry refreshed in background")
+        
+        # Hot keys refresh before they expire
+        hot_cache = QueryCache(ttl=0.4, refresh_ahead_rate=20, refresh_ahead_fraction=0.5)
+        hot_cache.get_or_compute(query, None, loader)
+        deadline = time.time() + 0.35
+        while time.time() < deadline:
+            hot_cache.get(query)
+            time.sleep(0.005)
+        
+        self.assertGreaterEqual(hot_cache.get_stats()['refresh_ahead'], 1)
+        print("   [EMOJI] Hot entry refreshed ahead of expiry")
+        
+        cache.close()
+        hot_cache.close()
+    
+    # Test 16: Memory-Bounded Cache
+    def test_16_memory_bounded_cache(self):
+        """Test max_bytes limits the estimated size of cached results"""
+        print("\n16. Testing memory-bounded cache...")
+        
+        rows = self.conn.execute("SELECT * FROM orders LIMIT 100").fetchall()
+        
+        unbounded = QueryCache(ttl=60)
+        unbounded.set("SELECT * FROM orders LIMIT 100", None, rows)
+        entry_size = unbounded.get_stats()['bytes_used']
+        self.assertGreater(entry_size, 0)
+        
+        # Room for two copies of the result, not three
+        cache = QueryCache(ttl=60, max_bytes=int(entry_size * 2.5))
+        for i in range(3):
+            cache.set(f"SELECT * FROM orders LIMIT 100 -- {i}", None, list(rows))
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['cache_size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['bytes_used'], stats['max_bytes'])
+        self.assertEqual(sum(stats['size_histogram'].values()), 2)
+        self.assertEqual(len(stats['largest_entries']), 2)
+        print(f"   [EMOJI] Bytes used: {stats['memory_used']} of {stats['max_bytes']} bytes")
+        
+        # Results larger than the whole budget are never cached
+        all_rows = self.conn.execute("SELECT * FROM orders").fetchall()
+        cache.set("SELECT * FROM orders", None, all_rows)
+        self.assertIsNone(cache.get("SELECT * FROM orders"))
+        self.assertEqual(cache.get_stats()['oversize_rejections'], 1)
+        print("   [EMOJI] Oversized result rejected")
+        
+        # Invalidation releases the accounted bytes
+        cache.invalidate()
+        self.assertEqual(cache.get_stats()['bytes_used'], 0)
+    
+    # Test 17: Columnar Result Storage
+    def test_17_columnar_storage(self):
+        """Test cached results stored as packed columns"""
+        print("\n17. Testing columnar result storage...")
+        
+        query = "SELECT id, user_id, product, quantity, price, status FROM orders"
+        rows = self.conn.execute(query).fetchall()
+        
+        row_cache = QueryCache(ttl=60)
+        columnar_cache = QueryCache(ttl=60, storage='columnar')
+        row_cache.set(query, None, rows)
+        columnar_cache.set(query, None, rows)
+        
+        cached = columnar_cache.get(query)
+        self.assertIsInstance(cached, ColumnarResult)
+        self.assertEqual(len(cached), len(rows))
+        
+        # Rows iterate as dicts and encode to the same JSON
+        expected = [dict(row) for row in rows]
+        self.assertEqual(list(cached), expected)
+        self.assertEqual(json.loads(cached.to_json()), expected)
+        print(f"   [EMOJI] {len(cached)} rows round-trip through columns")
+        
+        row_bytes = row_cache.get_stats()['bytes_used']
+        columnar_bytes = columnar_cache.get_stats()['bytes_used']
+        self.assertLess(columnar_bytes, row_bytes)
+        print(f"   [EMOJI] Estimated size: {row_bytes} -> {columnar_bytes} bytes")
+    
+    # Test 18: Response Cache
+    def test_18_response_cache(self):
+        """Test encoded responses follow query cache invalidation"""
+        print("\n18. Testing response cache...")
+        
+        cache = QueryCache(ttl=60)
+        responses = ResponseCache(ttl=60)
+        responses.attach(cache)
+        
+        users_body = json.dumps({'users': [{'id': 1}]})
+        stored = responses.set('/api/users', {'city': 'Chicago'}, users_body, ('users',))
+        responses.set('/api/orders', {'user_id': '1'}, '{"orders": []}', ('orders',))
+        
+        cached = responses.get('/api/users', {'city': 'Chicago'})
+        self.assertEqual(cached.body, users_body.encode())
+        self.assertEqual(cached.etag, stored.etag)
+        self.assertIsNone(responses.get('/api/users', {'city': 'Houston'}))
+        print(f"   [EMOJI] Response served with ETag {cached.etag[:8]}...")
+        
+        # A write to orders evicts only the orders response
+        cache.invalidate_tables('orders')
+        self.assertIsNotNone(responses.get('/api/users', {'city': 'Chicago'}))
+        self.assertIsNone(responses.get('/api/orders', {'user_id': '1'}))
+        print("   [EMOJI] Table invalidation reached the response cache")
+        
+        # Clearing the query cache clears every response
+        cache.clear()
+        self.assertIsNone(responses.get('/api/users', {'city': 'Chicago'}))
+        self.assertEqual(responses.get_stats()['cache_size'], 0)
+        print("   [EMOJI] Cache clear reached the response cache")
+        
+        # Responses live only as long as the query-cache entry they were built from
+        cache = QueryCache(ttl=60, negative_ttl=0.1)
+        query = "SELECT id FROM orders WHERE user_id = ?"
+        cache.set(query, (999,), [])
+        ttl = cache.ttl_remaining(query, (999,))
+        self.assertLessEqual(ttl, 0.1)
+        self.assertIsNone(cache.ttl_remaining(query, (998,)))
+        responses.set('/api/orders', {'user_id': '999'}, '{"orders": []}', ('orders',), ttl=ttl)
+        self.assertIsNotNone(responses.get('/api/orders', {'user_id': '999'}))
+        time.sleep(0.15)
+        self.assertIsNone(responses.get('/api/orders', {'user_id': '999'}))
+        
+        # A TTL of 0 builds the response without storing it
+        unstored = responses.set('/api/orders', {'user_id': '998'}, '{"orders": []}', ('orders',), ttl=0)
+        self.assertIsNotNone(unstored.etag)
+        self.assertIsNone(responses.get('/api/orders', {'user_id': '998'}))
+        print("   [EMOJI] Empty-result responses expire with the negative TTL")
+    
+    # Test 19: Sharded Cache
+    def test_19_sharded_cache(self):
+        """Test lock-striped cache under concurrent access"""
+        print("\n19. Testing sharded cache...")
+        
+        cache = ShardedQueryCache(num_shards=8, ttl=60, max_size=400)
+        query = "SELECT id, username FROM users WHERE id = ?"
+        gets_per_thread = 500
+        
+        def worker(offset):
+            for i in range(gets_per_thread):
+                params = ((offset + i) % 200,)
+                if cache.get(query, params) is None:
+                    cache.set(query, params, [params])
+        
+        threads = [threading.Thread(target=worker, args=(n * 25,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['total_requests'], 8 * gets_per_thread)
+        self.assertEqual(stats['cache_size'], 200)
+        self.assertEqual(sum(stats['shard_sizes']), 200)
+        self.assertGreater(min(stats['shard_sizes']), 0)
+        self.assertEqual(cache.get(query, (7,)), [(7,)])
+        print(f"   [EMOJI] {stats['total_requests']} lookups over {stats['num_shards']} shards, hit rate {stats['hit_rate']}")
+        
+        # Size stats cover every shard, with the same keys as a single cache
+        self.assertEqual(sum(stats['size_histogram'].values()), 200)
+        self.assertEqual(len(stats['largest_entries']), 5)
+        self.assertTrue(stats['memory_used'].endswith('KB'))
+        self.assertTrue(set(QueryCache().get_stats()) <= set(stats))
+        print(f"   [EMOJI] Size stats merged across shards ({stats['memory_used']})")
+        
+        # Table invalidation reaches every shard
+        self.assertEqual(cache.invalidate_tables('users'), 200)
+        self.assertEqual(cache.get_stats()['cache_size'], 0)
+        print("   [EMOJI] Invalidation cleared all shards")
+    
+    # Test 20: Shared Memory Cache
+    def test_20_shared_memory_cache(self):
+        """Test cross-process cache tier and invalidation broadcast"""
+        print("\n20. Testing shared memory cache...")
+        
+        path = 'test_cache.shm'
+        shared = SharedMemoryCache(path, num_slots=64, slot_size=16 * 1024, ttl=60)
+        manager = CacheManager(shared)
+        local = manager.create_cache('queries', ttl=60, max_size=100)
+        query = "SELECT id, username FROM users WHERE city = ?"
+        
+        try:
+            def worker():
+                # Forked worker fills the shared tier and invalidates orders
+                shared.set(query, ('Chicago',), [(1, 'alice')])
+                shared.invalidate_tables('orders')
+            
+            process = multiprocessing.get_context('fork').Process(target=worker)
+            process.start()
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+            
+            # Local miss falls through to the shared tier, then fills the local tier
+            loads = []
+            result = manager.get_or_compute('queries', query, ('Chicago',), lambda: loads.append(1))
+            self.assertEqual(result, [(1, 'alice')])
+            self.assertEqual(loads, [])
+            self.assertEqual(local.get(query, ('Chicago',)), [(1, 'alice')])
+            print("   [EMOJI] Result written by another process served from shared tier")
+            
+            # Rows are stored in a picklable columnar form
+            rows = self.conn.execute("SELECT id, username FROM users LIMIT 5").fetchall()
+            self.assertTrue(shared.set("SELECT id, username FROM users LIMIT 5", None, rows))
+            shared_rows = shared.get("SELECT id, username FROM users LIMIT 5")
+            self.assertEqual([row['username'] for row in shared_rows], [row['username'] for row in rows])
+            
+            # Background refreshes rerun the query instead of copying the shared tier
+            refreshing = manager.create_cache('refreshing', ttl=0.05, max_size=10, stale_ttl=60)
+            product = "SELECT id, name FROM products WHERE id = ?"
+            version = ['v1']
+            manager.get_or_compute('refreshing', product, (1,), lambda: [(1, version[0])])
+            version[0] = 'v2'
+            time.sleep(0.1)
+            self.assertEqual(manager.get_or_compute('refreshing', product, (1,), self.fail), [(1, 'v1')])
+            deadline = time.time() + 2
+            while refreshing.refreshes == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(refreshing.get(product, (1,)), [(1, 'v2')])
+            self.assertEqual(shared.get(product, (1,)), [(1, 'v2')])
+            refreshing.close()
+            print("   [EMOJI] Stale entry refreshed from the loader and written through")
+            
+            # A second worker's invalidation reaches this process's local tier
+            other = SharedMemoryCache(path, num_slots=64, slot_size=16 * 1024)
+            self.assertEqual(other.invalidate_tables('users'), 2)
+            self.assertIsNone(shared.get(query, ('Chicago',)))
+            self.assertEqual(manager.sync_invalidations(), 1)
+            self.assertIsNone(local.get(query, ('Chicago',)))
+            other.close()
+            
+            stats = manager.get_shared_stats()
+            self.assertEqual(stats['broadcasts_received'], 2)
+            print(f"   [EMOJI] Invalidations broadcast to other workers ({stats['broadcasts_received']} received)")
+            
+            # Invalidating through the cache itself reaches the shared tier
+            manager.get_or_compute('queries', query, ('Houston',), lambda: [(2, 'bob')])
+            self.assertEqual(shared.get(query, ('Houston',)), [(2, 'bob')])
+            CacheStrategy.invalidate_on_write(local, 'users')
+            self.assertIsNone(shared.get(query, ('Houston',)))
+            
+            # Applying another worker's broadcast does not broadcast it again
+            other = SharedMemoryCache(path, num_slots=64, slot_size=16 * 1024)
+            other.invalidate_tables('orders')
+            other.close()
+            sequence = shared._sequence()
+            self.assertEqual(manager.sync_invalidations(), 1)
+            self.assertEqual(shared._sequence(), sequence)
+            print("   [EMOJI] Cache and strategy invalidations reach the shared tier")
+            
+            # Slots are unpickled, so files another user could write are refused
+            link = 'test_cache_link.shm'
+            os.symlink(path, link)
+            try:
+                with self.assertRaises(OSError):
+                    SharedMemoryCache(link, num_slots=64, slot_size=16 * 1024)
+            finally:
+                os.remove(link)
+            os.chmod(path, 0o644)
+            with self.assertRaises(PermissionError):
+                SharedMemoryCache(path, num_slots=64, slot_size=16 * 1024)
+            self.assertEqual(os.stat(os.path.dirname(default_path())).st_mode & 0o077, 0)
+            print("   [EMOJI] Symlinked and group/other-accessible files refused")
+        finally:
+            shared.close()
+            os.remove(path)
+    
+    # Test 21: Disk Cache
+    def test_21_disk_cache(self):
+        """Test persistent cache tier and warm restart"""
+        print("\n21. Testing disk cache...")
+        
+        path = 'test_disk_cache.db'
+        schema_version = schema_fingerprint(self.conn)
+        data_version = ['1']
+        query = "SELECT id, username FROM users WHERE city = ?"
+        
+        def open_manager():
+            disk = DiskCache(path, ttl=60, schema_version=schema_version,
+                             data_version=lambda: data_version[0])
+            manager = CacheManager(disk_cache=disk)
+            manager.create_cache('queries', ttl=60, max_size=100)
+            return manager, disk
+        
+        try:
+            manager, disk = open_manager()
+            for city in ('Chicago', 'Houston', 'Chicago', 'Chicago'):
+                manager.get_or_compute('queries', query, (city,),
+                                       lambda: self.conn.execute(query, (city,)).fetchall())
+            self.assertEqual(disk.get_stats()['stored_entries'], 2)
+            disk.close()
+            
+            # Restart: hottest entries are reloaded before the first request
+            manager, disk = open_manager()
+            self.assertEqual(manager.warm_from_disk('queries', limit=1), 1)
+            chicago = manager.get_or_compute('queries', query, ('Chicago',), lambda: self.fail("loader ran"))
+            self.assertEqual([row['id'] for row in chicago],
+                             [row['id'] for row in self.conn.execute(query, ('Chicago',))])
+            warm = manager.get_warm_stats()['queries']
+            self.assertEqual(warm['hit_rate_since_warm'], '100.00%')
+            print(f"   [EMOJI] Warmed {warm['entries_loaded']} entry in {warm['warm_time_seconds']}s, "
+                  f"hit rate since warm {warm['hit_rate_since_warm']}")
+            disk.close()
+            
+            # Entries tagged with an older data version are rejected
+            data_version[0] = '2'
+            manager, disk = open_manager()
+            self.assertEqual(manager.warm_from_disk('queries'), 0)
+            self.assertEqual(manager.get_warm_stats()['queries']['stale_rejected'], 2)
+            print("   [EMOJI] Stale entries rejected after data version change")
+            disk.close()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        
+        # A WAL database restarted with table stamps keeps unwritten entries
+        db_path = 'test_disk_wal.db'
+        create_sample_database(db_path).close()
+        
+        def open_app():
+            validator = TableVersionValidator(db_path)
+            pool = ConnectionPool(db_path, min_connections=1, max_connections=2, profile='read_heavy')
+            conn = pool.get_connection()
+            try:
+                disk = DiskCache(path, ttl=60, schema_version=schema_fingerprint(conn.connection))
+            finally:
+                pool.release_connection(conn)
+            manager = CacheManager(disk_cache=disk)
+            manager.create_cache('queries', ttl=60, max_size=100, validator=validator)
+            return manager, disk, pool, validator
+        
+        def close_app(disk, pool, validator):
+            disk.close()
+            pool.close_all()
+            validator.close()
+        
+        def write(statement):
+            conn = pool.get_connection()
+            try:
+                conn.execute(statement)
+                conn.connection.commit()
+            finally:
+                pool.release_connection(conn)
+        
+        def load():
+            conn = pool.get_connection()
+            try:
+                return conn.execute(query, ('Chicago',)).fetchall()
+            finally:
+                pool.release_connection(conn)
+        
+        try:
+            manager, disk, pool, validator = open_app()
+            write("INSERT INTO users (username, email, city) VALUES ('wal', 'wal@example.com', 'Chicago')")
+            manager.get_or_compute('queries', query, ('Chicago',), load)
+            write("INSERT INTO products (name, category, price, stock) VALUES ('Pen', 'Office', 1.5, 10)")
+            close_app(disk, pool, validator)
+            
+            manager, disk, pool, validator = open_app()
+            self.assertEqual(manager.warm_from_disk('queries'), 1)
+            chicago = manager.get_or_compute('queries', query, ('Chicago',), lambda: self.fail("loader ran"))
+            self.assertEqual([row['username'] for row in chicago], ['wal'])
+            close_app(disk, pool, validator)
+            print("   [EMOJI] WAL database restart served persisted entry")
+            
+            # A write to the table the entry read rejects it
+            manager, disk, pool, validator = open_app()
+            write("UPDATE users SET city = 'Boston' WHERE username = 'wal'")
+            close_app(disk, pool, validator)
+            manager, disk, pool, validator = open_app()
+            self.assertEqual(manager.warm_from_disk('queries'), 0)
+            self.assertEqual(manager.get_or_compute('queries', query, ('Chicago',), load), [])
+            close_app(disk, pool, validator)
+            print("   [EMOJI] Entries rejected after writes to their tables")
+        finally:
+            for base in (path, db_path):
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(base + suffix):
+                        os.remove(base + suffix)
+    
+    # Test 22: Negative Cache
+    def test_22_negative_cache(self):
+        """Test empty result caching with separate TTL and budget"""
+        print("\n22. Testing negative cache...")
+        
+        cache = QueryCache(ttl=60, max_size=10, negative_ttl=0.2, negative_max_size=50)
+        query = "SELECT id, product FROM orders WHERE user_id = ?"
+        cache.set(query, (1,), [(1, 'Laptop')])
+        
+        # A scanner probing missing ids hits the pool once per id
+        loads = []
+        for user_id in list(range(1000, 1040)) * 2 + list(range(1040, 1060)):
+            result = cache.get_or_compute(query, (user_id,), lambda: loads.append(1) or [])
+            self.assertEqual(result, [])
+        self.assertEqual(len(loads), 60)
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['negative_entries'], 50)
+        self.assertEqual(stats['negative_evictions'], 10)
+        self.assertEqual(stats['cache_size'], 1)
+        self.assertEqual(cache.get(query, (1,)), [(1, 'Laptop')])
+        print(f"   [EMOJI] {stats['negative_hits']} probes served from negative cache, real entries kept")
+        
+        # Writes to the table drop empty results too
+        cache.invalidate_tables('orders')
+        self.assertEqual(cache.get_stats()['negative_entries'], 0)
+        
+        # Empty results expire on their own TTL
+        cache.set(query, (2000,), [])
+        self.assertEqual(cache.get(query, (2000,)), [])
+        time.sleep(0.25)
+        self.assertIsNone(cache.get(query, (2000,)))
+        print("   [EMOJI] Empty results invalidated by writes and expire on negative TTL")
+    
+    # Test 23: Adaptive TTL
+    def test_23_adaptive_ttl(self):
+        """Test per-key TTL learned from result changes"""
+        print("\n23. Testing adaptive TTL...")
+        
+        cache = QueryCache(ttl=10, max_size=100, adaptive_ttl=True, min_ttl=5, max_ttl=80)
+        products = "SELECT id, name FROM products WHERE category = ?"
+        orders = "SELECT id, status FROM orders WHERE user_id = ?"
+        
+        # Products never change; order statuses change on every reload
+        for reload in range(4):
+            cache.set(products, ('Books',), [(1, 'Atlas')])
+            cache.set(orders, (1,), [(1, f"status-{reload}")])
+        
+        products_key = cache._generate_key(products, ('Books',))
+        orders_key = cache._generate_key(orders, (1,))
+        products_entry = cache.cache[products_key]
+        orders_entry = cache.cache[orders_key]
+        self.assertAlmostEqual(products_entry.expires_at - products_entry.created_at, 80)
+        self.assertAlmostEqual(orders_entry.expires_at - orders_entry.created_at, 5)
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['unchanged_reloads'], 3)
+        self.assertEqual(stats['changed_reloads'], 3)
+        self.assertGreater(stats['learned_ttls']['products'], stats['learned_ttls']['orders'])
+        print(f"   [EMOJI] Learned TTLs: {stats['learned_ttls']}")
+        
+        # New keys start from their table's learned TTL
+        cache.set(products, ('Games',), [(2, 'Chess')])
+        games_entry = cache.cache[cache._generate_key(products, ('Games',))]
+        self.assertAlmostEqual(games_entry.expires_at - games_entry.created_at,
+                               cache._table_ttls['products'])
+        print("   [EMOJI] New keys seeded from per-table TTL")
+        
+        # Results copied from another tier do not count as reloads
+        cache = QueryCache(ttl=10, max_size=100, adaptive_ttl=True, min_ttl=5, max_ttl=80)
+        cache.get_or_compute(products, ('Maps',), lambda: [(1, 'v0')])
+        for reload in range(1, 4):
+            cache.invalidate(products, ('Maps',))
+            cache.get_or_compute(products, ('Maps',), lambda: [(1, f"v{reload}")],
+                                 fallback=lambda: [(1, 'v0')])
+        maps_entry = cache.cache[cache._generate_key(products, ('Maps',))]
+        self.assertAlmostEqual(maps_entry.expires_at - maps_entry.created_at, 10)
+        self.assertEqual(cache.get_stats()['unchanged_reloads'], 0)
+        print("   [EMOJI] Lower-tier copies leave learned TTLs unchanged")
+    
+    # Test 24: Admission Filter
+    def test_24_admission_filter(self):
+        """Test TinyLFU admission against one-hit wonders"""
+        print("\n24. Testing admission filter...")
+        
+        query = "SELECT id, username FROM users WHERE city = ?"
+        
+        def replay(admission):
+            cache = QueryCache(ttl=60, max_size=25, admission=admission)
+            hot = [(f"hot-{i}",) for i in range(20)]
+            for round_number in range(50):
+                # Every hot key is requested each round, plus a burst of unique cities
+                for params in hot + [(f"scan-{round_number}-{i}",) for i in range(20)]:
+                    if cache.get(query, params) is None:
+                        cache.set(query, params, [params])
+            return cache, sum(cache.get(query, params) is not None for params in hot)
+        
+        plain_cache, plain_hot = replay(None)
+        tinylfu_cache, tinylfu_hot = replay('tinylfu')
+        
+        stats = tinylfu_cache.get_stats()
+        self.assertEqual(tinylfu_hot, 20)
+        self.assertLess(plain_hot, tinylfu_hot)
+        self.assertGreater(stats['admission_rejections'], 0)
+        self.assertGreater(float(stats['hit_rate'].rstrip('%')),
+                           float(plain_cache.get_stats()['hit_rate'].rstrip('%')))
+        print(f"   [EMOJI] Hot keys kept: {plain_hot}/20 without filter, {tinylfu_hot}/20 with TinyLFU")
+        print(f"   [EMOJI] Hit rate {plain_cache.get_stats()['hit_rate']} -> {stats['hit_rate']}")
+    
+    # Test 25: Cache Warmer
+    def test_25_cache_warmer(self):
+        """Test warming the cache from query history"""
+        print("\n25. Testing cache warmer...")
+        
+        analyzer = QueryAnalyzer()
+        users = "SELECT id, username FROM users WHERE city = ?"
+        orders = "SELECT id, status FROM orders WHERE user_id = ?"
+        for _ in range(3):
+            analyzer.analyze_query(self.conn, users, ('Chicago',))
+        analyzer.analyze_query(self.conn, orders, (1,))
+        analyzer.analyze_query(self.conn, orders, (2,))
+        
+        plan_path = 'test_warm_plan.json'
+        db_path = 'test_warm.db'
+        cache = QueryCache(ttl=60, max_size=100)
+        
+        def loader(query, params):
+            # Scheduled runs load from the warmer thread
+            conn = sqlite3.connect(self.db_path)
+            try:
+                return conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+        
+        try:
+            warmer = CacheWarmer(cache, analyzer, loader, top_k=2, plan_path=plan_path)
+            plan = warmer.select()
+            self.assertEqual(plan[0]['query'], users)
+            self.assertEqual(plan[0]['count'], 3)
+            
+            self.assertEqual(warmer.warm(), 2)
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            self.assertEqual(cache.get_stats()['cache_size'], 2)
+            print(f"   [EMOJI] Warmed top {len(plan)} queries from history")
+            
+            # A restarted process has no history and uses the saved plan
+            restarted = QueryCache(ttl=60, max_size=100)
+            CacheWarmer(restarted, QueryAnalyzer(), loader, plan_path=plan_path).warm()
+            self.assertIsNotNone(restarted.get(users, ('Chicago',)))
+            print("   [EMOJI] Restarted cache warmed from saved plan")
+            
+            # Scheduled runs keep re-warming
+            cache.clear()
+            warmer.start(interval=0.05)
+            time.sleep(0.2)
+            warmer.stop()
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            self.assertGreater(warmer.get_stats()['runs'], 1)
+            print(f"   [EMOJI] Scheduled warming ran {warmer.get_stats()['runs']} times")
+            
+            # Warmed results skip admission and are stamped before they load
+            writer = create_sample_database(db_path)
+            populate_sample_data(writer, num_users=20, num_orders=20, num_products=5)
+            validator = TableVersionValidator(db_path)
+            cache = QueryCache(ttl=60, max_size=2, admission='tinylfu', validator=validator)
+            for city in ('Houston', 'Phoenix'):
+                cache.set(users, (city,), [(1, 'alice')])
+                for _ in range(5):
+                    cache.get(users, (city,))
+            
+            history = QueryAnalyzer()
+            history.analyze_query(self.conn, users, ('Chicago',))
+            CacheWarmer(cache, history, lambda query, params: writer.execute(query, params).fetchall()).warm()
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            self.assertEqual(cache.get_stats()['admission_rejections'], 0)
+            
+            def writing_loader(query, params):
+                rows = writer.execute(query, params).fetchall()
+                writer.execute("UPDATE users SET username = username || '!'")
+                writer.commit()
+                return rows
+            
+            CacheWarmer(cache, history, writing_loader).warm()
+            self.assertIsNone(cache.get(users, ('Chicago',)))
+            validator.close()
+            writer.close()
+            print("   [EMOJI] Warmed entries admitted; a write during warming is not hidden")
+        finally:
+            for path in (plan_path, db_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    # Test 26: Data-Version Validation
+    def test_26_data_version_validation(self):
+        """Test cached results are dropped once their tables change"""
+        print("\n26. Testing data-version validation...")
+        
+        db_path = 'test_validation.db'
+        shm_path = 'test_validation.shm'
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        writer = create_sample_database(db_path)
+        populate_sample_data(writer, num_users=20, num_orders=50, num_products=5)
+        
+        users = "SELECT id, username FROM users WHERE city = ?"
+        orders = "SELECT id, status FROM orders WHERE user_id = ?"
+        
+        try:
+            validator = TableVersionValidator(db_path)
+            cache = QueryCache(ttl=3600, max_size=100, validator=validator)
+            cache.set(users, ('Chicago',), writer.execute(users, ('Chicago',)).fetchall())
+            # Sample data is random; pick a user whose orders the update below changes
+            user_id = writer.execute("SELECT user_id FROM orders LIMIT 1").fetchone()[0]
+            cache.set(orders, (user_id,), writer.execute(orders, (user_id,)).fetchall())
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            
+            # A write from another connection invalidates only orders entries
+            writer.execute("UPDATE orders SET status = 'shipped' WHERE user_id = ?", (user_id,))
+            writer.commit()
+            self.assertIsNone(cache.get(orders, (user_id,)))
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            self.assertEqual(cache.get_stats()['validation_failures'], 1)
+            print("   [EMOJI] Table write invalidated only entries reading that table")
+            
+            # Responses are validated the same way
+            responses = ResponseCache(ttl=3600, validator=validator)
+            responses.set('/api/users', {}, b'[]', ['users'])
+            writer.execute("DELETE FROM users WHERE id = 1")
+            writer.commit()
+            self.assertIsNone(responses.get('/api/users', {}))
+            print("   [EMOJI] Cached response dropped after users changed")
+            
+            # Shared-tier copies carry their stamp, so a write also outdates them
+            shared = SharedMemoryCache(shm_path, num_slots=64, slot_size=16 * 1024, ttl=3600)
+            manager = CacheManager(shared)
+            manager.create_cache('queries', ttl=3600, max_size=100, validator=validator)
+            user = "SELECT id, username FROM users WHERE id = ?"
+            load = lambda: writer.execute(user, (2,)).fetchall()
+            manager.get_or_compute('queries', user, (2,), load)
+            writer.execute("UPDATE users SET username = 'renamed' WHERE id = 2")
+            writer.commit()
+            self.assertEqual(manager.get_or_compute('queries', user, (2,), load)[0]['username'], 'renamed')
+            self.assertEqual(manager.get('queries', user, (2,))[0]['username'], 'renamed')
+            shared.close()
+            print("   [EMOJI] Outdated shared-tier copy not served after a write")
+            validator.close()
+            
+            # data_version invalidates on any committed write
+            validator = DataVersionValidator(db_path)
+            cache = QueryCache(ttl=3600, max_size=100, validator=validator)
+            cache.set(users, ('Chicago',), [])
+            self.assertIsNotNone(cache.get(users, ('Chicago',)))
+            writer.execute("UPDATE products SET stock = stock + 1")
+            writer.commit()
+            self.assertIsNone(cache.get(users, ('Chicago',)))
+            print("   [EMOJI] PRAGMA data_version invalidated on any commit")
+            
+            # Its stamps are per connection, so the shared tier is bypassed
+            shared = SharedMemoryCache(shm_path, num_slots=64, slot_size=16 * 1024, ttl=3600)
+            manager = CacheManager(shared)
+            manager.create_cache('queries', ttl=3600, max_size=100, validator=validator)
+            manager.get_or_compute('queries', users, ('Houston',), lambda: [(1, 'alice')])
+            self.assertIsNone(shared.get(users, ('Houston',)))
+            shared.close()
+            validator.close()
+            
+            # Virtual tables cannot have triggers and are skipped; names are quoted
+            writer.execute("CREATE VIRTUAL TABLE notes USING fts5(body)")
+            writer.execute('CREATE TABLE "order ""items""" (id INTEGER)')
+            writer.commit()
+            validator = TableVersionValidator(db_path)
+            items = 'order "items"'
+            self.assertNotIn('notes', validator.tables)
+            self.assertIn(items, validator.tables)
+            before = validator.stamp({items})
+            writer.execute('INSERT INTO "order ""items""" VALUES (1)')
+            writer.commit()
+            self.assertNotEqual(validator.stamp({items}), before)
+            validator.close()
+            print("   [EMOJI] Virtual tables skipped, quoted table names tracked")
+        finally:
+            writer.close()
+            for path in (db_path, shm_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    # Test 27: Pool Acquisition
+    def test_27_pool_acquisition(self):
+        """Test immediate growth, FIFO waiters and wait latency"""
+        print("\n27. Testing pool acquisition...")
+        
+        pool = ConnectionPool(self.db_path, min_connections=1, max_connections=3, timeout=5)
+        
+        # Below max_connections the pool grows without waiting
+        start = time.time()
+        held = [pool.get_connection() for _ in range(3)]
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(pool.get_stats()['total_connections'], 3)
+        print("   [EMOJI] Pool grew to max_connections without waiting")
+        
+        # Saturated: callers queue and are served in arrival order
+        served = []
+        
+        def acquire(name):
+            conn = pool.get_connection()
+            served.append(name)
+            time.sleep(0.01)
+            pool.release_connection(conn)
+        
+        threads = []
+        for name in range(3):
+            thread = threading.Thread(target=acquire, args=(name,))
+            thread.start()
+            threads.append(thread)
+            while pool.get_stats()['waiting'] < name + 1:
+                time.sleep(0.001)
+        
+        for conn in held:
+            time.sleep(0.02)
+            pool.release_connection(conn)
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(served, [0, 1, 2])
+        stats = pool.get_stats()
+        self.assertEqual(stats['total_waits'], 3)
+        self.assertGreater(float(stats['max_wait_time'][:-1]), 0)
+        print(f"   [EMOJI] Waiters served FIFO (max wait {stats['max_wait_time']})")
+        
+        # A saturated pool times out
+        held = [pool.get_connection() for _ in range(3)]
+        with self.assertRaises(TimeoutError):
+            pool.get_connection(timeout=0.05)
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+        self.assertEqual(pool.get_stats()['waiting'], 0)
+        print("   [EMOJI] Saturated pool timed out")
+        
+        for conn in held:
+            pool.release_connection(conn)
+        pool.close_all()
+        
+        # Releasing the same connection twice hands it to one waiter only
+        pool = ConnectionPool(self.db_path, min_connections=1, max_connections=1, timeout=5)
+        conn = pool.get_connection()
+        got = []
+        
+        def wait_for_connection():
+            try:
+                got.append(pool.get_connection(timeout=0.5))
+            except TimeoutError:
+                got.append(None)
+        
+        waiters = []
+        for count in range(2):
+            thread = threading.Thread(target=wait_for_connection)
+            thread.start()
+            waiters.append(thread)
+            while pool.get_stats()['waiting'] < count + 1:
+                time.sleep(0.001)
+        
+        reset = PooledConnection.reset
+        
+        def slow_reset(self):
+            time.sleep(0.05)
+            return reset(self)
+        
+        PooledConnection.reset = slow_reset
+        try:
+            releases = [threading.Thread(target=pool.release_connection, args=(conn,))
+                        for _ in range(2)]
+            for thread in releases:
+                thread.start()
+            for thread in releases:
+                thread.join()
+        finally:
+            PooledConnection.reset = reset
+        for thread in waiters:
+            thread.join()
+        
+        self.assertEqual([c for c in got if c is not None], [conn])
+        print("   [EMOJI] Double release served a single waiter")
+        pool.release_connection(conn)
+        
+        # close_all during a checkout closes the connection being handed out
+        checking = threading.Event()
+        is_healthy = PooledConnection.is_healthy
+        
+        def slow_is_healthy(self):
+            checking.set()
+            time.sleep(0.1)
+            return is_healthy(self)
+        
+        checked_out = []
+        PooledConnection.is_healthy = slow_is_healthy
+        try:
+            thread = threading.Thread(target=lambda: checked_out.append(pool.get_connection()))
+            thread.start()
+            checking.wait(5)
+            pool.close_all()
+            thread.join()
+        finally:
+            PooledConnection.is_healthy = is_healthy
+        
+        with self.assertRaises(sqlite3.ProgrammingError):
+            checked_out[0].execute("SELECT 1")
+        print("   [EMOJI] close_all closed a connection mid-checkout")
+    
+    # Test 28: Connection Health Checks
+    def test_28_connection_health_checks(self):
+        """Test validation on borrow, on return and by idle sweeps"""
+        print("\n28. Testing connection health checks...")
+        
+        pool = ConnectionPool(self.db_path, min_connections=1, max_connections=2)
+        
+        # An open transaction is rolled back on return
+        conn = pool.get_connection()
+        conn.execute("UPDATE users SET age = age WHERE id = 1")
+        self.assertTrue(conn.connection.in_transaction)
+        pool.release_connection(conn)
+        self.assertFalse(conn.connection.in_transaction)
+        self.assertEqual(pool.get_stats()['rollbacks_on_return'], 1)
+        print("   [EMOJI] Open transaction rolled back on return")
+        
+        # A connection broken while in use is replaced on return
+        conn = pool.get_connection()
+        conn.connection.close()
+        pool.release_connection(conn)
+        conn = pool.get_connection()
+        self.assertEqual(conn.execute("SELECT 1").fetchone()[0], 1)
+        pool.release_connection(conn)
+        self.assertEqual(pool.get_stats()['health_failures']['return'], 1)
+        print("   [EMOJI] Broken connection replaced on return")
+        
+        # A schema change makes idle connections fail the borrow check
+        self.conn.execute("CREATE TABLE IF NOT EXISTS health_check (id INTEGER)")
+        self.conn.commit()
+        try:
+            conn = pool.get_connection()
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM health_check").fetchone()[0], 0)
+            pool.release_connection(conn)
+            self.assertEqual(pool.get_stats()['health_failures']['borrow'], 1)
+            print("   [EMOJI] Stale-schema connection replaced on borrow")
+        finally:
+            self.conn.execute("DROP TABLE health_check")
+            self.conn.commit()
+        
+        # Idle sweeps replace broken connections before anyone borrows them
+        idle = next(iter(pool.available))
+        idle.connection.close()
+        self.assertEqual(pool.check_idle(), 1)
+        self.assertEqual(pool.get_stats()['health_failures']['sweep'], 1)
+        self.assertEqual(pool.get_stats()['total_connections'], 1)
+        pool.close_all()
+        
+        pool = ConnectionPool(self.db_path, min_connections=1, max_connections=2,
+                              health_check_interval=0.05)
+        next(iter(pool.available)).connection.close()
+        time.sleep(0.2)
+        self.assertEqual(pool.get_stats()['health_failures']['sweep'], 1)
+        pool.close_all()
+        
+        # A slot freed by a failed replacement goes to the oldest waiter
+        pool = ConnectionPool(self.db_path, min_connections=1, max_connections=1)
+        conn = pool.get_connection()
+        waited = []
+        
+        def waiter():
+            start = time.time()
+            pool.release_connection(pool.get_connection(timeout=5))
+            waited.append(time.time() - start)
+        
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while pool.get_stats()['waiting'] == 0:
+            time.sleep(0.01)
+        
+        create_connection = pool._create_connection
+        failures = [sqlite3.OperationalError("unable to open database file")]
+        
+        def failing_create():
+            if failures:
+                raise failures.pop()
+            return create_connection()
+        
+        pool._create_connection = failing_create
+        conn.connection.close()
+        pool.release_connection(conn)
+        thread.join(5)
+        self.assertLess(waited[0], 1)
+        self.assertEqual(pool.get_stats()['total_connections'], 1)
+        pool.close_all()
+        print("   [EMOJI] Waiter served after a failed replacement")
+        print("   [EMOJI] Idle sweeps replaced broken connections")
+    
+    # Test 29: Pool Maintainer
+    def test_29_pool_maintainer(self):
+        """Test idle reaping, refresh near max_age and min-size refill"""
+        print("\n29. Testing pool maintainer...")
+        
+        pool = ConnectionPool(self.db_path, min_connections=2, max_connections=5, max_age=60)
+        maintainer = PoolMaintainer(pool, interval=0.05, idle_timeout=0.1, refresh_before=10)
+        
+        # Burst grows the pool; idle connections above the minimum are reaped
+        held = [pool.get_connection() for _ in range(5)]
+        for conn in held:
+            pool.release_connection(conn)
+        time.sleep(0.15)
+        counts = maintainer.run_once()
+        self.assertEqual(counts['reaped'], 3)
+        self.assertEqual(pool.get_stats()['total_connections'], 2)
+        print(f"   [EMOJI] Reaped {counts['reaped']} idle connections down to min_connections")
+        
+        # Connections close to max_age are replaced before a caller sees them expire,
+        # and stay borrowable while their replacements connect
+        old = list(pool.available)
+        for conn in old:
+            conn.created_at -= 55
+        idle_while_connecting = []
+        create_connection = pool._create_connection
+        
+        def tracking_create():
+            idle_while_connecting.append(len(pool.available))
+            return create_connection()
+        
+        pool._create_connection = tracking_create
+        counts = maintainer.run_once()
+        pool._create_connection = create_connection
+        self.assertEqual(counts['refreshed'], 2)
+        self.assertEqual(idle_while_connecting, [2, 2])
+        self.assertTrue(all(conn not in pool.available for conn in old))
+        print(f"   [EMOJI] Refreshed {counts['refreshed']} connections near max_age")
+        
+        # Broken idle connections are replaced by the pool's sweep check
+        next(iter(pool.available)).connection.close()
+        counts = maintainer.run_once()
+        self.assertEqual(counts['replaced'], 1)
+        self.assertEqual(pool.get_stats()['health_failures']['sweep'], 1)
+        self.assertEqual(pool.get_stats()['total_connections'], 2)
+        print("   [EMOJI] Broken idle connection replaced and counted as a sweep failure")
+        
+        # Dropped connections are refilled to min_connections in the background
+        idle = pool.take_idle()
+        pool.discard_connection(idle[0])
+        pool.return_idle(idle[1:])
+        self.assertEqual(pool.get_stats()['total_connections'], 1)
+        maintainer.start()
+        time.sleep(0.2)
+        maintainer.stop()
+        self.assertEqual(pool.get_stats()['total_connections'], 2)
+        self.assertGreaterEqual(maintainer.get_stats()['created'], 1)
+        
+        created = pool.get_stats()['total_created']
+        conn = pool.get_connection()
+        pool.release_connection(conn)
+        self.assertEqual(pool.get_stats()['total_created'], created)
+        print("   [EMOJI] Pool refilled to min_connections off the request path")
+        pool.close_all()
+    
+    # Test 30: Connection Tuning Profiles
+    def test_30_tuning_profiles(self):
+        """Test PRAGMA profiles applied to new pooled connections"""
+        print("\n30. Testing connection tuning profiles...")
+        
+        db_path = 'test_tuning.db'
+        create_sample_database(db_path).close()
+        
+        try:
+            pool = ConnectionPool(db_path, min_connections=1, max_connections=2, profile='read_heavy')
+            conn = pool.get_connection()
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -64000)
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+            pool.release_connection(conn)
+            self.assertEqual(pool.get_stats()['profile'], 'read_heavy')
+            pool.close_all()
+            print("   [EMOJI] read_heavy profile applied (WAL, 64MB cache)")
+            
+            pool = ConnectionPool(db_path, min_connections=1, max_connections=1,
+                                  profile={'synchronous': 'OFF'})
+            conn = pool.get_connection()
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+            pool.release_connection(conn)
+            pool.close_all()
+            print("   [EMOJI] Custom PRAGMA settings applied")
+            
+            with self.assertRaises(ValueError):
+                ConnectionPool(db_path, profile='fastest')
+            print("   [EMOJI] Unknown profile rejected")
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+    
+    # Test 31: Read/Write Split Pool
+    def test_31_read_write_split_pool(self):
+        """Test read-only readers and group-committed writes"""
+        print("\n31. Testing read/write split pool...")
+        
+        db_path = 'test_split.db'
+        populate_sample_data(create_sample_database(db_path), num_users=20, num_orders=50, num_products=5)
+        insert = "INSERT INTO orders (user_id, product, quantity, price, status) VALUES (?, ?, ?, ?, ?)"
+        
+        pool = ReadWritePool(db_path, min_readers=2, max_readers=4, batch_window=0.02)
+        try:
+            # Reader connections cannot write
+            conn = pool.get_read_connection()
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM orders")
+            pool.release_read_connection(conn)
+            print("   [EMOJI] Reader connections are read-only")
+            
+            # Concurrent writes share commits
+            futures = [pool.submit_write(insert, (1, 'Product 1', 1, 9.99, 'pending')) for _ in range(50)]
+            results = [future.result(timeout=5) for future in futures]
+            self.assertTrue(all(result.rowcount == 1 for result in results))
+            stats = pool.get_stats()
+            self.assertEqual(stats['writes'], 50)
+            self.assertLess(stats['batches'], 50)
+            print(f"   [EMOJI] 50 writes committed in {stats['batches']} group commits")
+            
+            # A failing write does not undo the rest of its batch
+            good = pool.submit_write(insert, (2, 'Product 2', 1, 9.99, 'pending'))
+            bad = pool.submit_write("INSERT INTO missing_table VALUES (1)")
+            self.assertEqual(good.result(timeout=5).rowcount, 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                bad.result(timeout=5)
+            
+            rows = pool.execute_read("SELECT COUNT(*) FROM orders WHERE user_id = 2 AND product = 'Product 2'")
+            self.assertGreaterEqual(rows[0][0], 1)
+            stats = pool.get_stats()
+            self.assertEqual(stats['write_errors'], 1)
+            self.assertEqual(stats['read_latency']['count'], 1)
+            self.assertEqual(stats['write_latency']['count'], 52)
+            print(f"   [EMOJI] Failed write isolated; read p50 {stats['read_latency']['p50']}, "
+                  f"write p50 {stats['write_latency']['p50']}")
+            
+            # Non-sqlite errors (an unbindable parameter) fail only their own write
+            bad = pool.submit_write(insert, (2 ** 70, 'Product 3', 1, 9.99, 'pending'))
+            with self.assertRaises(OverflowError):
+                bad.result(timeout=5)
+            result = pool.execute_write(insert, (3, 'Product 3', 1, 9.99, 'pending'), timeout=5)
+            self.assertEqual(result.rowcount, 1)
+            self.assertEqual(pool.get_stats()['write_errors'], 2)
+            print("   [EMOJI] Writer keeps running after a non-sqlite write error")
+            
+            # Writes cancelled while queued are dropped without stopping the writer
+            cancelled = pool.submit_write(insert, (4, 'Cancelled', 1, 9.99, 'pending'))
+            self.assertTrue(cancelled.cancel())
+            result = pool.execute_write(insert, (5, 'Product 5', 1, 9.99, 'pending'), timeout=5)
+            self.assertEqual(result.rowcount, 1)
+            rows = pool.execute_read("SELECT COUNT(*) FROM orders WHERE product = 'Cancelled'")
+            self.assertEqual(rows[0][0], 0)
+            print("   [EMOJI] Cancelled write dropped, writer still running")
+            
+            pool.close()
+            with self.assertRaises(RuntimeError):
+                pool.submit_write(insert, (6, 'Product 6', 1, 9.99, 'pending'))
+            
+            # Readers only avoid the writer's lock in WAL mode
+            with self.assertRaises(ValueError):
+                ReadWritePool(db_path, writer_profile={'journal_mode': 'DELETE'})
+            print("   [EMOJI] Writer profiles without WAL rejected")
+        finally:
+            pool.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+    
+    # Test 32: Async Connection Pool
+    def test_32_async_connection_pool(self):
+        """Test asyncio pool, async iteration and async get-or-compute"""
+        print("\n32. Testing async connection pool...")
+        
+        query = "SELECT id, username FROM users WHERE city = ?"
+        
+        async def scenario():
+            pool = AsyncConnectionPool(self.db_path, min_connections=1, max_connections=3)
+            try:
+                async with pool.acquire() as conn:
+                    rows = await conn.fetchall(query, ('Chicago',))
+                    streamed = [row async for row in conn.iterate(query, ('Chicago',), batch_size=4)]
+                self.assertEqual(len(streamed), len(rows))
+                
+                # More coroutines than connections queue in the event loop
+                results = await asyncio.gather(*(pool.fetchone("SELECT COUNT(*) FROM users")
+                                                 for _ in range(20)))
+                self.assertEqual(len(results), 20)
+                stats = pool.get_stats()
+                self.assertLessEqual(stats['total_connections'], 3)
+                self.assertEqual(stats['in_use'], 0)
+                
+                with self.assertRaises(TimeoutError):
+                    async with pool.acquire(), pool.acquire(), pool.acquire():
+                        async with pool.acquire(timeout=0.05):
+                            pass
+                
+                # A connection checked out for a cancelled acquire is released off the loop
+                release_threads = []
+                release_connection = pool.pool.release_connection
+                
+                def tracking_release(conn):
+                    release_threads.append(threading.current_thread())
+                    release_connection(conn)
+                
+                pool.pool.release_connection = tracking_release
+                checking_out = threading.Event()
+                get_connection = pool.pool.get_connection
+                
+                def slow_get_connection():
+                    checking_out.set()
+                    time.sleep(0.05)
+                    return get_connection()
+                
+                pool.pool.get_connection = slow_get_connection
+                
+                async def hold():
+                    async with pool.acquire():
+                        await asyncio.sleep(1)
+                
+                holder = asyncio.ensure_future(hold())
+                while not checking_out.is_set():
+                    await asyncio.sleep(0.001)
+                holder.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await holder
+                deadline = time.time() + 2
+                while not release_threads and time.time() < deadline:
+                    await asyncio.sleep(0.01)
+                pool.pool.release_connection = release_connection
+                pool.pool.get_connection = get_connection
+                self.assertEqual(pool.get_stats()['in_use'], 0)
+                self.assertEqual(len(release_threads), 1)
+                self.assertIsNot(release_threads[0], threading.current_thread())
+                
+                # Concurrent misses on one key share one async load
+                cache = QueryCache(ttl=60, max_size=100)
+                calls = []
+                
+                async def loader():
+                    calls.append(1)
+                    return await pool.fetchall(query, ('Chicago',))
+                
+                loaded = await asyncio.gather(*(cache.aget_or_compute(query, ('Chicago',), loader)
+                                                for _ in range(10)))
+                self.assertEqual(len(calls), 1)
+                self.assertTrue(all(result == loaded[0] for result in loaded))
+                self.assertIsNotNone(cache.get(query, ('Chicago',)))
+                
+                # Cancelling the coroutine that started a load leaves it running for the others
+                release = asyncio.Event()
+                
+                async def slow_loader():
+                    await release.wait()
+                    return await pool.fetchall(query, ('Houston',))
+                
+                first = asyncio.ensure_future(cache.aget_or_compute(query, ('Houston',), slow_loader))
+                await asyncio.sleep(0)
+                waiter = asyncio.ensure_future(cache.aget_or_compute(query, ('Houston',), self.fail))
+                await asyncio.sleep(0)
+                first.cancel()
+                release.set()
+                houston = await waiter
+                with self.assertRaises(asyncio.CancelledError):
+                    await first
+                self.assertEqual(len(houston), len(await pool.fetchall(query, ('Houston',))))
+                
+                # Validator stamps are taken off the loop; fallbacks are tried before the loader
+                class RecordingValidator:
+                    mode = 'recording'
+                    shareable = True
+                    threads = []
+                    
+                    def stamp(self, tables=()):
+                        self.threads.append(threading.current_thread())
+                        return 1
+                    
+                    def is_current(self, stamp, tables=()):
+                        return True
+                
+                validator = RecordingValidator()
+                cache = QueryCache(ttl=60, max_size=100, validator=validator)
+                
+                async def fallback():
+                    return [(1, 'alice')]
+                
+                result = await cache.aget_or_compute(query, ('Boston',), self.fail, fallback=fallback)
+                self.assertEqual(result, [(1, 'alice')])
+                self.assertEqual(len(validator.threads), 1)
+                self.assertIsNot(validator.threads[0], threading.current_thread())
+                return len(rows)
+            finally:
+                await pool.close()
+        
+        count = asyncio.run(scenario())
+        print(f"   [EMOJI] Fetched and streamed {count} rows on the executor")
+        print("   [EMOJI] 20 coroutines shared 3 connections; saturated acquire timed out")
+        print("   [EMOJI] 10 concurrent aget_or_compute misses ran 1 loader")
+        print("   [EMOJI] Cancelled starter left the load to its waiters; stamps taken off the loop")
+    
+    # Test 33: Statement Cache Metrics
+    def test_33_statement_cache_metrics(self):
+        """Test prepared-statement cache sizing and hit metrics"""
+        print("\n33. Testing statement cache metrics...")
+        
+        queries = ["SELECT id FROM users WHERE id = ?",
+                   "SELECT id FROM orders WHERE id = ?",
+                   "SELECT id FROM products WHERE id = ?"]
+        
+        def cycle(cache_size):
+            pool = ConnectionPool(self.db_path, min_connections=1, max_connections=1,
+                                  statement_cache_size=cache_size)
+            conn = pool.get_connection()
+            for i in range(30):
+                conn.execute(queries[i % 3], (i,)).fetchall()
+            pool.release_connection(conn)
+            stats = pool.get_statement_stats(top=1)
+            pool.close_all()
+            return stats
+        
+        # Three statements cycling through a two-statement LRU never hit
+        stats = cycle(2)
+        self.assertEqual(stats['prepares'], 30)
+        self.assertEqual(stats['hit_rate'], '0.00%')
+        
+        stats = cycle(3)
+        self.assertEqual(stats['prepares'], 3)
+        self.assertEqual(stats['hits'], 27)
+        self.assertEqual(stats['top_statements'][0]['executions'], 10)
+        self.assertEqual(stats['connections'][0]['cached'], 3)
+        print(f"   [EMOJI] Cache of 3: {stats['prepares']} prepares, hit rate {stats['hit_rate']}")
+        print("   [EMOJI] Cache of 2: every execution re-prepared")
+    
+    # Test 34: Connection Affinity
+    def test_34_connection_affinity(self):
+        """Test affinity routing of hinted acquisitions to warm connections"""
+        print("\n34. Testing connection affinity...")
+        
+        pool = ConnectionPool(self.db_path, min_connections=4, max_connections=4, affinity=True)
+        warm = {}
+        held = []
+        for table in ('users', 'orders', 'products'):
+            conn = pool.get_connection(hint=table)
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            warm[table] = conn
+            held.append(conn)
+        for conn in held:
+            pool.release_connection(conn)
+        
+        # The connection that served a hint is preferred, whatever its idle position
+        for table in ('orders', 'users', 'orders'):
+            conn = pool.get_connection(hint=table)
+            self.assertIs(conn, warm[table])
+            pool.release_connection(conn)
+        
+        # Unknown hints take a connection no other hint is warm on
+        conn = pool.get_connection(hint='reviews')
+        self.assertNotIn(conn, warm.values())
+        pool.release_connection(conn)
+        
+        # With every idle connection warm for a hint, the one idle longest goes
+        conn = pool.get_connection(hint='payments')
+        self.assertIs(conn, warm['products'])
+        pool.release_connection(conn)
+        
+        stats = pool.get_stats()
+        self.assertEqual(stats['affinity_hits'], 3)
+        self.assertEqual(stats['affinity_misses'], 5)
+        self.assertEqual(stats['available'], 4)
+        pool.close_all()
+        print(f"   [EMOJI] Hinted acquisitions reuse warm connections ({stats['affinity_hits']} hits)")
+        
+        # Without affinity, hints are ignored and idle connections are reused FIFO
+        pool = ConnectionPool(self.db_path, min_connections=2, max_connections=2)
+        conn = pool.get_connection(hint='orders')
+        pool.release_connection(conn)
+        self.assertEqual(pool.get_stats()['affinity_hits'], 0)
+        self.assertFalse(conn.hints)
+        self.assertIsNot(pool.get_connection(hint='orders'), conn)
+        pool.close_all()
+        print("   [EMOJI] Hints ignored and idle connections reused FIFO when affinity is off")
 
 
 def run_tests():